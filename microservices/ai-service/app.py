@@ -3,18 +3,31 @@ AI Service - Handles integration with Google Gemini API and provides intelligent
 Integrates with Auth Service for user validation and provides context-aware AI responses.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 import google.generativeai as genai
+import asyncio
 import os
 import logging
+import random
 import requests
 import json
+import hashlib
+import time
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime, timedelta
 from prometheus_flask_exporter import PrometheusMetrics
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
 import redis
 import sys
 from flask_cors import CORS
 
+from quota_scheduler import QuotaExceeded, QuotaScheduler
+from response_pool import ResponsePool
+from single_flight import LEADER, SingleFlight
+
 # Add shared-libs to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared-libs'))
 
@@ -26,6 +39,21 @@ except ImportError:
     RABBITMQ_AVAILABLE = False
     get_queue_client = None
 
+# Try to import the bulkhead/circuit-breaker client, call Gemini directly if not available
+try:
+    from upstream_client import CLOSED, STATE_VALUES, UpstreamRejected, get_upstream_client
+    UPSTREAM_CLIENT_AVAILABLE = True
+except ImportError:
+    UPSTREAM_CLIENT_AVAILABLE = False
+    get_upstream_client = None
+
+# Try to import the token-budgeted prompt builder, send untrimmed prompts if not available
+try:
+    from prompt_builder import PromptBuilder, PromptTemplate
+    PROMPT_BUILDER_AVAILABLE = True
+except ImportError:
+    PROMPT_BUILDER_AVAILABLE = False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,11 +73,18 @@ SERVICE_SECRET = os.environ.get('SERVICE_SECRET', 'default-service-secret')
 
 # Google Gemini Configuration
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-1.5-flash')
+# Point at a compatible endpoint such as gemini-stub (http://gemini-stub:8010); talks REST when set
+GEMINI_API_BASE_URL = os.environ.get('GEMINI_API_BASE_URL') or None
+GEMINI_API_URL = f"{GEMINI_API_BASE_URL or 'https://generativelanguage.googleapis.com'}/v1beta/models/{GEMINI_MODEL}:generateContent"
 if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    logger.info("Gemini AI configured successfully with gemini-1.5-flash model")
+    if GEMINI_API_BASE_URL:
+        genai.configure(api_key=GEMINI_API_KEY, transport='rest', client_options={'api_endpoint': GEMINI_API_BASE_URL})
+        logger.info(f"Using Gemini API at {GEMINI_API_BASE_URL}")
+    else:
+        genai.configure(api_key=GEMINI_API_KEY)
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    logger.info(f"Gemini AI configured successfully with {GEMINI_MODEL} model")
 else:
     model = None
     logger.warning("GEMINI_API_KEY not provided - AI responses will be limited")
@@ -67,6 +102,151 @@ except Exception as e:
     logger.warning(f"Redis connection failed: {e}")
     redis_client = None
 
+# Response caching: bump PROMPT_TEMPLATE_VERSION whenever the prompt wording
+# changes so responses to the old prompt are not reused
+AI_RESPONSE_CACHE_TTL = int(os.environ.get('AI_RESPONSE_CACHE_TTL', 3600))
+PROMPT_TEMPLATE_VERSION = 2
+
+# Prompts are fitted into AI_PROMPT_TOKEN_BUDGET estimated tokens: the oldest
+# of the last AI_PROMPT_MAX_TURNS history turns are dropped first and long
+# messages are cut in the middle
+AI_PROMPT_TOKEN_BUDGET = int(os.environ.get('AI_PROMPT_TOKEN_BUDGET', 1024))
+AI_PROMPT_MAX_TURNS = int(os.environ.get('AI_PROMPT_MAX_TURNS', 5))
+AI_PROMPT_MAX_TURN_TOKENS = int(os.environ.get('AI_PROMPT_MAX_TURN_TOKENS', 200))
+
+# Identical prompts in flight are generated once; other replicas wait on a
+# Redis lock held for at most AI_INFLIGHT_LOCK_TTL seconds
+AI_INFLIGHT_LOCK_TTL = float(os.environ.get('AI_INFLIGHT_LOCK_TTL', 30))
+AI_INFLIGHT_POLL_INTERVAL = float(os.environ.get('AI_INFLIGHT_POLL_INTERVAL', 0.05))
+
+# Pre-generated responses per (emotion, context) are refilled while Gemini is
+# idle and served when a live call runs past AI_LATENCY_BUDGET seconds or is
+# rejected; entries live for AI_POOL_TTL seconds and rotate after half of it
+AI_POOL_SIZE = int(os.environ.get('AI_POOL_SIZE', 5))
+AI_POOL_TTL = int(os.environ.get('AI_POOL_TTL', 1800))
+AI_POOL_REFILL_INTERVAL = float(os.environ.get('AI_POOL_REFILL_INTERVAL', 5))
+AI_POOL_EMOTIONS = os.environ.get(
+    'AI_POOL_EMOTIONS', 'joy,sadness,anger,fear,surprise,disgust,trust,anticipation,neutral'
+).split(',')
+AI_POOL_CONTEXTS = os.environ.get('AI_POOL_CONTEXTS', 'general,conversation').split(',')
+AI_LATENCY_BUDGET = float(os.environ.get('AI_LATENCY_BUDGET', 4.0))
+AI_LIVE_WORKERS = int(os.environ.get('AI_LIVE_WORKERS', 32))
+
+# Gemini calls are admitted at AI_QUOTA_RPM per minute (this replica's share
+# of the project quota; 0 disables scheduling). Waiting calls are served
+# realtime first (websocket chats), then standard (REST), then batch
+# (AI_BATCH_CONTEXTS such as insight jobs), round robin between users
+AI_QUOTA_RPM = float(os.environ.get('AI_QUOTA_RPM', 600))
+AI_QUOTA_BURST = int(os.environ.get('AI_QUOTA_BURST', 20))
+AI_QUOTA_MAX_QUEUED = int(os.environ.get('AI_QUOTA_MAX_QUEUED', 100))
+AI_QUOTA_MAX_QUEUED_PER_USER = int(os.environ.get('AI_QUOTA_MAX_QUEUED_PER_USER', 5))
+AI_QUOTA_MAX_WAIT = {
+    'realtime': float(os.environ.get('AI_QUOTA_MAX_WAIT_REALTIME', 2)),
+    'standard': float(os.environ.get('AI_QUOTA_MAX_WAIT_STANDARD', 8)),
+    'batch': float(os.environ.get('AI_QUOTA_MAX_WAIT_BATCH', 30))
+}
+AI_BATCH_CONTEXTS = os.environ.get('AI_BATCH_CONTEXTS', 'insight,batch').split(',')
+
+# Generation jobs published with routing key ai.generate are consumed from
+# AI_JOB_QUEUE by AI_JOB_WORKERS workers, each holding at most
+# AI_JOB_PREFETCH unacknowledged jobs; results are kept AI_JOB_RESULT_TTL
+# seconds for pickup
+AI_JOB_QUEUE = 'ai.response.generation'
+AI_JOB_WORKERS = int(os.environ.get('AI_JOB_WORKERS', 2))
+AI_JOB_PREFETCH = int(os.environ.get('AI_JOB_PREFETCH', 1))
+AI_JOB_RESULT_TTL = int(os.environ.get('AI_JOB_RESULT_TTL', 600))
+# Must match rabbitmq/definitions.json, or redeclaring the queue fails
+AI_JOB_QUEUE_ARGUMENTS = {'x-message-ttl': 300000, 'x-dead-letter-exchange': 'emotibot.dlq'}
+# Job results are only ever published back under this routing key prefix
+AI_JOB_REPLY_PREFIX = 'ai.response.'
+
+single_flight = SingleFlight(
+    redis_client=redis_client,
+    lock_prefix='ai_inflight:',
+    lock_ttl=AI_INFLIGHT_LOCK_TTL,
+    poll_interval=AI_INFLIGHT_POLL_INTERVAL
+)
+
+coalesced_requests = Counter(
+    'ai_coalesced_requests', 'AI requests served by an identical in-flight generation', ['scope']
+)
+time_to_first_token = Histogram(
+    'ai_time_to_first_token_seconds',
+    'Time from a streaming request to its first response chunk',
+    ['source'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+)
+prompt_tokens = Histogram(
+    'ai_prompt_tokens',
+    'Estimated tokens per prompt sent to Gemini',
+    ['template'],
+    buckets=(32, 64, 128, 256, 384, 512, 768, 1024, 1536, 2048, 4096)
+)
+pool_lookups = Counter(
+    'ai_pool_lookups', 'Pre-generated response lookups by reason and result', ['reason', 'result']
+)
+pool_served_age = Histogram(
+    'ai_pool_served_age_seconds',
+    'Age of pre-generated responses when served',
+    buckets=(30, 60, 120, 300, 600, 900, 1200, 1800, 3600)
+)
+generation_jobs = Counter('ai_generation_jobs', 'Queued generation jobs processed by outcome', ['status'])
+job_queue_latency = Histogram(
+    'ai_job_queue_latency_seconds',
+    'Time generation jobs waited in the queue before a worker took them',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+)
+Gauge('ai_inflight_generations', 'Distinct prompts currently being generated').set_function(
+    lambda: single_flight.in_flight
+)
+
+# Gemini calls run on a shared event loop behind a bulkhead and a circuit
+# breaker (GEMINI_MAX_CONCURRENT, GEMINI_QUEUE_TIMEOUT, GEMINI_BREAKER_* ...);
+# rejected calls get an intelligent fallback instead of queueing
+if model and UPSTREAM_CLIENT_AVAILABLE:
+    gemini_client = get_upstream_client('gemini')
+    upstream_rejections = Counter(
+        'ai_upstream_rejections', 'Gemini calls answered by fallback without being attempted', ['reason']
+    )
+    Gauge('ai_upstream_circuit_state', 'Gemini circuit breaker state (0=closed, 1=half-open, 2=open)').set_function(
+        lambda: STATE_VALUES[gemini_client.breaker.state]
+    )
+    Gauge('ai_upstream_queue_depth', 'Gemini calls waiting for a bulkhead slot').set_function(
+        lambda: gemini_client.waiting
+    )
+    Gauge('ai_upstream_active_calls', 'Gemini calls in flight').set_function(
+        lambda: gemini_client.active
+    )
+else:
+    gemini_client = None
+    if model:
+        logger.warning("Upstream client library not available, calling Gemini without a circuit breaker")
+
+if model and AI_QUOTA_RPM > 0:
+    quota_scheduler = QuotaScheduler(
+        rate=AI_QUOTA_RPM / 60,
+        burst=AI_QUOTA_BURST,
+        priorities=('realtime', 'standard', 'batch'),
+        max_wait=AI_QUOTA_MAX_WAIT,
+        max_queued=AI_QUOTA_MAX_QUEUED,
+        max_queued_per_user=AI_QUOTA_MAX_QUEUED_PER_USER
+    )
+    quota_queue_wait = Histogram(
+        'ai_quota_queue_wait_seconds',
+        'Time Gemini calls waited for upstream quota',
+        ['priority'],
+        buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0)
+    )
+    quota_shed = Counter('ai_quota_shed', 'Gemini calls shed while waiting for quota', ['priority', 'reason'])
+    quota_queued = Gauge('ai_quota_queued', 'Gemini calls waiting for quota', ['priority'])
+    for _priority in quota_scheduler.priorities:
+        quota_queued.labels(priority=_priority).set_function(
+            lambda priority=_priority: quota_scheduler.queued(priority)
+        )
+    Gauge('ai_quota_tokens', 'Gemini quota tokens available').set_function(lambda: quota_scheduler.tokens)
+else:
+    quota_scheduler = None
+
 if not RABBITMQ_AVAILABLE:
     logger.warning("Message queue library not available, running without RabbitMQ")
 
@@ -129,7 +309,7 @@ def get_cached_response(cache_key):
         logger.error(f"Redis cache error: {e}")
         return None
 
-def cache_response(cache_key, response, ttl=3600):
+def cache_response(cache_key, response, ttl=AI_RESPONSE_CACHE_TTL):
     """Cache AI response in Redis."""
     if not redis_client:
         return
@@ -139,11 +319,73 @@ def cache_response(cache_key, response, ttl=3600):
     except Exception as e:
         logger.error(f"Redis cache error: {e}")
 
-def generate_emotion_aware_response(message, emotion=None, confidence=None, context='general'):
-    """Generate AI response based on message and emotion context."""
+def ai_response_cache_key(message, emotion=None, confidence=None, context='general', history=None):
+    """
+    Stable cache key for a response.
+    
+    A SHA-256 digest over everything that shapes the prompt plus the model
+    and template version, so every replica and restart computes the same
+    key (the built-in hash() is salted per process). Fallback responses get
+    their own namespace so they are never served once Gemini is configured.
+    """
+    payload = json.dumps({
+        'model': GEMINI_MODEL if model else 'fallback',
+        'template': PROMPT_TEMPLATE_VERSION,
+        'message': message,
+        'emotion': emotion,
+        # The prompt only carries the confidence to two decimals
+        'confidence': f"{confidence:.2f}" if emotion and confidence else None,
+        'context': context,
+        # Turns beyond AI_PROMPT_MAX_TURNS never reach the prompt
+        'history': prompt_history(history),
+        'prompt_budget': AI_PROMPT_TOKEN_BUDGET
+    }, sort_keys=True, ensure_ascii=False)
+    return f"ai_response:v2:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+def request_priority(context, caller=None):
+    """Quota priority for a request: realtime chats, then standard REST calls, then batch jobs."""
+    if context == 'realtime' or caller == 'websocket-service':
+        return 'realtime'
+    if context in AI_BATCH_CONTEXTS:
+        return 'batch'
+    return 'standard'
+
+def quota_user(user_id=None, caller=None):
+    """Who a request is queued as: the user, else the calling service or address."""
+    if user_id and user_id != 'anonymous':
+        return f"user:{user_id}"
+    return caller or 'anonymous'
+
+def authenticated_service():
+    """The calling service's name if it sent a valid service token, else None."""
+    return request.headers.get('X-Service-Name') if validate_service_token() else None
+
+def request_user_id(data=None):
+    """
+    The user a request is for: from the user's own bearer token, or the
+    body's user_id when a service vouches for it with a service token.
+    None when neither authenticates.
+    """
+    if authenticated_service():
+        return (data or {}).get('user_id')
+    
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        is_valid, user_data = verify_user_token(auth_header.split(' ')[1])
+        if is_valid and user_data:
+            return user_data.get('user_id')
+    return None
+
+def request_caller():
+    """Who an unattributed request is queued as: the authenticated service, else the client address."""
+    return authenticated_service() or request.remote_addr
+
+def generate_emotion_aware_response(message, emotion=None, confidence=None, context='general', history=None,
+                                    priority='standard', user='anonymous', latency_budget=AI_LATENCY_BUDGET):
+    """Generate AI response based on message, emotion context and conversation history."""
     
     # Create cache key
-    cache_key = f"ai_response:{hash(f'{message}:{emotion}:{context}')}"
+    cache_key = ai_response_cache_key(message, emotion, confidence, context, history)
     
     # Check cache first
     cached_response = get_cached_response(cache_key)
@@ -151,98 +393,275 @@ def generate_emotion_aware_response(message, emotion=None, confidence=None, cont
         logger.info("Returning cached AI response")
         return cached_response
     
+    # Wait for an identical prompt already in flight instead of calling Gemini again
+    def generate():
+        return single_flight.do(
+            cache_key,
+            lambda: _generate_response(cache_key, message, emotion, confidence, context, history, priority, user),
+            lambda: get_cached_response(cache_key)
+        )
+    
+    if response_pool and latency_budget:
+        # Past the budget, serve a pre-generated response (or a canned one if
+        # the pool is empty) rather than keep waiting; the live call keeps
+        # running and caches its result for the next identical request
+        future = live_generations.submit(generate)
+        try:
+            result, source = future.result(timeout=latency_budget)
+        except FutureTimeout:
+            return build_rejected_result(message, emotion, confidence, context, 'latency_budget')
+    else:
+        result, source = generate()
+    if source != LEADER:
+        coalesced_requests.labels(scope=source).inc()
+        logger.info(f"Returning AI response coalesced from an in-flight request ({source})")
+    return result
+
+# Canned responses used when Gemini is not configured
+FALLBACK_RESPONSES = {
+    'happy': [
+        "I'm so glad you're feeling happy! 😊 What's making your day special?",
+        "Your happiness is contagious! 🌟 What would you like to talk about?",
+        "It's wonderful to hear you're in good spirits! ✨"
+    ],
+    'sad': [
+        "I'm sorry you're feeling down. 😔 Would you like to talk about what's bothering you?",
+        "It's okay to feel sad sometimes. 💙 I'm here to listen if you need someone to talk to.",
+        "I understand this is a difficult time. 🌧️ What can I do to help?"
+    ],
+    'angry': [
+        "I can sense you're frustrated. 😤 Would you like to talk about what happened?",
+        "It's natural to feel angry sometimes. 🔥 What's on your mind?",
+        "I'm here to listen if you want to vent. 💪"
+    ],
+    'neutral': [
+        "Hello! How are you feeling today? 🤔",
+        "I'm here to chat! What's on your mind? 💭",
+        "How can I help you today? 😊"
+    ],
+    'microservices': [
+        "Microservices architecture is a great topic! 🏗️ It's an approach where applications are built as a collection of small, independent services that communicate over well-defined APIs. Each service is responsible for a specific business function and can be developed, deployed, and scaled independently.",
+        "Great question about microservices! 🔧 This architecture pattern breaks down large applications into smaller, manageable pieces. Benefits include better scalability, technology diversity, and fault isolation. However, it also introduces complexity in service communication and data consistency.",
+        "Microservices are fascinating! 🚀 Think of them as building blocks - each service handles one thing well and they work together to create a complete application. This EmotiBot demo is actually built using microservices architecture with separate services for authentication, emotion analysis, AI responses, and more!"
+    ],
+    'architecture': [
+        "Software architecture is the foundation of any good system! 🏛️ It defines how components interact, what patterns to use, and how to structure code for maintainability and scalability.",
+        "Architecture is crucial for building robust applications! 📐 Good architecture considers factors like performance, security, maintainability, and future growth.",
+        "Great question about architecture! 🎯 It's about making strategic decisions on how to organize and structure software systems to meet both current and future requirements."
+    ]
+}
+
+# Response used when a Gemini call fails
+ERROR_FALLBACK_RESPONSE = "I'm having trouble processing that right now, but I'm here to listen. How are you feeling?"
+
+def select_fallback_response(message, emotion=None):
+    """Pick a canned response by topic keywords, then by emotion."""
+    message_lower = message.lower()
+    if any(word in message_lower for word in ['microservice', 'micro service', 'microservices']):
+        response_key = 'microservices'
+    elif any(word in message_lower for word in ['architecture', 'design', 'structure', 'pattern']):
+        response_key = 'architecture'
+    elif emotion and emotion in FALLBACK_RESPONSES:
+        response_key = emotion
+    else:
+        response_key = 'neutral'
+    
+    return random.choice(FALLBACK_RESPONSES.get(response_key, FALLBACK_RESPONSES['neutral']))
+
+# Gemini prompt templates (PROMPT_TEMPLATE_VERSION), by request context
+_PROMPT_BODY = (
+    "{emotion_context}{history}User message:\n"
+    "{message}\n"
+    "\nPlease provide a helpful, empathetic response that:\n"
+    "- Shows understanding of their emotional state\n"
+    "- Offers support and encouragement\n"
+    "- Keeps the conversation engaging\n"
+    "- Is appropriate for an emotional support context"
+)
+PROMPT_TEMPLATE_SOURCES = {
+    'general': _PROMPT_BODY,
+    'conversation': "You are EmotiBot, an empathetic AI companion designed to help users with their emotional well-being.\n" + _PROMPT_BODY
+}
+EMOTION_CONTEXT_TEMPLATE = (
+    "The user's message indicates they are feeling {emotion} (confidence: {confidence:.2f}).\n"
+    "Respond with empathy and understanding, acknowledging their emotional state.\n"
+)
+HISTORY_TEMPLATE = "Previous conversation:\n{turns}\n\n"
+TURN_TEMPLATE = "{sender}: {content}"
+
+if PROMPT_BUILDER_AVAILABLE:
+    prompt_builders = {
+        context: PromptBuilder(
+            PromptTemplate(context, PROMPT_TEMPLATE_VERSION, source),
+            AI_PROMPT_TOKEN_BUDGET,
+            turn_template=PromptTemplate('turn', PROMPT_TEMPLATE_VERSION, TURN_TEMPLATE),
+            history_template=PromptTemplate('history', PROMPT_TEMPLATE_VERSION, HISTORY_TEMPLATE),
+            max_turns=AI_PROMPT_MAX_TURNS,
+            max_turn_tokens=AI_PROMPT_MAX_TURN_TOKENS
+        )
+        for context, source in PROMPT_TEMPLATE_SOURCES.items()
+    }
+else:
+    prompt_builders = None
+    logger.warning("Prompt builder library not available, prompts will not be trimmed to a token budget")
+
+def prompt_history(history):
+    """The last AI_PROMPT_MAX_TURNS history messages as {sender, content} turns."""
+    if not history or not AI_PROMPT_MAX_TURNS:
+        return []
+    return [
+        {'sender': msg.get('sender', 'user'), 'content': msg.get('content', '')}
+        for msg in history[-AI_PROMPT_MAX_TURNS:]
+    ]
+
+def build_prompt(message, emotion=None, confidence=None, context='general', history=None):
+    """Build the context-aware Gemini prompt within the token budget."""
+    if context not in PROMPT_TEMPLATE_SOURCES:
+        context = 'general'
+    emotion_context = ''
+    if emotion and confidence:
+        emotion_context = EMOTION_CONTEXT_TEMPLATE.format(emotion=emotion, confidence=confidence)
+    turns = prompt_history(history)
+    
+    if not prompt_builders:
+        history_text = HISTORY_TEMPLATE.format(turns='\n'.join(TURN_TEMPLATE.format(**turn) for turn in turns)) if turns else ''
+        return PROMPT_TEMPLATE_SOURCES[context].format(
+            emotion_context=emotion_context, history=history_text, message=message
+        )
+    
+    builder = prompt_builders[context]
+    prompt = builder.build(message, turns, emotion_context=emotion_context)
+    prompt_tokens.labels(template=builder.template.key).observe(prompt.tokens)
+    if prompt.truncated or prompt.dropped_turns:
+        logger.info(f"Trimmed prompt to {prompt.tokens} tokens ({prompt.dropped_turns} history turns dropped)")
+    return prompt.text
+
+def build_result(response, emotion, confidence, source):
+    """Response envelope returned to callers and cached."""
+    return {
+        'response': response,
+        'emotion_detected': emotion,
+        'confidence': confidence,
+        'source': source,
+        'cached': False
+    }
+
+def build_rejected_result(message, emotion, confidence, context, reason):
+    """Fallback for a Gemini call that was shed, turned away or over the latency budget (never cached)."""
+    logger.warning(f"Serving fallback response instead of Gemini ({reason})")
+    result = serve_pooled(emotion, confidence, context, reason)
+    if not result:
+        result = build_result(select_fallback_response(message, emotion), emotion, confidence, 'intelligent_fallback')
+        result['fallback_reason'] = reason
+    return result
+
+def gemini_call(prompt):
+    """Awaitable Gemini call for the upstream client's event loop."""
+    if GEMINI_API_BASE_URL:
+        # The SDK's async client has no REST transport
+        return asyncio.to_thread(model.generate_content, prompt)
+    return model.generate_content_async(prompt)
+
+def admit_gemini_call(priority, user):
+    """Wait for Gemini quota; raises QuotaExceeded if the call is shed."""
+    try:
+        waited = quota_scheduler.acquire(priority, user)
+    except QuotaExceeded as e:
+        quota_shed.labels(priority=priority, reason=e.reason).inc()
+        if e.reason == 'queue_timeout':
+            quota_queue_wait.labels(priority=priority).observe(quota_scheduler.max_wait[priority])
+        raise
+    quota_queue_wait.labels(priority=priority).observe(waited)
+
+def call_gemini(prompt, priority='standard', user='anonymous'):
+    """Blocking Gemini call within the quota, through the bulkhead and circuit breaker when available."""
+    if quota_scheduler:
+        admit_gemini_call(priority, user)
+    if gemini_client:
+        return gemini_client.call(lambda: gemini_call(prompt))
+    return model.generate_content(prompt)
+
+# Message used to pre-generate pooled responses
+POOL_PROMPT_MESSAGE = (
+    "(The user has not shared details yet.) Write a short, warm reply for someone "
+    "who is feeling {emotion}, without assuming anything about their situation."
+)
+
+def generate_pool_response(emotion, context):
+    """Generate a generic response for the (emotion, context) pool."""
+    prompt = build_prompt(POOL_PROMPT_MESSAGE.format(emotion=emotion), context=context)
+    return call_gemini(prompt, priority='batch', user='response-pool').text
+
+def gemini_idle():
+    """Whether Gemini has spare capacity for pool refills."""
+    if single_flight.in_flight or (quota_scheduler and quota_scheduler.queued()):
+        return False
+    if not gemini_client:
+        return True
+    return gemini_client.active == 0 and gemini_client.waiting == 0 and gemini_client.breaker.state == CLOSED
+
+def serve_pooled(emotion, confidence, context, reason):
+    """A pre-generated response for the emotion and context, or None."""
+    if not response_pool:
+        return None
+    entry = response_pool.take(emotion or 'neutral', context)
+    pool_lookups.labels(reason=reason, result='hit' if entry else 'miss').inc()
+    if not entry:
+        return None
+    pool_served_age.observe(entry['age'])
+    logger.info(f"Serving pre-generated {emotion or 'neutral'}/{context} response ({reason})")
+    result = build_result(entry['response'], emotion, confidence, 'pregenerated')
+    result['fallback_reason'] = reason
+    return result
+
+class ResponsePoolCollector:
+    """Exports pool sizes and freshness from the worker's last pass."""
+    
+    def collect(self):
+        entries = GaugeMetricFamily('ai_pool_entries', 'Fresh pre-generated responses', labels=['emotion', 'context'])
+        oldest = GaugeMetricFamily(
+            'ai_pool_oldest_age_seconds', 'Age of the oldest pre-generated response', labels=['emotion', 'context']
+        )
+        for (emotion, context), (count, age) in list(response_pool.stats.items()):
+            entries.add_metric([emotion, context], count)
+            oldest.add_metric([emotion, context], age)
+        yield entries
+        yield oldest
+
+if model and redis_client and AI_POOL_SIZE > 0:
+    response_pool = ResponsePool(
+        redis_client,
+        generate_pool_response,
+        [(emotion, context) for context in AI_POOL_CONTEXTS for emotion in AI_POOL_EMOTIONS],
+        size=AI_POOL_SIZE,
+        ttl=AI_POOL_TTL,
+        refill_interval=AI_POOL_REFILL_INTERVAL,
+        is_idle=gemini_idle,
+        key_prefix=f"ai_pool:v{PROMPT_TEMPLATE_VERSION}:{GEMINI_MODEL}:"
+    )
+    live_generations = ThreadPoolExecutor(max_workers=AI_LIVE_WORKERS, thread_name_prefix='ai-live')
+    REGISTRY.register(ResponsePoolCollector())
+    response_pool.start()
+    logger.info(f"Response pool enabled for {len(response_pool.pairs)} emotion/context pairs")
+else:
+    response_pool = None
+    live_generations = None
+
+def _generate_response(cache_key, message, emotion, confidence, context, history=None,
+                       priority='standard', user='anonymous'):
+    """Generate and cache a response; runs once per in-flight prompt."""
     if not model:
         # Fallback response when Gemini is not available
-        fallback_responses = {
-            'happy': [
-                "I'm so glad you're feeling happy! 😊 What's making your day special?",
-                "Your happiness is contagious! 🌟 What would you like to talk about?",
-                "It's wonderful to hear you're in good spirits! ✨"
-            ],
-            'sad': [
-                "I'm sorry you're feeling down. 😔 Would you like to talk about what's bothering you?",
-                "It's okay to feel sad sometimes. 💙 I'm here to listen if you need someone to talk to.",
-                "I understand this is a difficult time. 🌧️ What can I do to help?"
-            ],
-            'angry': [
-                "I can sense you're frustrated. 😤 Would you like to talk about what happened?",
-                "It's natural to feel angry sometimes. 🔥 What's on your mind?",
-                "I'm here to listen if you want to vent. 💪"
-            ],
-            'neutral': [
-                "Hello! How are you feeling today? 🤔",
-                "I'm here to chat! What's on your mind? 💭",
-                "How can I help you today? 😊"
-            ],
-            'microservices': [
-                "Microservices architecture is a great topic! 🏗️ It's an approach where applications are built as a collection of small, independent services that communicate over well-defined APIs. Each service is responsible for a specific business function and can be developed, deployed, and scaled independently.",
-                "Great question about microservices! 🔧 This architecture pattern breaks down large applications into smaller, manageable pieces. Benefits include better scalability, technology diversity, and fault isolation. However, it also introduces complexity in service communication and data consistency.",
-                "Microservices are fascinating! 🚀 Think of them as building blocks - each service handles one thing well and they work together to create a complete application. This EmotiBot demo is actually built using microservices architecture with separate services for authentication, emotion analysis, AI responses, and more!"
-            ],
-            'architecture': [
-                "Software architecture is the foundation of any good system! 🏛️ It defines how components interact, what patterns to use, and how to structure code for maintainability and scalability.",
-                "Architecture is crucial for building robust applications! 📐 Good architecture considers factors like performance, security, maintainability, and future growth.",
-                "Great question about architecture! 🎯 It's about making strategic decisions on how to organize and structure software systems to meet both current and future requirements."
-            ]
-        }
-        
-        # Simple keyword-based response selection
-        message_lower = message.lower()
-        if any(word in message_lower for word in ['microservice', 'micro service', 'microservices']):
-            response_key = 'microservices'
-        elif any(word in message_lower for word in ['architecture', 'design', 'structure', 'pattern']):
-            response_key = 'architecture'
-        elif emotion and emotion in fallback_responses:
-            response_key = emotion
-        else:
-            response_key = 'neutral'
-        
-        import random
-        response = random.choice(fallback_responses.get(response_key, fallback_responses['neutral']))
-        
-        result = {
-            'response': response,
-            'emotion_detected': emotion,
-            'confidence': confidence,
-            'source': 'intelligent_fallback',
-            'cached': False
-        }
-        
+        result = build_result(select_fallback_response(message, emotion), emotion, confidence, 'intelligent_fallback')
         cache_response(cache_key, result)
         return result
     
+    prompt = build_prompt(message, emotion, confidence, context, history)
     try:
-        # Build context-aware prompt
-        prompt_parts = []
-        
-        if context == 'conversation':
-            prompt_parts.append("You are EmotiBot, an empathetic AI companion designed to help users with their emotional well-being.")
-        
-        if emotion and confidence:
-            prompt_parts.append(f"The user's message indicates they are feeling {emotion} (confidence: {confidence:.2f}).")
-            prompt_parts.append("Respond with empathy and understanding, acknowledging their emotional state.")
-        
-        prompt_parts.append("User message:")
-        prompt_parts.append(message)
-        
-        prompt_parts.append("\nPlease provide a helpful, empathetic response that:")
-        prompt_parts.append("- Shows understanding of their emotional state")
-        prompt_parts.append("- Offers support and encouragement")
-        prompt_parts.append("- Keeps the conversation engaging")
-        prompt_parts.append("- Is appropriate for an emotional support context")
-        
-        full_prompt = "\n".join(prompt_parts)
-        
         # Generate response
-        response = model.generate_content(full_prompt)
+        response = call_gemini(prompt, priority, user)
         
-        result = {
-            'response': response.text,
-            'emotion_detected': emotion,
-            'confidence': confidence,
-            'source': 'gemini',
-            'cached': False
-        }
+        result = build_result(response.text, emotion, confidence, 'gemini')
         
         # Cache the response
         cache_response(cache_key, result)
@@ -251,20 +670,227 @@ def generate_emotion_aware_response(message, emotion=None, confidence=None, cont
         return result
         
     except Exception as e:
+        if quota_scheduler and isinstance(e, QuotaExceeded):
+            return build_rejected_result(message, emotion, confidence, context, f"quota_{e.reason}")
+        if gemini_client and isinstance(e, UpstreamRejected):
+            upstream_rejections.labels(reason=e.reason).inc()
+            return build_rejected_result(message, emotion, confidence, context, e.reason)
         logger.error(f"Error generating AI response: {e}")
-        
-        # Fallback response
-        fallback = "I'm having trouble processing that right now, but I'm here to listen. How are you feeling?"
-        
-        result = {
-            'response': fallback,
-            'emotion_detected': emotion,
-            'confidence': confidence,
-            'source': 'error_fallback',
-            'cached': False
-        }
-        
-        return result
+        return serve_pooled(emotion, confidence, context, 'error') or \
+            build_result(ERROR_FALLBACK_RESPONSE, emotion, confidence, 'error_fallback')
+
+def stream_emotion_aware_response(message, emotion=None, confidence=None, context='general',
+                                  priority='standard', user='anonymous'):
+    """
+    Generate a response as a stream of events.
+    
+    Yields {'type': 'chunk', 'text': ...} events as Gemini produces text,
+    then one {'type': 'done', ...result} event with the whole response. The
+    assembled response is cached once complete; cached and fallback
+    responses arrive as a single chunk.
+    """
+    started = time.monotonic()
+    cache_key = ai_response_cache_key(message, emotion, confidence, context)
+    
+    result = get_cached_response(cache_key)
+    if not result and not model:
+        result = build_result(select_fallback_response(message, emotion), emotion, confidence, 'intelligent_fallback')
+        cache_response(cache_key, result)
+    if not result and quota_scheduler:
+        try:
+            admit_gemini_call(priority, user)
+        except QuotaExceeded as e:
+            result = build_rejected_result(message, emotion, confidence, context, f"quota_{e.reason}")
+    # Streams hold a request thread rather than a bulkhead slot, but still
+    # honour the circuit breaker and feed it their outcome
+    if not result and gemini_client and not gemini_client.breaker.allow():
+        upstream_rejections.labels(reason='circuit_open').inc()
+        result = build_rejected_result(message, emotion, confidence, context, 'circuit_open')
+    if result:
+        time_to_first_token.labels(source=result.get('source', 'cache')).observe(time.monotonic() - started)
+        yield {'type': 'chunk', 'text': result['response']}
+        yield {'type': 'done', **result}
+        return
+    
+    chunks = []
+    # The breaker judges streams by time to first chunk: a long reply is not a slow call
+    call_started = time.monotonic()
+    first_chunk_seconds = None
+    try:
+        for chunk in model.generate_content(build_prompt(message, emotion, confidence, context), stream=True):
+            text = chunk.text
+            if not text:
+                continue
+            if not chunks:
+                first_chunk_seconds = time.monotonic() - call_started
+                time_to_first_token.labels(source='gemini').observe(time.monotonic() - started)
+            chunks.append(text)
+            yield {'type': 'chunk', 'text': text}
+    except GeneratorExit:
+        # Client went away; do not hold a half-open probe forever
+        if gemini_client:
+            gemini_client.breaker.release()
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming AI response: {e}")
+        if gemini_client:
+            gemini_client.breaker.record(False, time.monotonic() - call_started)
+        if not chunks:
+            result = serve_pooled(emotion, confidence, context, 'error') or \
+                build_result(ERROR_FALLBACK_RESPONSE, emotion, confidence, 'error_fallback')
+            yield {'type': 'chunk', 'text': result['response']}
+            yield {'type': 'done', **result}
+            return
+        # Keep what the client already has, but never cache a partial response
+        yield {'type': 'done', **build_result(''.join(chunks), emotion, confidence, 'gemini'), 'truncated': True}
+        return
+    
+    if gemini_client:
+        gemini_client.breaker.record(
+            True, first_chunk_seconds if first_chunk_seconds is not None else time.monotonic() - call_started
+        )
+    result = build_result(''.join(chunks), emotion, confidence, 'gemini')
+    cache_response(cache_key, result)
+    logger.info(f"Streamed AI response for emotion: {emotion} ({len(chunks)} chunks)")
+    yield {'type': 'done', **result}
+
+def job_key(job_id):
+    return f"ai_job:{job_id}"
+
+def job_record(job_id, job, status, **fields):
+    """
+    A job's stored status. Carries the caller's correlation_id and the job's
+    owner (the submitting service and the user it is for), who alone may
+    read it back.
+    """
+    return dict({
+        'job_id': job_id,
+        'correlation_id': job.get('correlation_id'),
+        'owner': job.get('owner'),
+        'status': status
+    }, **fields)
+
+def public_job_record(record):
+    """A stored job status as returned to its owner."""
+    return {key: value for key, value in record.items() if key != 'owner'}
+
+def store_job(job_id, record):
+    """Keep a generation job's status for pickup."""
+    if not redis_client:
+        return
+    try:
+        redis_client.setex(job_key(job_id), AI_JOB_RESULT_TTL, json.dumps(record))
+    except Exception as e:
+        logger.error(f"Redis job store error: {e}")
+
+def valid_reply_to(routing_key):
+    """Whether a job's result may be published under routing_key (ai.response.<name>)."""
+    return (
+        isinstance(routing_key, str)
+        and routing_key.startswith(AI_JOB_REPLY_PREFIX)
+        and len(routing_key) > len(AI_JOB_REPLY_PREFIX)
+        and not any(char in routing_key for char in '*# ')
+    )
+
+def owns_job(job):
+    """Whether the authenticated caller submitted the job (as a service or as its user)."""
+    owner = job.get('owner') or {}
+    service = authenticated_service()
+    if service:
+        return service == owner.get('service')
+    user_id = request_user_id()
+    return user_id is not None and str(user_id) == str(owner.get('user_id'))
+
+def get_job(job_id):
+    """A generation job's stored status, or None."""
+    return get_cached_response(job_key(job_id))
+
+# pika connections are not thread-safe; request and job threads share queue_client
+job_publish_lock = threading.Lock()
+
+def run_generation_job(message):
+    """
+    Generate the response for one queued job.
+    
+    The outcome is stored for pickup and, if the job names a reply_to
+    routing key, published there with the job's reply_context. Always
+    returns True so the job is acknowledged: failures are reported to the
+    caller rather than retried.
+    """
+    job = message.get('data') or {}
+    caller = (message.get('metadata') or {}).get('service')
+    job_id = job.get('job_id')
+    if not job_id or not str(job.get('message') or '').strip():
+        logger.warning(f"Dropping generation job without a job_id or message from {caller}")
+        generation_jobs.labels(status='invalid').inc()
+        return True
+    
+    # Jobs published straight to the broker belong to the publishing service
+    job.setdefault('owner', {'service': caller, 'user_id': job.get('user_id')})
+    existing = get_job(job_id)
+    if existing and existing.get('owner') != job['owner']:
+        logger.warning(f"Dropping generation job {job_id} from {caller}: the job_id belongs to another caller")
+        generation_jobs.labels(status='invalid').inc()
+        return True
+    
+    if job.get('submitted_at'):
+        job_queue_latency.observe(max(0.0, time.time() - job['submitted_at']))
+    store_job(job_id, job_record(job_id, job, 'running'))
+    
+    context = job.get('context', 'general')
+    try:
+        # Nobody is waiting on the request, so skip the latency budget
+        result = generate_emotion_aware_response(
+            message=job['message'].strip(),
+            emotion=job.get('emotion'),
+            confidence=job.get('confidence'),
+            context=context,
+            history=job.get('history'),
+            priority=request_priority(context, caller),
+            user=quota_user(job.get('user_id'), caller),
+            latency_budget=None
+        )
+        record = job_record(job_id, job, 'done', result=result)
+    except Exception as e:
+        logger.error(f"Generation job {job_id} failed: {e}")
+        record = job_record(job_id, job, 'failed', error='Failed to generate response')
+    record['completed_at'] = datetime.utcnow().isoformat()
+    
+    store_job(job_id, record)
+    reply_to = job.get('reply_to')
+    if reply_to and valid_reply_to(reply_to):
+        # Jobs run off the consumer's thread, so reply on the shared connection
+        with job_publish_lock:
+            queue_client.publish_event(reply_to, dict(public_job_record(record), reply_context=job.get('reply_context')))
+    elif reply_to:
+        logger.warning(f"Not publishing generation job {job_id} result to {reply_to} from {caller}")
+    generation_jobs.labels(status=record['status']).inc()
+    logger.info(f"Generation job {job_id} {record['status']}")
+    return True
+
+def start_job_workers():
+    """
+    Start AI_JOB_WORKERS job consumers, each on its own connection.
+    
+    Jobs run off the consumer thread, which keeps the connection alive and
+    reconnects if the broker drops it; unacknowledged jobs are redelivered.
+    """
+    for _ in range(AI_JOB_WORKERS):
+        client = get_queue_client('ai-service')
+        started = client.consume_queue(
+            AI_JOB_QUEUE,
+            run_generation_job,
+            prefetch_count=AI_JOB_PREFETCH,
+            queue_arguments=AI_JOB_QUEUE_ARGUMENTS,
+            routing_key='ai.generate',
+            # A Gemini call can outlast the connection's heartbeat timeout
+            long_running=True
+        )
+        if not started:
+            logger.warning("Could not start generation job workers")
+            return
+    logger.info(f"Started {AI_JOB_WORKERS} generation job workers on {AI_JOB_QUEUE}")
+
 
 @app.route('/health', methods=['GET'])
 @metrics.counter('health_checks', 'Number of health check requests')
@@ -285,21 +911,14 @@ def health_check():
 @metrics.counter('ai_generation_requests', 'Number of AI generation requests')
 def generate_response():
     """Generate AI response for user message."""
-    # Check for authentication but don't require it (demo mode)
-    auth_header = request.headers.get('Authorization')
-    user_data = None
-    user_id = 'anonymous'
-    
-    if auth_header and auth_header.startswith('Bearer '):
-        token = auth_header.split(' ')[1]
-        is_valid, user_data = verify_user_token(token)
-        if is_valid and user_data:
-            user_id = user_data.get('user_id', 'anonymous')
-    
     data = request.get_json()
     if not data:
         return jsonify({'error': 'JSON data required'}), 400
     
+    # Authentication is optional (demo mode); calling services pass the
+    # user along for fair queueing, vouched for by their service token
+    user_id = request_user_id(data) or 'anonymous'
+    
     message = data.get('message', '').strip()
     emotion = data.get('emotion')
     confidence = data.get('confidence')
@@ -314,7 +933,9 @@ def generate_response():
             message=message,
             emotion=emotion,
             confidence=confidence,
-            context=context
+            context=context,
+            priority=request_priority(context, authenticated_service()),
+            user=quota_user(user_id, request_caller())
         )
         
         logger.info(f"Generated AI response for user {user_id}")
@@ -325,6 +946,38 @@ def generate_response():
         logger.error(f"Error generating response: {e}")
         return jsonify({'error': 'Failed to generate response'}), 500
 
+@app.route('/api/ai/generate/stream', methods=['POST'])
+@metrics.counter('ai_stream_requests', 'Number of streaming AI generation requests')
+def generate_response_stream():
+    """
+    Generate an AI response, streamed as NDJSON events.
+    
+    Each line is a {"type": "chunk", "text": ...} event as text arrives;
+    the last line is {"type": "done", ...} with the complete response.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'JSON data required'}), 400
+    
+    message = data.get('message', '').strip()
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+    
+    context = data.get('context', 'general')
+    events = stream_emotion_aware_response(
+        message=message,
+        emotion=data.get('emotion'),
+        confidence=data.get('confidence'),
+        context=context,
+        priority=request_priority(context, authenticated_service()),
+        user=quota_user(request_user_id(data), request_caller())
+    )
+    
+    return Response(
+        stream_with_context(json.dumps(event) + '\n' for event in events),
+        mimetype='application/x-ndjson'
+    )
+
 @app.route('/api/ai/chat', methods=['POST'])
 @metrics.counter('ai_chat_requests', 'Number of AI chat requests')
 def chat():
@@ -352,24 +1005,13 @@ def chat():
     user_id = user_data.get('user_id')
     
     try:
-        # Build conversation context
-        context_parts = []
-        if conversation_history:
-            context_parts.append("Previous conversation:")
-            for msg in conversation_history[-5:]:  # Last 5 messages for context
-                context_parts.append(f"{msg.get('sender', 'user')}: {msg.get('content', '')}")
-            context_parts.append("\nCurrent message:")
-        else:
-            context_parts.append("Starting new conversation:")
-        
-        context_parts.append(message)
-        
-        full_context = "\n".join(context_parts)
-        
-        # Generate response with conversation context
+        # Generate response with conversation context (trimmed to the prompt budget)
         ai_response = generate_emotion_aware_response(
-            message=full_context,
-            context='conversation'
+            message=message,
+            context='conversation',
+            history=conversation_history,
+            priority=request_priority('conversation', authenticated_service()),
+            user=quota_user(user_id, request_caller())
         )
         
         logger.info(f"Generated chat response for user {user_id}")
@@ -380,6 +1022,73 @@ def chat():
         logger.error(f"Error in chat: {e}")
         return jsonify({'error': 'Failed to process chat'}), 500
 
+@app.route('/api/ai/jobs', methods=['POST'])
+@metrics.counter('ai_job_submissions', 'Number of AI generation job submissions')
+def submit_job():
+    """
+    Queue a generation job and return its job_id at once (202).
+    
+    Takes the /api/ai/generate fields plus optional correlation_id (the
+    caller's own ID, echoed back with the job), reply_to (an ai.response.* routing key to publish the
+    result on) and reply_context (returned with the result). Poll
+    /api/ai/jobs/<job_id> for the outcome. Requires a service token or a
+    user's bearer token; the job_id is always assigned here.
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'JSON data required'}), 400
+    
+    service = authenticated_service()
+    user_id = request_user_id(data)
+    if not service and user_id is None:
+        return jsonify({'error': 'Authorization required'}), 401
+    
+    message = data.get('message', '').strip()
+    if not message:
+        return jsonify({'error': 'Message is required'}), 400
+    
+    reply_to = data.get('reply_to')
+    if reply_to and not valid_reply_to(reply_to):
+        return jsonify({'error': f"reply_to must be an {AI_JOB_REPLY_PREFIX}* routing key"}), 400
+    if not queue_client or not (redis_client or reply_to):
+        return jsonify({'error': 'Generation jobs are not available'}), 503
+    
+    job_id = uuid.uuid4().hex
+    job = {
+        'message': message,
+        'emotion': data.get('emotion'),
+        'confidence': data.get('confidence'),
+        'context': data.get('context', 'general'),
+        'history': data.get('history'),
+        'user_id': user_id,
+        'reply_context': data.get('reply_context'),
+        'correlation_id': data.get('correlation_id'),
+        'owner': {'service': service, 'user_id': None if service else user_id}
+    }
+    store_job(job_id, job_record(job_id, job, 'queued'))
+    with job_publish_lock:
+        published = queue_client.publish_generation_job(job, job_id=job_id, reply_to=reply_to)
+    if not published:
+        store_job(job_id, job_record(job_id, job, 'failed', error='Could not queue job'))
+        return jsonify({'error': 'Failed to queue job'}), 503
+    
+    logger.info(f"Queued generation job {job_id}")
+    return jsonify(public_job_record(job_record(job_id, job, 'queued'))), 202
+
+@app.route('/api/ai/jobs/<job_id>', methods=['GET'])
+@metrics.counter('ai_job_lookups', 'Number of AI generation job lookups')
+def get_job_status(job_id):
+    """
+    Status of a generation job: queued, running, done (with result) or failed.
+    
+    Only the service that submitted the job, or the user who submitted it,
+    may read it; anyone else gets 404.
+    """
+    job = get_job(job_id)
+    if not job or not owns_job(job):
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(public_job_record(job)), 200
+
 @app.route('/api/ai/suggestions', methods=['GET'])
 @metrics.counter('ai_suggestion_requests', 'Number of AI suggestion requests')
 def get_suggestions():
@@ -406,7 +1115,6 @@ def get_suggestions():
             "How can I help you feel better?"
         ]
         
-        import random
         selected_suggestions = random.sample(suggestions, 4)
         
         return jsonify({
@@ -426,6 +1134,10 @@ def get_ai_status():
             'service': 'ai-service',
             'status': 'operational',
             'gemini_available': model is not None,
+            'circuit_state': gemini_client.breaker.state if gemini_client else None,
+            'job_workers': AI_JOB_WORKERS if queue_client else 0,
+            'quota_queued': quota_scheduler.queued() if quota_scheduler else None,
+            'pool_entries': sum(count for count, _age in response_pool.stats.values()) if response_pool else None,
             'cache_available': redis_client is not None,
             'queue_available': queue_client is not None,
             'timestamp': datetime.utcnow().isoformat(),
@@ -433,6 +1145,10 @@ def get_ai_status():
                 'emotion-aware responses',
                 'conversation context',
                 'response caching',
+                'streaming responses',
+                'quota scheduling',
+                'generation jobs',
+                'pre-generated responses',
                 'fallback responses'
             ]
         }
@@ -451,5 +1167,9 @@ def not_found(error):
 def server_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+if queue_client and AI_JOB_WORKERS > 0:
+    # Connecting retries for a while; do not hold up startup
+    threading.Thread(target=start_job_workers, name='ai-job-workers', daemon=True).start()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8005, debug=False) 
\ No newline at end of file
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures for the AI Service unit tests
+"""
+
+import pytest
+
+
+class FakePipeline:
+    """Queues commands and runs them against the FakeRedis on execute()."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue_command(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue_command
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+
+class FakeRedis:
+    """
+    The subset of redis-py the AI Service uses: strings with SET NX PX,
+    lists, the lock release script and pipelines.
+
+    Values live in the values dict (strings, or lists for list keys); TTLs
+    are accepted but never expire anything.
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, nx=False, px=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+        return True
+
+    def expire(self, key, seconds):
+        return key in self.values
+
+    def pexpire(self, key, milliseconds):
+        return key in self.values
+
+    def eval(self, script, numkeys, key, token):
+        # Only the lock release script is used: delete the key if we hold it
+        if self.values.get(key) == token:
+            del self.values[key]
+            return 1
+        return 0
+
+    def lpush(self, key, value):
+        self.values.setdefault(key, []).insert(0, value)
+        return len(self.values[key])
+
+    def lrange(self, key, start, end):
+        items = self.values.get(key, [])
+        return list(items[start:] if end == -1 else items[start:end + 1])
+
+    def lrem(self, key, count, value):
+        items = self.values.get(key, [])
+        if value in items:
+            items.remove(value)
+            return 1
+        return 0
+
+    def rpoplpush(self, source, destination):
+        items = self.values.get(source)
+        if not items:
+            return None
+        item = items.pop()
+        self.values.setdefault(destination, []).insert(0, item)
+        return item
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def fake_redis():
+    """An empty in-memory stand-in for the Redis client."""
+    return FakeRedis()
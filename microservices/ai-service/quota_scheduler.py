@@ -0,0 +1,167 @@
+"""
+Quota Scheduler - Admits Gemini calls at the rate the upstream quota allows.
+Calls take a token from a token bucket; when none is left they wait in one
+queue per priority, served highest priority first and round robin between
+users within a priority, so one busy user cannot starve the others. When
+the queues are full, the newest lowest-priority waiter is shed first.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class QuotaExceeded(Exception):
+    """A call was shed instead of waiting for quota ('shed' or 'queue_timeout')."""
+
+    def __init__(self, reason, priority):
+        super().__init__(f"Gemini quota exceeded for {priority} call ({reason})")
+        self.reason = reason
+        self.priority = priority
+
+
+class TokenBucket:
+    """rate tokens per second, holding at most burst. Not thread-safe; callers lock."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self):
+        """Seconds until the next token is available."""
+        self._refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class _Waiter:
+    __slots__ = ('priority', 'user', 'event', 'granted', 'shed')
+
+    def __init__(self, priority, user):
+        self.priority = priority
+        self.user = user
+        self.event = threading.Event()
+        self.granted = False
+        self.shed = False
+
+
+class QuotaScheduler:
+    """
+    Priority queues in front of a token bucket.
+
+    priorities lists the priority names highest first; max_wait maps each
+    to how long its callers may queue. At most max_queued calls wait in
+    total and at most max_queued_per_user per user and priority.
+    """
+
+    def __init__(self, rate, burst, priorities, max_wait, max_queued=100, max_queued_per_user=5):
+        self.bucket = TokenBucket(rate, burst)
+        self.priorities = list(priorities)
+        self.max_wait = dict(max_wait)
+        self.max_queued = max_queued
+        self.max_queued_per_user = max_queued_per_user
+        # priority -> user -> waiters; users rotate to the back once served
+        self._queues = {priority: OrderedDict() for priority in self.priorities}
+        self._lock = threading.Lock()
+
+    def queued(self, priority=None):
+        """Calls waiting for quota, in one priority or in all of them."""
+        priorities = [priority] if priority else self.priorities
+        return sum(len(waiters) for p in priorities for waiters in self._queues[p].values())
+
+    @property
+    def tokens(self):
+        with self._lock:
+            self.bucket._refill()
+            return self.bucket.tokens
+
+    def acquire(self, priority, user):
+        """
+        Wait for a token; returns the seconds spent queued.
+
+        Raises QuotaExceeded if the call is shed or waits longer than its
+        priority's max_wait.
+        """
+        started = time.monotonic()
+        deadline = started + self.max_wait[priority]
+        with self._lock:
+            if not self.queued() and self.bucket.take():
+                return 0.0
+            waiter = self._enqueue(priority, user)
+
+        while True:
+            with self._lock:
+                self._dispatch()
+                if waiter.granted:
+                    return time.monotonic() - started
+                if waiter.shed:
+                    raise QuotaExceeded('shed', priority)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._remove(waiter)
+                    raise QuotaExceeded('queue_timeout', priority)
+                delay = min(remaining, self.bucket.wait_time())
+            waiter.event.wait(delay)
+
+    def _enqueue(self, priority, user):
+        waiters = self._queues[priority].get(user)
+        if waiters and len(waiters) >= self.max_queued_per_user:
+            raise QuotaExceeded('shed', priority)
+        if self.queued() >= self.max_queued and not self._shed_below(priority):
+            raise QuotaExceeded('shed', priority)
+        waiter = _Waiter(priority, user)
+        self._queues[priority].setdefault(user, deque()).append(waiter)
+        return waiter
+
+    def _shed_below(self, priority):
+        """Shed the newest waiter of the lowest priority below priority; False if there is none."""
+        rank = self.priorities.index(priority)
+        for lower in reversed(self.priorities[rank + 1:]):
+            users = self._queues[lower]
+            if users:
+                # The user with the most waiters loses one first
+                user = max(users, key=lambda u: len(users[u]))
+                waiter = users[user].pop()
+                if not users[user]:
+                    del users[user]
+                waiter.shed = True
+                waiter.event.set()
+                return True
+        return False
+
+    def _remove(self, waiter):
+        users = self._queues[waiter.priority]
+        waiters = users.get(waiter.user)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del users[waiter.user]
+
+    def _dispatch(self):
+        """Hand available tokens to waiters, highest priority first, round robin by user."""
+        for priority in self.priorities:
+            users = self._queues[priority]
+            while users:
+                if not self.bucket.take():
+                    return
+                user, waiters = next(iter(users.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                waiter.granted = True
+                waiter.event.set()
@@ -0,0 +1,144 @@
+"""
+Response Pool - Pre-generated responses kept warm per (emotion, context).
+A background worker fills each pool through Gemini while the service is
+idle, so requests that cannot wait for a live call get a recent
+model-written response instead of a canned one. Pools are Redis lists
+shared by all replicas, and one replica at a time refills them.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class ResponsePool:
+    """
+    Rotating pools of at most size responses per (emotion, context).
+
+    Entries older than ttl seconds are never served. Once every pool is
+    full, the worker replaces entries older than half the ttl, oldest
+    first, so pools keep rotating while the service is idle.
+    """
+
+    def __init__(self, redis_client, generate, pairs, size=5, ttl=1800, refill_interval=5.0,
+                 is_idle=None, key_prefix='ai_pool:'):
+        self.redis_client = redis_client
+        self.generate = generate
+        self.pairs = list(pairs)
+        self.size = size
+        self.ttl = ttl
+        self.refill_interval = refill_interval
+        self.is_idle = is_idle or (lambda: True)
+        self.key_prefix = key_prefix
+        self.stats = {}  # (emotion, context) -> (entries, oldest age in seconds)
+        self._token = uuid.uuid4().hex
+        self._stop = threading.Event()
+
+    def key(self, emotion, context):
+        return f"{self.key_prefix}{context}:{emotion}"
+
+    def take(self, emotion, context):
+        """
+        Next fresh entry for (emotion, context) as {'response', 'generated_at', 'age'}, or None.
+
+        Entries are served round robin: each take rotates the list.
+        """
+        if (emotion, context) not in self.pairs:
+            return None
+        key = self.key(emotion, context)
+        try:
+            for _ in range(self.size):
+                raw = self.redis_client.rpoplpush(key, key)
+                if raw is None:
+                    return None
+                entry = json.loads(raw)
+                entry['age'] = time.time() - entry['generated_at']
+                if entry['age'] <= self.ttl:
+                    return entry
+        except Exception as e:
+            logger.error(f"Response pool read error: {e}")
+        return None
+
+    def _entries(self, key):
+        entries = []
+        for raw in self.redis_client.lrange(key, 0, -1):
+            entries.append((raw, time.time() - json.loads(raw)['generated_at']))
+        return entries
+
+    def _holds_filler_lock(self):
+        """One replica refills at a time; the lease lapses if it stops."""
+        lock_key = f"{self.key_prefix}filler"
+        lease_ms = int(self.refill_interval * 3000)
+        if self.redis_client.set(lock_key, self._token, nx=True, px=lease_ms):
+            return True
+        if self.redis_client.get(lock_key) == self._token:
+            self.redis_client.pexpire(lock_key, lease_ms)
+            return True
+        return False
+
+    def refill_once(self):
+        """
+        Prune stale entries and refresh stats, then add or replace one entry
+        if the service is idle and this replica is the filler. Returns True
+        if a response was generated.
+        """
+        needs = []
+        for emotion, context in self.pairs:
+            key = self.key(emotion, context)
+            entries = self._entries(key)
+            fresh = []
+            for raw, age in entries:
+                if age > self.ttl:
+                    self.redis_client.lrem(key, 1, raw)
+                else:
+                    fresh.append((raw, age))
+            oldest = max((age for _raw, age in fresh), default=0.0)
+            self.stats[(emotion, context)] = (len(fresh), oldest)
+            if len(fresh) < self.size:
+                needs.append((0, len(fresh), emotion, context, None))
+            elif oldest > self.ttl / 2:
+                oldest_raw = max(fresh, key=lambda item: item[1])[0]
+                needs.append((1, -oldest, emotion, context, oldest_raw))
+
+        if not needs or not self.is_idle() or not self._holds_filler_lock():
+            return False
+
+        # Emptiest pool first, then the stalest full pool
+        _replace, _rank, emotion, context, replaced = min(needs, key=lambda need: need[:2])
+        try:
+            response = self.generate(emotion, context)
+        except Exception as e:
+            logger.warning(f"Response pool generation failed for {emotion}/{context}: {e}")
+            return False
+
+        key = self.key(emotion, context)
+        entry = json.dumps({'response': response, 'generated_at': time.time()})
+        pipe = self.redis_client.pipeline()
+        pipe.lpush(key, entry)
+        if replaced:
+            pipe.lrem(key, 1, replaced)
+        pipe.expire(key, int(self.ttl))
+        pipe.execute()
+        logger.info(f"Pre-generated a {emotion}/{context} response")
+        return True
+
+    def run(self):
+        # At most one generation per refill_interval, so filling never competes with live traffic
+        while not self._stop.is_set():
+            try:
+                self.refill_once()
+            except Exception as e:
+                logger.error(f"Response pool refill error: {e}")
+            self._stop.wait(self.refill_interval)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name='response-pool', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
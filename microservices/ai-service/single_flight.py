@@ -0,0 +1,128 @@
+"""
+Single Flight - Coalesces concurrent calls that share a key.
+The first caller for a key runs the call and callers arriving while it is
+in flight wait for its result. Across replicas a short Redis lock elects
+one leader, and the other replicas poll the shared cache for its result.
+"""
+
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if this caller still holds it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Where a result came from
+LEADER = 'leader'      # this caller ran the call
+LOCAL = 'local'        # another thread in this process ran it
+REPLICA = 'replica'    # another replica ran it and cached the result
+
+
+class _Call:
+    """One in-flight call and the result its waiters receive."""
+
+    __slots__ = ('done', 'result', 'source', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.source = LEADER
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time, in-process and across replicas."""
+
+    def __init__(self, redis_client=None, lock_prefix='inflight:', lock_ttl=30.0, poll_interval=0.05):
+        self.redis_client = redis_client
+        self.lock_prefix = lock_prefix
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self):
+        return len(self._calls)
+
+    def do(self, key, func, get_cached=None):
+        """
+        Return (result, source) for key, calling func only if no identical
+        call is already running.
+
+        get_cached() returns the shared cached result or None; it is polled
+        while another replica holds the lock, and checked again once the
+        lock is acquired. Exceptions from func are raised in every waiter.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error:
+                raise call.error
+            return call.result, LOCAL
+
+        try:
+            call.result, call.source = self._run_locked(key, func, get_cached)
+            return call.result, call.source
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _run_locked(self, key, func, get_cached):
+        """Run func under the replica-wide lock, or wait for the replica holding it."""
+        if not self.redis_client:
+            return func(), LEADER
+
+        lock_key = f"{self.lock_prefix}{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_ttl
+
+        while True:
+            try:
+                acquired = self.redis_client.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+            except Exception as e:
+                logger.error(f"Single-flight lock error: {e}")
+                return func(), LEADER
+
+            if acquired:
+                try:
+                    # The previous holder may have finished between our checks
+                    cached = get_cached() if get_cached else None
+                    if cached is not None:
+                        return cached, REPLICA
+                    return func(), LEADER
+                finally:
+                    self._release(lock_key, token)
+
+            cached = get_cached() if get_cached else None
+            if cached is not None:
+                return cached, REPLICA
+
+            if time.monotonic() >= deadline:
+                # The holder is stuck or its result was not cached; stop waiting
+                logger.warning(f"Gave up waiting for in-flight call {key}")
+                return func(), LEADER
+            time.sleep(self.poll_interval)
+
+    def _release(self, lock_key, token):
+        try:
+            self.redis_client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            logger.error(f"Single-flight unlock error: {e}")
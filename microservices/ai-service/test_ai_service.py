@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Unit tests for AI Service generation jobs
+"""
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+# Add the current directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Mock environment variables before importing app
+os.environ.update({
+    'AUTH_SERVICE_URL': 'http://localhost:8002',
+    'SERVICE_SECRET': 'test-service-secret',
+    'REDIS_HOST': 'localhost',
+    'REDIS_PORT': '6379',
+    'AI_JOB_WORKERS': '0'
+})
+os.environ.pop('GEMINI_API_KEY', None)
+
+import app as app_module
+from app import app
+
+
+class FakeQueueClient:
+    """Records published jobs and events instead of talking to RabbitMQ."""
+
+    def __init__(self):
+        self.jobs = []
+        self.events = []
+
+    def publish_generation_job(self, request, job_id=None, reply_to=None, correlation_id=None):
+        job = dict(request, job_id=job_id)
+        if reply_to:
+            job['reply_to'] = reply_to
+        # Round-trip through JSON like the broker does
+        self.jobs.append({'data': json.loads(json.dumps(job)), 'metadata': {'service': 'ai-service'}})
+        return job_id
+
+    def publish_event(self, routing_key, message):
+        self.events.append((routing_key, message))
+        return True
+
+
+def service_headers(service='conversation-service'):
+    now = datetime.utcnow()
+    token = jwt.encode({'service': service, 'iat': now, 'exp': now + timedelta(minutes=5)},
+                       'test-service-secret', algorithm='HS256')
+    return {'Authorization': f'Bearer {token}', 'X-Service-Name': service}
+
+
+@pytest.fixture
+def queue(monkeypatch, fake_redis):
+    queue = FakeQueueClient()
+    monkeypatch.setattr(app_module, 'queue_client', queue)
+    monkeypatch.setattr(app_module, 'redis_client', fake_redis)
+    monkeypatch.setattr(app_module, 'SERVICE_SECRET', 'test-service-secret')
+    return queue
+
+
+@pytest.fixture
+def client(queue):
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def submit(client, headers=None, **fields):
+    data = {'message': 'I had a rough day at work', 'emotion': 'sad', 'confidence': 0.8}
+    data.update(fields)
+    return client.post('/api/ai/jobs', json=data, headers=headers or service_headers())
+
+
+class TestJobLifecycle:
+    """Test a job from submission to its result."""
+
+    def test_submit_then_done(self, client, queue):
+        """A submitted job is queued, then reports its result once run."""
+        response = submit(client, correlation_id='turn-42')
+        assert response.status_code == 202
+        job_id = response.json['job_id']
+        assert response.json['status'] == 'queued'
+        assert response.json['correlation_id'] == 'turn-42'
+
+        status = client.get(f'/api/ai/jobs/{job_id}', headers=service_headers())
+        assert status.status_code == 200
+        assert status.json['status'] == 'queued'
+
+        assert len(queue.jobs) == 1
+        assert app_module.run_generation_job(queue.jobs[0]) is True
+
+        status = client.get(f'/api/ai/jobs/{job_id}', headers=service_headers())
+        assert status.json['status'] == 'done'
+        assert status.json['correlation_id'] == 'turn-42'
+        assert status.json['result']['response']
+        assert 'owner' not in status.json
+
+    def test_failed_job_reported(self, client, queue, monkeypatch):
+        """A job whose generation raises is stored as failed and still acknowledged."""
+        def failing_generation(**kwargs):
+            raise RuntimeError('Gemini unavailable')
+
+        monkeypatch.setattr(app_module, 'generate_emotion_aware_response', failing_generation)
+        job_id = submit(client).json['job_id']
+        assert app_module.run_generation_job(queue.jobs[0]) is True
+
+        status = client.get(f'/api/ai/jobs/{job_id}', headers=service_headers())
+        assert status.json['status'] == 'failed'
+        assert 'error' in status.json
+
+    def test_result_published_to_reply_to(self, client, queue):
+        """With reply_to the result is also published with the reply_context."""
+        submit(client, reply_to='ai.response.conversation', reply_context={'conversation_id': 7},
+               correlation_id='turn-1')
+        app_module.run_generation_job(queue.jobs[0])
+
+        assert len(queue.events) == 1
+        routing_key, event = queue.events[0]
+        assert routing_key == 'ai.response.conversation'
+        assert event['status'] == 'done'
+        assert event['reply_context'] == {'conversation_id': 7}
+        assert event['correlation_id'] == 'turn-1'
+        assert 'owner' not in event
+
+    def test_job_id_assigned_by_server(self, client, queue):
+        """A caller-supplied job_id is ignored."""
+        response = submit(client, job_id='chosen-by-caller')
+        assert response.json['job_id'] != 'chosen-by-caller'
+
+    def test_unknown_job(self, client):
+        """Unknown job IDs return 404."""
+        response = client.get('/api/ai/jobs/missing', headers=service_headers())
+        assert response.status_code == 404
+
+
+class TestJobAccess:
+    """Test authentication and ownership of jobs."""
+
+    def test_submit_requires_authentication(self, client, queue):
+        """Anonymous submissions are rejected."""
+        response = client.post('/api/ai/jobs', json={'message': 'hello'})
+        assert response.status_code == 401
+        assert queue.jobs == []
+
+    def test_reply_to_must_be_ai_response_key(self, client, queue):
+        """Results cannot be published under arbitrary routing keys."""
+        response = submit(client, reply_to='user.registered')
+        assert response.status_code == 400
+        assert queue.jobs == []
+
+    def test_worker_ignores_foreign_reply_to(self, queue):
+        """Jobs straight from the broker cannot publish outside ai.response.*."""
+        message = {'data': {'job_id': 'job-1', 'message': 'hello', 'reply_to': 'user.deleted'},
+                   'metadata': {'service': 'analytics-service'}}
+        assert app_module.run_generation_job(message) is True
+        assert queue.events == []
+
+    def test_other_service_cannot_read_job(self, client, queue):
+        """Only the submitting service can read a job."""
+        job_id = submit(client).json['job_id']
+        assert client.get(f'/api/ai/jobs/{job_id}', headers=service_headers('websocket-service')).status_code == 404
+        assert client.get(f'/api/ai/jobs/{job_id}').status_code == 404
+
+    def test_job_id_cannot_be_taken_over(self, client, queue):
+        """A broker job reusing another caller's job_id is dropped."""
+        job_id = submit(client).json['job_id']
+        message = {'data': {'job_id': job_id, 'message': 'hijack'}, 'metadata': {'service': 'other-service'}}
+        assert app_module.run_generation_job(message) is True
+
+        status = client.get(f'/api/ai/jobs/{job_id}', headers=service_headers())
+        assert status.json['status'] == 'queued'
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Gemini quota scheduler
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add the current directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from quota_scheduler import QuotaExceeded, QuotaScheduler, TokenBucket
+
+PRIORITIES = ['realtime', 'standard', 'batch']
+MAX_WAIT = {'realtime': 5, 'standard': 5, 'batch': 5}
+
+
+def make_scheduler(rate=10, burst=1, **kwargs):
+    """A token every 1/rate seconds, so callers arriving together queue up."""
+    return QuotaScheduler(rate, burst, PRIORITIES, kwargs.pop('max_wait', MAX_WAIT), **kwargs)
+
+
+def drain(scheduler):
+    """Take every available token so the next callers have to queue."""
+    with scheduler._lock:
+        while scheduler.bucket.take():
+            pass
+
+
+class Callers:
+    """Runs acquire() calls on threads and records the order they are granted in."""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.granted = []
+        self.errors = []
+        self.threads = []
+        self._lock = threading.Lock()
+
+    def start(self, priority, user, name=None):
+        def run():
+            try:
+                self.scheduler.acquire(priority, user)
+                with self._lock:
+                    self.granted.append(name or (priority, user))
+            except QuotaExceeded as e:
+                with self._lock:
+                    self.errors.append((name or (priority, user), e.reason))
+
+        thread = threading.Thread(target=run)
+        self.threads.append(thread)
+        expected = self.scheduler.queued() + 1
+        thread.start()
+        # Wait for it to be queued so arrival order is deterministic
+        deadline = time.monotonic() + 2
+        while self.scheduler.queued() < expected and thread.is_alive() and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+    def join(self):
+        for thread in self.threads:
+            thread.join(5)
+
+
+class TestTokenBucket:
+    """Test the token bucket under the scheduler."""
+
+    def test_burst_then_empty(self):
+        """The bucket serves burst tokens at once, then runs dry."""
+        bucket = TokenBucket(rate=0.001, burst=3)
+        assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+
+    def test_wait_time(self):
+        """wait_time is how long the next token takes to refill."""
+        bucket = TokenBucket(rate=10, burst=1)
+        bucket.take()
+        assert 0.05 < bucket.wait_time() <= 0.1
+
+
+class TestPriorityOrder:
+    """Test that higher priorities are served first."""
+
+    def test_immediate_when_tokens_available(self):
+        """With tokens and no queue, acquire returns at once."""
+        scheduler = make_scheduler(burst=5)
+        assert scheduler.acquire('batch', 'user:1') == 0.0
+
+    def test_higher_priority_served_first(self):
+        """Queued realtime calls go before standard and batch ones."""
+        scheduler = make_scheduler()
+        drain(scheduler)
+        callers = Callers(scheduler)
+        callers.start('batch', 'user:1')
+        callers.start('standard', 'user:2')
+        callers.start('realtime', 'user:3')
+        callers.join()
+        assert callers.granted == [('realtime', 'user:3'), ('standard', 'user:2'), ('batch', 'user:1')]
+
+
+class TestRoundRobin:
+    """Test fairness between users within a priority."""
+
+    def test_users_take_turns(self):
+        """A user with many queued calls does not starve another."""
+        scheduler = make_scheduler()
+        drain(scheduler)
+        callers = Callers(scheduler)
+        for index in range(3):
+            callers.start('standard', 'user:busy', name=f"busy-{index}")
+        callers.start('standard', 'user:quiet', name='quiet')
+        callers.join()
+        assert callers.granted.index('quiet') <= 1
+
+    def test_per_user_queue_limit(self):
+        """Calls beyond max_queued_per_user are shed."""
+        scheduler = make_scheduler(max_queued_per_user=2)
+        drain(scheduler)
+        callers = Callers(scheduler)
+        callers.start('standard', 'user:1', name='first')
+        callers.start('standard', 'user:1', name='second')
+        with pytest.raises(QuotaExceeded) as excinfo:
+            scheduler.acquire('standard', 'user:1')
+        assert excinfo.value.reason == 'shed'
+        callers.join()
+
+
+class TestShedding:
+    """Test that lower priorities are shed when the queues are full."""
+
+    def test_full_queue_sheds_lower_priority(self):
+        """A realtime call arriving at a full queue displaces a batch call."""
+        scheduler = make_scheduler(max_queued=2)
+        drain(scheduler)
+        callers = Callers(scheduler)
+        callers.start('batch', 'user:1', name='batch-1')
+        callers.start('batch', 'user:2', name='batch-2')
+        callers.start('realtime', 'user:3', name='realtime')
+        deadline = time.monotonic() + 2
+        while not callers.errors and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert [reason for _name, reason in callers.errors] == ['shed']
+        assert callers.errors[0][0].startswith('batch')
+        callers.join()
+        assert callers.granted[0] == 'realtime'
+
+    def test_heaviest_user_shed_first(self):
+        """Among lower-priority waiters, the user with the most queued loses one."""
+        scheduler = make_scheduler(max_queued=3)
+        drain(scheduler)
+        callers = Callers(scheduler)
+        callers.start('batch', 'user:heavy', name='heavy-1')
+        callers.start('batch', 'user:heavy', name='heavy-2')
+        callers.start('batch', 'user:light', name='light')
+        callers.start('standard', 'user:4', name='standard')
+        deadline = time.monotonic() + 2
+        while not callers.errors and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert callers.errors == [('heavy-2', 'shed')]
+        callers.join()
+
+    def test_full_queue_rejects_lowest_priority(self):
+        """With nothing lower to shed, the arriving call is shed itself."""
+        scheduler = make_scheduler(max_queued=1)
+        drain(scheduler)
+        callers = Callers(scheduler)
+        callers.start('standard', 'user:1')
+        with pytest.raises(QuotaExceeded) as excinfo:
+            scheduler.acquire('batch', 'user:2')
+        assert excinfo.value.reason == 'shed'
+        callers.join()
+
+    def test_queue_timeout(self):
+        """A call queued past its priority's max_wait gives up."""
+        scheduler = make_scheduler(max_wait={'realtime': 0.05, 'standard': 5, 'batch': 5})
+        drain(scheduler)
+        with pytest.raises(QuotaExceeded) as excinfo:
+            scheduler.acquire('realtime', 'user:1')
+        assert excinfo.value.reason == 'queue_timeout'
+        assert scheduler.queued() == 0
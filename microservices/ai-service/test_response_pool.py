@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the pre-generated response pool
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+# Add the current directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import response_pool
+from response_pool import ResponsePool
+
+
+class Clock:
+    """Stands in for time.time() inside response_pool."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_pool.time, 'time', clock.time)
+    return clock
+
+
+def make_pool(redis, size=2, ttl=100, **kwargs):
+    generated = []
+
+    def generate(emotion, context):
+        generated.append((emotion, context))
+        return f"{emotion}/{context} response {len(generated)}"
+
+    pool = ResponsePool(redis, generate, [('sad', 'general'), ('happy', 'general')],
+                        size=size, ttl=ttl, **kwargs)
+    return pool, generated
+
+
+def pool_responses(pool, emotion, context):
+    return [json.loads(raw)['response'] for raw in pool.redis_client.lrange(pool.key(emotion, context), 0, -1)]
+
+
+class TestFilling:
+    """Test that the worker fills empty pools first."""
+
+    def test_fills_emptiest_pool_first(self, clock, fake_redis):
+        """Each pass adds one entry to the pool with the fewest."""
+        pool, generated = make_pool(fake_redis)
+        for _ in range(4):
+            assert pool.refill_once()
+        assert sorted(generated) == [('happy', 'general')] * 2 + [('sad', 'general')] * 2
+        assert pool.stats[('sad', 'general')][0] == 2
+
+    def test_skips_when_busy(self, clock, fake_redis):
+        """Nothing is generated while the service is not idle."""
+        pool, generated = make_pool(fake_redis, is_idle=lambda: False)
+        assert not pool.refill_once()
+        assert generated == []
+
+    def test_one_filler_across_replicas(self, clock, fake_redis):
+        """Only the replica holding the filler lock generates."""
+        first, first_generated = make_pool(fake_redis)
+        second, second_generated = make_pool(fake_redis)
+        assert first.refill_once()
+        assert not second.refill_once()
+        assert len(first_generated) == 1 and second_generated == []
+
+
+class TestExpiry:
+    """Test that entries past the ttl are never served."""
+
+    def test_serves_fresh_entry(self, clock, fake_redis):
+        """take() returns a fresh entry with its age."""
+        pool, _generated = make_pool(fake_redis)
+        pool.refill_once()
+        clock.now += 10
+        entry = pool.take('happy', 'general') or pool.take('sad', 'general')
+        assert entry['response'].endswith('response 1')
+        assert entry['age'] == 10
+
+    def test_expired_entry_not_served(self, clock, fake_redis):
+        """take() skips entries older than the ttl."""
+        pool, _generated = make_pool(fake_redis)
+        pool.refill_once()
+        pool.refill_once()
+        clock.now += pool.ttl + 1
+        assert pool.take('sad', 'general') is None
+        assert pool.take('happy', 'general') is None
+
+    def test_expired_entries_pruned(self, clock, fake_redis):
+        """A refill pass drops expired entries before refilling."""
+        pool, _generated = make_pool(fake_redis, is_idle=lambda: False)
+        pool.redis_client.lpush(pool.key('sad', 'general'),
+                                json.dumps({'response': 'stale', 'generated_at': clock.now - pool.ttl - 1}))
+        pool.refill_once()
+        assert pool_responses(pool, 'sad', 'general') == []
+        assert pool.stats[('sad', 'general')] == (0, 0.0)
+
+    def test_unknown_pair_not_served(self, clock, fake_redis):
+        """Pairs the pool does not keep return None."""
+        pool, _generated = make_pool(fake_redis)
+        assert pool.take('angry', 'general') is None
+
+
+class TestRotation:
+    """Test that full pools keep rotating."""
+
+    def fill(self, pool):
+        for _ in range(pool.size * len(pool.pairs)):
+            assert pool.refill_once()
+
+    def test_take_rotates_entries(self, clock, fake_redis):
+        """Consecutive takes serve different entries round robin."""
+        pool, _generated = make_pool(fake_redis)
+        self.fill(pool)
+        first = pool.take('sad', 'general')['response']
+        second = pool.take('sad', 'general')['response']
+        third = pool.take('sad', 'general')['response']
+        assert first != second
+        assert third == first
+
+    def test_full_fresh_pools_left_alone(self, clock, fake_redis):
+        """Nothing is replaced while every entry is younger than half the ttl."""
+        pool, generated = make_pool(fake_redis)
+        self.fill(pool)
+        clock.now += pool.ttl / 2 - 1
+        assert not pool.refill_once()
+        assert len(generated) == 4
+
+    def test_replaces_oldest_entry_past_half_ttl(self, clock, fake_redis):
+        """Once entries pass half the ttl, the oldest is replaced."""
+        pool, generated = make_pool(fake_redis)
+        pool.refill_once()
+        clock.now += 1
+        for _ in range(3):
+            assert pool.refill_once()
+        oldest = generated[0]
+        oldest_response = f"{oldest[0]}/{oldest[1]} response 1"
+        clock.now += pool.ttl / 2 + 1
+
+        assert pool.refill_once()
+        responses = pool_responses(pool, *oldest)
+        assert oldest_response not in responses
+        assert len(responses) == pool.size
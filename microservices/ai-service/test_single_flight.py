@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Unit tests for single-flight request coalescing
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add the current directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from single_flight import LEADER, LOCAL, REPLICA, SingleFlight
+
+
+class TestCoalescing:
+    """Test that concurrent identical calls share one execution."""
+
+    def test_concurrent_calls_run_once(self):
+        """Callers arriving while a call is in flight get its result."""
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+        results = {}
+
+        def slow_call():
+            calls.append(1)
+            release.wait(5)
+            return 'response'
+
+        def caller(index):
+            results[index] = flight.do('key', slow_call)
+
+        leader = threading.Thread(target=caller, args=(0,))
+        leader.start()
+        while not flight.in_flight:
+            time.sleep(0.001)
+        followers = [threading.Thread(target=caller, args=(index,)) for index in range(1, 5)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        assert len(calls) == 1
+        assert results[0] == ('response', LEADER)
+        assert all(results[index] == ('response', LOCAL) for index in range(1, 5))
+        assert flight.in_flight == 0
+
+    def test_different_keys_run_separately(self):
+        """Calls with different keys are not coalesced."""
+        flight = SingleFlight()
+        assert flight.do('a', lambda: 1) == (1, LEADER)
+        assert flight.do('b', lambda: 2) == (2, LEADER)
+
+    def test_finished_call_is_not_reused(self):
+        """A key runs again once its call has finished."""
+        flight = SingleFlight()
+        calls = []
+        flight.do('key', lambda: calls.append(1))
+        flight.do('key', lambda: calls.append(1))
+        assert len(calls) == 2
+
+
+class TestErrorPropagation:
+    """Test that a failed call fails every waiter."""
+
+    def test_error_raised_in_waiters(self):
+        """Waiters get the leader's exception instead of a result."""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def failing_call():
+            started.set()
+            release.wait(5)
+            raise RuntimeError('upstream down')
+
+        def caller(index):
+            try:
+                flight.do('key', failing_call)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=caller, args=(0,))
+        leader.start()
+        started.wait(5)
+        followers = [threading.Thread(target=caller, args=(index,)) for index in range(1, 4)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        assert errors == ['upstream down'] * 4
+        assert flight.in_flight == 0
+
+    def test_key_usable_after_error(self):
+        """A failed call does not leave its key stuck in flight."""
+        flight = SingleFlight()
+
+        def failing_call():
+            raise ValueError('bad')
+
+        with pytest.raises(ValueError):
+            flight.do('key', failing_call)
+        assert flight.do('key', lambda: 'ok') == ('ok', LEADER)
+
+
+class TestReplicaLock:
+    """Test coalescing across replicas through the Redis lock."""
+
+    def test_lock_released_after_call(self, fake_redis):
+        """The leader releases its lock once the call is done."""
+        flight = SingleFlight(redis_client=fake_redis)
+        assert flight.do('key', lambda: 'response') == ('response', LEADER)
+        assert fake_redis.values == {}
+
+    def test_waits_for_cached_result_of_other_replica(self, fake_redis):
+        """While another replica holds the lock, the cached result is served."""
+        fake_redis.values['inflight:key'] = 'other-replica'
+        cache = {}
+        flight = SingleFlight(redis_client=fake_redis, poll_interval=0.01)
+        calls = []
+
+        def other_replica_finishes():
+            time.sleep(0.05)
+            cache['key'] = 'cached response'
+
+        threading.Thread(target=other_replica_finishes).start()
+        result = flight.do('key', lambda: calls.append(1), lambda: cache.get('key'))
+
+        assert result == ('cached response', REPLICA)
+        assert calls == []
+
+    def test_runs_itself_when_lock_holder_stalls(self, fake_redis):
+        """Past lock_ttl without a cached result, the caller runs the call itself."""
+        fake_redis.values['inflight:key'] = 'stuck-replica'
+        flight = SingleFlight(redis_client=fake_redis, lock_ttl=0.05, poll_interval=0.01)
+        assert flight.do('key', lambda: 'response', lambda: None) == ('response', LEADER)
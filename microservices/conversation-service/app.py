@@ -5,10 +5,11 @@ Integrates with Auth, Emotion, and AI services for complete conversation flow.
 
 from flask import Flask, request, jsonify, g
 from flask_cors import CORS
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, ForeignKey
+from sqlalchemy import create_engine, inspect, text, tuple_, Column, Integer, String, DateTime, Text, Float, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime, timedelta
+import base64
 import logging
 import os
 import requests
@@ -56,6 +57,11 @@ EMOTION_SERVICE_URL = os.environ.get('EMOTION_SERVICE_URL', 'http://emotion-serv
 AI_SERVICE_URL = os.environ.get('AI_SERVICE_URL', 'http://ai-service:8005')
 SERVICE_SECRET = os.environ.get('SERVICE_SECRET', 'default-service-secret')
 
+# Conversation and message lists are returned in pages of ?limit= items
+# (CONVERSATION_PAGE_SIZE by default, at most CONVERSATION_MAX_PAGE_SIZE)
+CONVERSATION_PAGE_SIZE = int(os.environ.get('CONVERSATION_PAGE_SIZE', 50))
+CONVERSATION_MAX_PAGE_SIZE = int(os.environ.get('CONVERSATION_MAX_PAGE_SIZE', 200))
+
 # Redis setup for caching
 try:
     redis_client = redis.Redis(
@@ -84,6 +90,10 @@ else:
 # Database Models
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Serves the (updated_at, id) keyset listing of a user's active conversations
+        Index('ix_conversations_user_active_updated', 'user_id', 'is_active', 'updated_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False, index=True)
@@ -91,6 +101,9 @@ class Conversation(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = Column(Integer, default=1)  # 1 for active, 0 for archived
+    # Maintained with each message insert so listing never loads messages
+    message_count = Column(Integer, nullable=False, default=0, server_default='0')
+    last_message_at = Column(DateTime, nullable=True)
     
     messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
     
@@ -102,11 +115,16 @@ class Conversation(Base):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'is_active': bool(self.is_active),
-            'message_count': len(self.messages)
+            'message_count': self.message_count or 0,
+            'last_message_at': self.last_message_at.isoformat() if self.last_message_at else None
         }
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Serves the (created_at, id) keyset listing of a conversation's messages
+        Index('ix_messages_conversation_created', 'conversation_id', 'created_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
@@ -131,8 +149,82 @@ class Message(Base):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+def migrate_conversation_counters(engine):
+    """
+    Add conversations.message_count and last_message_at to databases created
+    before they existed, and backfill them from the messages table in one
+    statement. Does nothing once both columns exist.
+    """
+    columns = {column['name'] for column in inspect(engine).get_columns('conversations')}
+    if {'message_count', 'last_message_at'} <= columns:
+        return
+    
+    with engine.begin() as connection:
+        if 'message_count' not in columns:
+            connection.execute(text("ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0"))
+        if 'last_message_at' not in columns:
+            connection.execute(text("ALTER TABLE conversations ADD COLUMN last_message_at TIMESTAMP"))
+        result = connection.execute(text("""
+            UPDATE conversations SET
+                message_count = (SELECT COUNT(*) FROM messages WHERE messages.conversation_id = conversations.id),
+                last_message_at = (SELECT MAX(messages.created_at) FROM messages WHERE messages.conversation_id = conversations.id)
+        """))
+    logger.info(f"Backfilled message counters for {result.rowcount} conversations")
+
+def create_missing_indexes(engine):
+    """create_all skips the indexes of tables that already exist; add any that are missing."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 # Create tables
 Base.metadata.create_all(bind=engine)
+migrate_conversation_counters(engine)
+create_missing_indexes(engine)
+
+def encode_cursor(timestamp, row_id):
+    """Opaque cursor for the keyset position after (timestamp, row_id)."""
+    position = json.dumps([timestamp.isoformat(), row_id])
+    return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """(timestamp, row_id) from an encode_cursor cursor; raises ValueError if it is not one."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def page_request():
+    """(limit, position) from ?limit= and ?cursor=; raises ValueError on bad values."""
+    limit = request.args.get('limit', CONVERSATION_PAGE_SIZE, type=int)
+    if limit is None or limit < 1:
+        raise ValueError('limit must be a positive integer')
+    cursor = request.args.get('cursor')
+    return min(limit, CONVERSATION_MAX_PAGE_SIZE), decode_cursor(cursor) if cursor else None
+
+def keyset_page(query, timestamp_column, id_column, limit, position, descending=False):
+    """
+    One page of query ordered by (timestamp_column, id_column) after position.
+    
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    key = tuple_(timestamp_column, id_column)
+    if position:
+        query = query.filter(key < tuple_(*position) if descending else key > tuple_(*position))
+    if descending:
+        query = query.order_by(timestamp_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(timestamp_column.asc(), id_column.asc())
+    
+    # One extra row tells whether there is another page
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, timestamp_column.key), getattr(last, id_column.key))
 
 def get_db():
     """Get database session."""
@@ -159,6 +251,16 @@ def validate_service_token():
     except jwt.InvalidTokenError:
         return False
 
+def service_token():
+    """Short-lived service-to-service token vouching for the user_id this service passes along."""
+    import jwt
+    now = datetime.utcnow()
+    return jwt.encode(
+        {'service': 'conversation-service', 'iat': now, 'exp': now + timedelta(minutes=5)},
+        SERVICE_SECRET,
+        algorithm='HS256'
+    )
+
 def verify_user_token(token):
     """Verify user JWT token with Auth Service."""
     try:
@@ -196,13 +298,16 @@ def analyze_emotion(text):
         logger.error(f"Emotion service communication error: {e}")
         return None
 
-def generate_ai_response(message, emotion_data=None):
+def generate_ai_response(message, emotion_data=None, user_id=None):
     """Generate AI response using AI Service."""
     try:
         payload = {
             'message': message,
             'context': 'conversation'
         }
+        if user_id is not None:
+            # Lets the AI Service queue each user's requests fairly
+            payload['user_id'] = user_id
         if emotion_data:
             payload['emotion'] = emotion_data.get('emotion')
             payload['confidence'] = emotion_data.get('confidence')
@@ -211,6 +316,7 @@ def generate_ai_response(message, emotion_data=None):
             f"{AI_SERVICE_URL}/api/ai/generate",
             headers={
                 'Content-Type': 'application/json',
+                'Authorization': f'Bearer {service_token()}',
                 'X-Service-Name': 'conversation-service'
             },
             json=payload,
@@ -239,7 +345,12 @@ def health_check():
 @app.route('/api/conversations', methods=['GET'])
 @metrics.counter('conversation_list_requests', 'Number of conversation list requests')
 def get_conversations():
-    """Get user's conversations."""
+    """
+    Get a page of the user's conversations, most recently updated first.
+    
+    Pass the response's next_cursor as ?cursor= for the next page; it is
+    null on the last page.
+    """
     auth_header = request.headers.get('Authorization')
     if not auth_header or not auth_header.startswith('Bearer '):
         return jsonify({'error': 'Authorization header required'}), 401
@@ -257,15 +368,24 @@ def get_conversations():
     else:
         user_id = user_data.get('user_id')
     
+    try:
+        limit, position = page_request()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     db = SessionLocal()
     try:
-        conversations = db.query(Conversation).filter(
-            Conversation.user_id == user_id,
-            Conversation.is_active == 1
-        ).order_by(Conversation.updated_at.desc()).all()
+        conversations, next_cursor = keyset_page(
+            db.query(Conversation).filter(
+                Conversation.user_id == user_id,
+                Conversation.is_active == 1
+            ),
+            Conversation.updated_at, Conversation.id, limit, position, descending=True
+        )
         
         return jsonify({
-            'conversations': [conv.to_dict() for conv in conversations]
+            'conversations': [conv.to_dict() for conv in conversations],
+            'next_cursor': next_cursor
         }), 200
     except Exception as e:
         logger.error(f"Error fetching conversations: {e}")
@@ -342,7 +462,12 @@ def create_conversation():
 @app.route('/api/conversations/<int:conversation_id>/messages', methods=['GET'])
 @metrics.counter('message_list_requests', 'Number of message list requests')
 def get_messages(conversation_id):
-    """Get messages for a conversation."""
+    """
+    Get a page of a conversation's messages, oldest first.
+    
+    Pass the response's next_cursor as ?cursor= for the next page; it is
+    null on the last page.
+    """
     auth_header = request.headers.get('Authorization')
     if not auth_header or not auth_header.startswith('Bearer '):
         return jsonify({'error': 'Authorization header required'}), 401
@@ -360,6 +485,11 @@ def get_messages(conversation_id):
     else:
         user_id = user_data.get('user_id')
     
+    try:
+        limit, position = page_request()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     db = SessionLocal()
     try:
         # Verify conversation belongs to user
@@ -371,13 +501,15 @@ def get_messages(conversation_id):
         if not conversation:
             return jsonify({'error': 'Conversation not found'}), 404
         
-        messages = db.query(Message).filter(
-            Message.conversation_id == conversation_id
-        ).order_by(Message.created_at.asc()).all()
+        messages, next_cursor = keyset_page(
+            db.query(Message).filter(Message.conversation_id == conversation_id),
+            Message.created_at, Message.id, limit, position
+        )
         
         return jsonify({
             'conversation': conversation.to_dict(),
-            'messages': [msg.to_dict() for msg in messages]
+            'messages': [msg.to_dict() for msg in messages],
+            'next_cursor': next_cursor
         }), 200
     except Exception as e:
         logger.error(f"Error fetching messages: {e}")
@@ -449,7 +581,7 @@ def send_message(conversation_id):
         db.add(user_message)
         
         # Generate AI response
-        ai_response_data = generate_ai_response(content, emotion_data)
+        ai_response_data = generate_ai_response(content, emotion_data, user_id)
         ai_response_content = ai_response_data.get('response', 'I apologize, but I am unable to respond at the moment.') if ai_response_data else 'I apologize, but I am unable to respond at the moment.'
         
         # Save AI response
@@ -461,8 +593,11 @@ def send_message(conversation_id):
         )
         db.add(ai_message)
         
-        # Update conversation timestamp
-        conversation.updated_at = datetime.utcnow()
+        # Update conversation timestamp and counters in the same transaction
+        now = datetime.utcnow()
+        conversation.updated_at = now
+        conversation.last_message_at = now
+        conversation.message_count = Conversation.message_count + 2
         
         db.commit()
         
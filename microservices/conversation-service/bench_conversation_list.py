@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark for listing a heavy user's conversations.
+Compares counting messages through the lazy-loaded relationship (one query
+and every message row per conversation) with the maintained message_count
+column (one query) on a SQLite database of conversations x messages.
+
+Usage: python bench_conversation_list.py [--conversations 1000] [--messages 500] [--repeat 3]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_PATH = os.path.join(tempfile.mkdtemp(prefix='bench-conversations-'), 'conversations.db')
+os.environ['CONVERSATION_DATABASE_URL'] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault('REDIS_HOST', 'localhost')
+
+from sqlalchemy import event
+
+from app import Conversation, Message, SessionLocal, engine
+
+USER_ID = 1
+
+
+def populate(conversations, messages):
+    """Insert conversations with their counters already maintained, and their messages."""
+    started = datetime.utcnow() - timedelta(days=365)
+    with engine.begin() as connection:
+        connection.execute(Conversation.__table__.insert(), [
+            {
+                'id': conversation_id,
+                'user_id': USER_ID,
+                'title': f"Conversation {conversation_id}",
+                'created_at': started,
+                'updated_at': started + timedelta(minutes=conversation_id),
+                'is_active': 1,
+                'message_count': messages,
+                'last_message_at': started + timedelta(minutes=conversation_id)
+            }
+            for conversation_id in range(1, conversations + 1)
+        ])
+        for conversation_id in range(1, conversations + 1):
+            connection.execute(Message.__table__.insert(), [
+                {
+                    'conversation_id': conversation_id,
+                    'user_id': USER_ID,
+                    'content': f"Message {index} of a long-running chat about how the week went.",
+                    'sender_type': 'user' if index % 2 == 0 else 'bot',
+                    'created_at': started + timedelta(seconds=index)
+                }
+                for index in range(messages)
+            ])
+
+
+def legacy_to_dict(conversation):
+    """Original serialization: count by loading the messages relationship."""
+    data = conversation.to_dict()
+    data['message_count'] = len(conversation.messages)
+    return data
+
+
+def list_conversations(serialize):
+    """The GET /api/conversations query and serialization."""
+    db = SessionLocal()
+    try:
+        conversations = db.query(Conversation).filter(
+            Conversation.user_id == USER_ID,
+            Conversation.is_active == 1
+        ).order_by(Conversation.updated_at.desc()).all()
+        return [serialize(conversation) for conversation in conversations]
+    finally:
+        db.close()
+
+
+def measure(name, serialize, repeat):
+    statements = []
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    timings = []
+    for _ in range(repeat):
+        statements.clear()
+        event.listen(engine, 'before_cursor_execute', count_statement)
+        started = time.perf_counter()
+        result = list_conversations(serialize)
+        timings.append(time.perf_counter() - started)
+        event.remove(engine, 'before_cursor_execute', count_statement)
+
+    best = min(timings)
+    print(f"{name:<10} {best * 1000:10.1f} ms  {len(statements):6d} queries  "
+          f"{sum(item['message_count'] for item in result):8d} messages counted")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--conversations', type=int, default=1000)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Populating {args.conversations} conversations x {args.messages} messages in {DB_PATH}")
+    populate(args.conversations, args.messages)
+
+    legacy = measure('relation', legacy_to_dict, args.repeat)
+    counter = measure('counter', Conversation.to_dict, args.repeat)
+    print(f"speedup    {legacy / counter:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
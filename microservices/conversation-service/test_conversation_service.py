@@ -226,6 +226,58 @@ class TestDatabaseOperations:
         assert 'conversation' in data
         assert data['conversation']['title'] == 'Test DB Conversation'
 
+    @patch('requests.post')
+    def test_send_message_maintains_counters(self, mock_post, client):
+        """Test that sending a message updates the counters listed in one query."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'user_id': 42, 'response': 'Hi there'}
+        mock_post.return_value = mock_response
+        headers = {'Authorization': 'Bearer valid-token'}
+        
+        created = client.post('/api/conversations', headers=headers, json={'title': 'Counted'})
+        conversation_id = json.loads(created.data)['conversation']['id']
+        client.post(f'/api/conversations/{conversation_id}/messages', headers=headers, json={'message': 'Hello'})
+        
+        # The in-memory database is a single connection; trace its statements
+        statements = []
+        connection = app_module.engine.raw_connection()
+        try:
+            connection.driver_connection.set_trace_callback(statements.append)
+            response = client.get('/api/conversations', headers=headers)
+            connection.driver_connection.set_trace_callback(None)
+        finally:
+            connection.close()
+        
+        conversation = json.loads(response.data)['conversations'][0]
+        assert conversation['message_count'] == 2
+        assert conversation['last_message_at'] is not None
+        assert len([statement for statement in statements if statement.startswith('SELECT')]) == 1
+    
+    def test_counter_migration_backfills_existing_conversations(self):
+        """Test that the migration adds and backfills the counter columns."""
+        text = app_module.text
+        legacy = app_module.create_engine('sqlite:///:memory:')
+        with legacy.begin() as connection:
+            connection.execute(text("CREATE TABLE conversations (id INTEGER PRIMARY KEY, user_id INTEGER)"))
+            connection.execute(text(
+                "CREATE TABLE messages (id INTEGER PRIMARY KEY, conversation_id INTEGER, created_at TIMESTAMP)"
+            ))
+            connection.execute(text("INSERT INTO conversations (id, user_id) VALUES (1, 1), (2, 1)"))
+            connection.execute(text(
+                "INSERT INTO messages (conversation_id, created_at) VALUES "
+                "(1, '2024-01-01 10:00:00'), (1, '2024-01-02 10:00:00')"
+            ))
+        
+        app_module.migrate_conversation_counters(legacy)
+        app_module.migrate_conversation_counters(legacy)  # Idempotent
+        
+        with legacy.connect() as connection:
+            rows = connection.execute(text(
+                "SELECT id, message_count, last_message_at FROM conversations ORDER BY id"
+            )).fetchall()
+        assert [tuple(row) for row in rows] == [(1, 2, '2024-01-02 10:00:00'), (2, 0, None)]
+
 
 class TestMessageEndpoints:
     """Test message-related endpoints."""
@@ -255,5 +307,68 @@ class TestMessageEndpoints:
         assert response.status_code == 400
 
 
+
+class TestPagination:
+    """Test keyset pagination of conversation and message lists."""
+    
+    @staticmethod
+    def auth_as(mock_post, user_id):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'user_id': user_id, 'response': 'Hi there'}
+        mock_post.return_value = mock_response
+        return {'Authorization': 'Bearer valid-token'}
+    
+    @patch('requests.post')
+    def test_conversations_are_paged_by_cursor(self, mock_post, client):
+        """Test that following next_cursor visits every conversation once, newest first."""
+        headers = self.auth_as(mock_post, 77)
+        created = [
+            json.loads(client.post('/api/conversations', headers=headers, json={'title': f'Chat {i}'}).data)['conversation']['id']
+            for i in range(5)
+        ]
+        
+        seen, cursor = [], None
+        while True:
+            url = '/api/conversations?limit=2' + (f'&cursor={cursor}' if cursor else '')
+            data = json.loads(client.get(url, headers=headers).data)
+            assert len(data['conversations']) <= 2
+            seen.extend(conversation['id'] for conversation in data['conversations'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        
+        assert seen == list(reversed(created))
+    
+    @patch('requests.post')
+    def test_messages_are_paged_by_cursor(self, mock_post, client):
+        """Test that message pages continue in (created_at, id) order."""
+        headers = self.auth_as(mock_post, 78)
+        conversation_id = json.loads(
+            client.post('/api/conversations', headers=headers, json={'title': 'Paged'}).data
+        )['conversation']['id']
+        for i in range(2):
+            client.post(f'/api/conversations/{conversation_id}/messages', headers=headers, json={'message': f'Hello {i}'})
+        
+        first = json.loads(client.get(f'/api/conversations/{conversation_id}/messages?limit=3', headers=headers).data)
+        second = json.loads(client.get(
+            f"/api/conversations/{conversation_id}/messages?limit=3&cursor={first['next_cursor']}", headers=headers
+        ).data)
+        
+        assert [message['content'] for message in first['messages']][:1] == ['Hello 0']
+        assert len(first['messages']) == 3 and len(second['messages']) == 1
+        assert second['next_cursor'] is None
+        ids = [message['id'] for message in first['messages'] + second['messages']]
+        assert ids == sorted(ids)
+    
+    @patch('requests.post')
+    def test_invalid_cursor_and_limit_rejected(self, mock_post, client):
+        """Test that malformed cursors and non-positive limits return 400."""
+        headers = self.auth_as(mock_post, 79)
+        
+        assert client.get('/api/conversations?cursor=not-a-cursor', headers=headers).status_code == 400
+        assert client.get('/api/conversations?limit=0', headers=headers).status_code == 400
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v']) 
\ No newline at end of file
@@ -3,18 +3,21 @@ Emotion Service - Analyzes text to detect emotions and sentiment.
 Provides emotion detection, sentiment analysis, and confidence scoring.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 import logging
 import os
 import sys
-from textblob import TextBlob
+import time
 from datetime import datetime
 from prometheus_flask_exporter import PrometheusMetrics
 import redis
 import json
+import hashlib
+import unicodedata
 import requests
 import nltk
 from flask_cors import CORS
+from prometheus_client import Counter, Gauge, Histogram
 
 # Add shared-libs to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared-libs'))
@@ -27,6 +30,20 @@ except ImportError:
     RABBITMQ_AVAILABLE = False
     get_queue_client = None
 
+from emotion_engine import EMOTION_KEYWORDS, build_analyses, detect_emotion_keywords, get_primary_emotion
+from sentiment_pool import SentimentPool
+from local_cache import LocalCache
+from stage_timer import StageTimer
+from text_canonicalizer import CANONICAL_VERSION, canonicalize_text
+
+# Optional classifier engine (needs scikit-learn and a trained model)
+try:
+    from emotion_classifier import EmotionClassifier
+    CLASSIFIER_AVAILABLE = True
+except ImportError:
+    CLASSIFIER_AVAILABLE = False
+    EmotionClassifier = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -60,12 +77,20 @@ except Exception as e:
 if RABBITMQ_AVAILABLE and get_queue_client:
     try:
         queue_client = get_queue_client('emotion-service')
+        # Events are handed to a background thread so requests never wait on RabbitMQ
+        event_publisher = queue_client.start_background_publisher(
+            max_queue_size=int(os.environ.get('EVENT_PUBLISH_QUEUE_SIZE', 10000)),
+            batch_size=int(os.environ.get('EVENT_PUBLISH_BATCH_SIZE', 100)),
+            flush_interval=float(os.environ.get('EVENT_PUBLISH_FLUSH_INTERVAL', 0.5))
+        )
         logger.info("Connected to RabbitMQ")
     except Exception as e:
         logger.warning(f"RabbitMQ connection failed: {e}")
         queue_client = None
+        event_publisher = None
 else:
     queue_client = None
+    event_publisher = None
     logger.info("RabbitMQ not available - running in standalone mode")
 
 # Download NLTK data
@@ -78,17 +103,97 @@ except LookupError:
 AUTH_SERVICE_URL = os.environ.get('AUTH_SERVICE_URL', 'http://auth-service:8002')
 SERVICE_SECRET = os.environ.get('SERVICE_SECRET', 'default-service-secret')
 
-# Emotion categories and keywords
-EMOTION_KEYWORDS = {
-    'joy': ['happy', 'joy', 'excited', 'delighted', 'pleased', 'thrilled', 'ecstatic', 'elated'],
-    'sadness': ['sad', 'depressed', 'melancholy', 'grief', 'sorrow', 'unhappy', 'miserable', 'heartbroken'],
-    'anger': ['angry', 'furious', 'irritated', 'annoyed', 'mad', 'rage', 'frustrated', 'outraged'],
-    'fear': ['afraid', 'scared', 'terrified', 'anxious', 'worried', 'nervous', 'frightened', 'panicked'],
-    'surprise': ['surprised', 'shocked', 'amazed', 'astonished', 'stunned', 'bewildered', 'startled'],
-    'disgust': ['disgusted', 'revolted', 'repulsed', 'sickened', 'appalled', 'horrified'],
-    'trust': ['trust', 'confident', 'secure', 'reliable', 'faithful', 'loyal', 'dependable'],
-    'anticipation': ['excited', 'eager', 'hopeful', 'optimistic', 'enthusiastic', 'looking forward']
-}
+# Emotion result caching and batch limits
+EMOTION_CACHE_TTL = 3600  # 1 hour
+EMOTION_CACHE_KEY_PREFIX = 'emotion:v2:'
+EMOTION_LOCAL_CACHE_SIZE = int(os.environ.get('EMOTION_LOCAL_CACHE_SIZE', 10000))
+EMOTION_LOCAL_CACHE_TTL = float(os.environ.get('EMOTION_LOCAL_CACHE_TTL', 300))
+EMOTION_BATCH_MAX_TEXTS = int(os.environ.get('EMOTION_BATCH_MAX_TEXTS', 100))
+
+# Key the cache on canonicalized text so near-identical messages share results
+EMOTION_CACHE_CANONICAL = os.environ.get('EMOTION_CACHE_CANONICAL', 'false').lower() == 'true'
+
+# Add a Server-Timing header with per-stage durations to detect responses
+EMOTION_SERVER_TIMING = os.environ.get('EMOTION_SERVER_TIMING', 'false').lower() == 'true'
+
+# NDJSON streaming: records scored per chunk and the longest accepted line
+EMOTION_STREAM_CHUNK_SIZE = int(os.environ.get('EMOTION_STREAM_CHUNK_SIZE', 100))
+EMOTION_STREAM_MAX_LINE_BYTES = int(os.environ.get('EMOTION_STREAM_MAX_LINE_BYTES', 64 * 1024))
+
+# Sentiment worker pool (0 workers = score inline on the request thread)
+SENTIMENT_POOL_SIZE = int(os.environ.get('SENTIMENT_POOL_SIZE', 0))
+SENTIMENT_POOL_MAX_PENDING = int(os.environ.get('SENTIMENT_POOL_MAX_PENDING', SENTIMENT_POOL_SIZE * 4))
+SENTIMENT_POOL_TIMEOUT = float(os.environ.get('SENTIMENT_POOL_TIMEOUT', 5))
+
+# Sentiment engine: 'lexicon' (compiled, memory-mapped lexicon) or 'textblob'
+SENTIMENT_ENGINE = os.environ.get('SENTIMENT_ENGINE', 'lexicon')
+
+# Emotion engine: 'keyword' (keyword counts plus sentiment) or 'classifier'
+# (hashed-feature linear model); requests may override it with "engine"
+ENGINE_KEYWORD = 'keyword'
+ENGINE_CLASSIFIER = 'classifier'
+EMOTION_ENGINES = (ENGINE_KEYWORD, ENGINE_CLASSIFIER)
+EMOTION_ENGINE = os.environ.get('EMOTION_ENGINE', ENGINE_KEYWORD)
+
+# Pre-warmed sentiment workers, started before the first request
+sentiment_pool = SentimentPool(
+    size=SENTIMENT_POOL_SIZE,
+    max_pending=SENTIMENT_POOL_MAX_PENDING,
+    timeout=SENTIMENT_POOL_TIMEOUT,
+    engine=SENTIMENT_ENGINE
+)
+
+Gauge('emotion_sentiment_pool_size', 'Number of sentiment worker processes').set_function(
+    lambda: sentiment_pool.size
+)
+Gauge('emotion_sentiment_pool_pending', 'Sentiment batches queued or running in the pool').set_function(
+    lambda: sentiment_pool.pending
+)
+Gauge('emotion_sentiment_inline_fallbacks', 'Sentiment batches scored inline because the pool was saturated, slow or broken').set_function(
+    lambda: sentiment_pool.inline_fallbacks
+)
+Gauge('emotion_sentiment_pool_restarts', 'Times the sentiment pool was restarted after a worker died').set_function(
+    lambda: sentiment_pool.restarts
+)
+
+if event_publisher:
+    Gauge('emotion_events_pending', 'Events queued for the background publisher').set_function(
+        lambda: event_publisher.pending
+    )
+    Gauge('emotion_events_published', 'Events confirmed by RabbitMQ').set_function(
+        lambda: event_publisher.published
+    )
+    Gauge('emotion_events_dropped', 'Events dropped because the publish queue was full').set_function(
+        lambda: event_publisher.dropped
+    )
+    Gauge('emotion_events_failed', 'Events dropped after repeated publish failures').set_function(
+        lambda: event_publisher.failed
+    )
+
+# Classifier weights are memory-mapped, so worker processes share one copy
+emotion_classifier = None
+if CLASSIFIER_AVAILABLE:
+    try:
+        emotion_classifier = EmotionClassifier.load()
+        logger.info(f"Loaded emotion classifier {emotion_classifier.version}")
+    except (OSError, ValueError, KeyError) as e:
+        logger.info(f"Emotion classifier not loaded: {e}")
+if EMOTION_ENGINE == ENGINE_CLASSIFIER and not emotion_classifier:
+    logger.warning("EMOTION_ENGINE=classifier but no model is loaded; falling back to the keyword engine")
+
+# In-process tier in front of Redis
+local_cache = LocalCache(max_entries=EMOTION_LOCAL_CACHE_SIZE, ttl=EMOTION_LOCAL_CACHE_TTL)
+
+cache_hits = Counter('emotion_cache_hits', 'Emotion analysis cache hits', ['tier'])
+cache_misses = Counter('emotion_cache_misses', 'Emotion analysis cache misses', ['tier'])
+
+stage_duration = Histogram(
+    'emotion_stage_duration_seconds',
+    'Time spent in each emotion detection stage',
+    ['stage', 'cache'],
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+             0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
 
 def validate_service_token():
     """Validate service-to-service authentication token."""
@@ -125,53 +230,257 @@ def verify_user_token(token):
         logger.error(f"Auth service communication error: {e}")
         return False, None
 
-def detect_emotion_keywords(text):
-    """Detect emotion based on keyword matching."""
-    text_lower = text.lower()
-    emotion_scores = {}
+def analyze_sentiment(text):
+    """Analyze sentiment polarity (in the sentiment pool when enabled)."""
+    return sentiment_pool.score(text)
+
+def analyze_sentiments(texts):
+    """Analyze sentiment for a batch of texts, preserving input order."""
+    return sentiment_pool.score_many(texts)
+
+def classify_texts(texts, polarities):
+    """Classifier analyses for a batch (emotion_scores are class probabilities)."""
+    return [
+        {
+            'emotion': emotion,
+            'confidence': round(confidence, 3),
+            'sentiment': round(sentiment_polarity, 3),
+            'emotion_scores': scores
+        }
+        for (emotion, confidence, scores), sentiment_polarity
+        in zip(emotion_classifier.classify(texts), polarities)
+    ]
+
+def analyze_texts(texts, engine=None):
+    """
+    Score a batch of texts with one emotion pass and one sentiment pass.
     
-    for emotion, keywords in EMOTION_KEYWORDS.items():
-        score = sum(1 for keyword in keywords if keyword in text_lower)
-        if score > 0:
-            emotion_scores[emotion] = score
+    Returns a list of analysis dicts (emotion, confidence, sentiment,
+    emotion_scores) in the same order as texts.
+    """
+    if (engine or default_engine()) == ENGINE_CLASSIFIER:
+        return classify_texts(texts, analyze_sentiments(texts))
+    return build_analyses(texts, analyze_sentiments(texts))
+
+def default_engine():
+    """
+    Engine for requests that do not choose one.
     
-    return emotion_scores
+    The keyword engine stands in for EMOTION_ENGINE=classifier while no
+    model is loaded; requests asking for the classifier explicitly still
+    get a 503.
+    """
+    if EMOTION_ENGINE == ENGINE_CLASSIFIER and not emotion_classifier:
+        return ENGINE_KEYWORD
+    return EMOTION_ENGINE
 
-def analyze_sentiment(text):
-    """Analyze sentiment using TextBlob."""
-    blob = TextBlob(text)
-    return blob.sentiment.polarity
-
-def get_primary_emotion(emotion_scores, sentiment_polarity):
-    """Determine primary emotion based on scores and sentiment."""
-    if not emotion_scores:
-        # No emotion keywords found, use sentiment
-        if sentiment_polarity > 0.3:
-            return 'joy', 0.6
-        elif sentiment_polarity < -0.3:
-            return 'sadness', 0.6
-        else:
-            return 'neutral', 0.5
+def check_engine(engine):
+    """Return an error response if engine is unknown or unavailable, else None."""
+    if engine not in EMOTION_ENGINES:
+        return jsonify({'error': f"engine must be one of: {', '.join(EMOTION_ENGINES)}"}), 400
+    if engine == ENGINE_CLASSIFIER and not emotion_classifier:
+        return jsonify({'error': 'Emotion classifier is not loaded'}), 503
+    return None
+
+def normalize_text(text):
+    """Normalize text for cache keying (Unicode NFC, surrounding whitespace removed)."""
+    return unicodedata.normalize('NFC', text).strip()
+
+def emotion_cache_key(text, engine=ENGINE_KEYWORD):
+    """
+    Content-addressed cache key for a text.
     
-    # Find emotion with highest score
-    primary_emotion = max(emotion_scores.items(), key=lambda x: x[1])
+    Uses a SHA-256 digest of the normalized text so every replica and
+    restart computes the same key (the built-in hash() is salted per process).
+    With EMOTION_CACHE_CANONICAL the canonical form is hashed instead, under
+    its own namespace. Classifier results are namespaced by model version so
+    a retrained model never serves stale analyses.
+    """
+    namespace = EMOTION_CACHE_KEY_PREFIX
+    if engine == ENGINE_CLASSIFIER:
+        namespace += f"{engine}:{emotion_classifier.version}:"
+    if EMOTION_CACHE_CANONICAL:
+        namespace += f"c{CANONICAL_VERSION}:"
+        text = canonicalize_text(text)
+    else:
+        text = normalize_text(text)
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return f"{namespace}{digest}"
+
+def build_result(text, analysis, user_id, timestamp):
+    """Attach the per-request envelope to a cached or fresh analysis."""
+    return {
+        'text': text,
+        **analysis,
+        'user_id': user_id,
+        'timestamp': timestamp
+    }
+
+def get_cached_results(cache_keys):
+    """
+    Fetch cached analyses, checking the local tier before Redis.
     
-    # Calculate confidence based on score and sentiment alignment
-    emotion_name, keyword_score = primary_emotion
-    max_possible_score = len(EMOTION_KEYWORDS[emotion_name])
-    keyword_confidence = keyword_score / max_possible_score
+    Redis is queried with a single MGET for the local misses only, and
+    Redis hits are copied into the local tier.
+    """
+    results = local_cache.get_many(cache_keys)
+    missing = [i for i, result in enumerate(results) if result is None]
+    cache_hits.labels(tier='local').inc(len(cache_keys) - len(missing))
+    cache_misses.labels(tier='local').inc(len(missing))
     
-    # Adjust confidence based on sentiment alignment
-    if emotion_name in ['joy', 'trust', 'anticipation'] and sentiment_polarity > 0:
-        sentiment_boost = min(sentiment_polarity, 0.3)
-    elif emotion_name in ['sadness', 'fear', 'anger', 'disgust'] and sentiment_polarity < 0:
-        sentiment_boost = min(abs(sentiment_polarity), 0.3)
-    else:
-        sentiment_boost = 0
+    if not redis_client or not missing:
+        return results
+    
+    try:
+        values = redis_client.mget([cache_keys[i] for i in missing])
+    except Exception as e:
+        logger.error(f"Redis cache error: {e}")
+        return results
+    
+    found = []
+    for i, value in zip(missing, values):
+        if value:
+            results[i] = json.loads(value)
+            found.append((cache_keys[i], results[i]))
+    
+    cache_hits.labels(tier='redis').inc(len(found))
+    cache_misses.labels(tier='redis').inc(len(missing) - len(found))
+    local_cache.set_many(found)
+    
+    return results
+
+def cache_results(entries, ttl=EMOTION_CACHE_TTL):
+    """Cache (key, analysis) pairs locally and in Redis with one pipelined round trip."""
+    if not entries:
+        return
+    
+    local_cache.set_many(entries)
+    
+    if not redis_client:
+        return
+    
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for cache_key, analysis in entries:
+            pipe.setex(cache_key, ttl, json.dumps(analysis))
+        pipe.execute()
+    except Exception as e:
+        logger.error(f"Redis cache error: {e}")
+
+def iter_ndjson_records(stream, max_line_bytes=EMOTION_STREAM_MAX_LINE_BYTES):
+    """
+    Read newline-delimited JSON from a byte stream one line at a time.
+    
+    Yields (line_number, text, record_id, error) tuples; blank lines are
+    skipped and oversized lines are discarded without being buffered.
+    """
+    line_number = 0
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        line_number += 1
+        
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            # Drain the rest of the oversized line in bounded reads
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes + 1)
+            yield line_number, None, None, f'Line exceeds {max_line_bytes} bytes'
+            continue
+        
+        line = line.strip()
+        if not line:
+            continue
+        
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None, None, 'Invalid JSON'
+            continue
+        
+        # Accept either {"text": ..., "id": ...} objects or bare JSON strings
+        if isinstance(record, dict):
+            text, record_id = record.get('text'), record.get('id')
+        else:
+            text, record_id = record, None
+        
+        if not isinstance(text, str) or not text.strip():
+            yield line_number, None, record_id, 'Text is required'
+            continue
+        
+        yield line_number, text.strip(), record_id, None
+
+def stream_analyses(records, chunk_size=EMOTION_STREAM_CHUNK_SIZE, engine=None):
+    """
+    Score records in bounded chunks and yield NDJSON result lines.
     
-    final_confidence = min(keyword_confidence + sentiment_boost, 1.0)
+    At most chunk_size records are held at once. The final line is a summary
+    with overall and per-chunk throughput.
+    """
+    started = time.perf_counter()
+    totals = {'records': 0, 'errors': 0, 'chunks': 0}
+    chunk_rates = []
     
-    return emotion_name, final_confidence
+    def flush(chunk):
+        chunk_started = time.perf_counter()
+        scored = [entry for entry in chunk if entry[3] is None]
+        analyses = iter(analyze_texts([entry[1] for entry in scored], engine))
+        
+        lines = []
+        for line_number, _text, record_id, error in chunk:
+            result = {'line': line_number}
+            if record_id is not None:
+                result['id'] = record_id
+            if error:
+                result['error'] = error
+            else:
+                result.update(next(analyses))
+            lines.append(json.dumps(result) + '\n')
+        
+        elapsed = time.perf_counter() - chunk_started
+        totals['records'] += len(scored)
+        totals['errors'] += len(chunk) - len(scored)
+        totals['chunks'] += 1
+        if scored and elapsed > 0:
+            chunk_rates.append(len(scored) / elapsed)
+        return ''.join(lines)
+    
+    chunk = []
+    for entry in records:
+        chunk.append(entry)
+        if len(chunk) >= chunk_size:
+            yield flush(chunk)
+            chunk = []
+    if chunk:
+        yield flush(chunk)
+    
+    elapsed = time.perf_counter() - started
+    yield json.dumps({'summary': {
+        **totals,
+        'elapsed_seconds': round(elapsed, 3),
+        'records_per_second': round(totals['records'] / elapsed, 1) if elapsed > 0 else None,
+        'chunk_records_per_second': {
+            'min': round(min(chunk_rates), 1),
+            'max': round(max(chunk_rates), 1),
+            'mean': round(sum(chunk_rates) / len(chunk_rates), 1)
+        } if chunk_rates else None
+    }}) + '\n'
+
+def get_stage_timer():
+    """Stage timer for the current request, created on first use."""
+    if 'stage_timer' not in g:
+        g.stage_timer = StageTimer()
+    return g.stage_timer
+
+@app.after_request
+def record_stage_timings(response):
+    """Observe stage durations and optionally expose them as Server-Timing."""
+    timer = g.pop('stage_timer', None)
+    if timer and timer.stages:
+        timer.observe(stage_duration)
+        if EMOTION_SERVER_TIMING:
+            response.headers['Server-Timing'] = timer.server_timing()
+    return response
 
 @app.route('/health', methods=['GET'])
 @metrics.counter('health_checks', 'Number of health check requests')
@@ -183,6 +492,9 @@ def health_check():
         'service': 'emotion-service',
         'status': 'healthy',
         'queue_connection': queue_healthy,
+        'emotion_engine': default_engine(),
+        'classifier_version': emotion_classifier.version if emotion_classifier else None,
+        'cache_canonical': EMOTION_CACHE_CANONICAL,
         'timestamp': datetime.utcnow().isoformat()
     }), 200
 
@@ -214,47 +526,63 @@ def detect_emotion():
     if not text:
         return jsonify({'error': 'Text is required'}), 400
     
-    # Check cache first
-    cache_key = f"emotion:{hash(text)}"
-    if redis_client:
-        cached_result = redis_client.get(cache_key)
-        if cached_result:
-            result = json.loads(cached_result)
-            logger.info(f"Emotion analysis result from cache for text: {text[:50]}...")
-            return jsonify(result), 200
+    engine = data.get('engine') or default_engine()
+    engine_error = check_engine(engine)
+    if engine_error:
+        return engine_error
+    
+    user_id = user_data.get('user', {}).get('id')
+    timer = get_stage_timer()
+    
+    # Check cache first (only the analysis is cached, never the envelope)
+    with timer.stage('cache_get'):
+        cache_key = emotion_cache_key(text, engine)
+        analysis = get_cached_results([cache_key])[0]
+    timer.cache = 'hit' if analysis else 'miss'
+    if analysis:
+        logger.info(f"Emotion analysis result from cache for text: {text[:50]}...")
+        return jsonify(build_result(text, analysis, user_id, datetime.utcnow().isoformat())), 200
     
     try:
         # Analyze emotion
-        emotion_scores = detect_emotion_keywords(text)
-        sentiment_polarity = analyze_sentiment(text)
-        primary_emotion, confidence = get_primary_emotion(emotion_scores, sentiment_polarity)
+        if engine == ENGINE_CLASSIFIER:
+            with timer.stage('classify'):
+                primary_emotion, confidence, emotion_scores = emotion_classifier.classify([text])[0]
+            with timer.stage('sentiment'):
+                sentiment_polarity = analyze_sentiment(text)
+        else:
+            with timer.stage('keywords'):
+                emotion_scores = detect_emotion_keywords(text)
+            with timer.stage('sentiment'):
+                sentiment_polarity = analyze_sentiment(text)
+            with timer.stage('primary_emotion'):
+                primary_emotion, confidence = get_primary_emotion(emotion_scores, sentiment_polarity)
         
-        result = {
-            'text': text,
+        analysis = {
             'emotion': primary_emotion,
             'confidence': round(confidence, 3),
             'sentiment': round(sentiment_polarity, 3),
-            'emotion_scores': emotion_scores,
-            'user_id': user_data.get('user', {}).get('id'),
-            'timestamp': datetime.utcnow().isoformat()
+            'emotion_scores': emotion_scores
         }
+        result = build_result(text, analysis, user_id, datetime.utcnow().isoformat())
         
-        # Cache the result
-        if redis_client:
-            redis_client.setex(cache_key, 3600, json.dumps(result))  # Cache for 1 hour
+        # Cache the analysis
+        with timer.stage('cache_set'):
+            cache_results([(cache_key, analysis)])
         
-        # Publish emotion analysis event to RabbitMQ
+        # Queue emotion analysis event for RabbitMQ (non-blocking)
         if queue_client:
             try:
-                queue_client.publish_emotion_analyzed({
-                    'text': text,
-                    'emotion': primary_emotion,
-                    'confidence': confidence,
-                    'sentiment': sentiment_polarity,
-                    'user_id': user_data.get('user', {}).get('id'),
-                    'timestamp': datetime.utcnow().isoformat()
-                })
-                logger.info(f"Published emotion analysis event for text: {text[:50]}...")
+                with timer.stage('publish'):
+                    queue_client.publish_emotion_analyzed_async({
+                        'text': text,
+                        'emotion': primary_emotion,
+                        'confidence': confidence,
+                        'sentiment': sentiment_polarity,
+                        'user_id': user_data.get('user', {}).get('id'),
+                        'timestamp': datetime.utcnow().isoformat()
+                    })
+                logger.info(f"Queued emotion analysis event for text: {text[:50]}...")
             except Exception as e:
                 logger.error(f"Failed to publish emotion analysis event: {e}")
         
@@ -266,6 +594,111 @@ def detect_emotion():
         logger.error(f"Emotion analysis failed: {e}")
         return jsonify({'error': 'Emotion analysis failed'}), 500
 
+@app.route('/api/emotion/detect/batch', methods=['POST'])
+@metrics.counter('emotion_batch_detections', 'Number of batch emotion detection requests')
+def detect_emotion_batch():
+    """Detect emotion for a batch of texts in one request."""
+    # Set default user_data for demo (matches detect_emotion)
+    user_data = {'user': {'id': 'demo_user'}}
+    
+    data = request.get_json()
+    
+    if not data:
+        return jsonify({'error': 'JSON data required'}), 400
+    
+    texts = data.get('texts')
+    
+    if not isinstance(texts, list) or not texts:
+        return jsonify({'error': 'texts must be a non-empty list'}), 400
+    
+    if len(texts) > EMOTION_BATCH_MAX_TEXTS:
+        return jsonify({'error': f'At most {EMOTION_BATCH_MAX_TEXTS} texts per batch'}), 413
+    
+    if not all(isinstance(text, str) and text.strip() for text in texts):
+        return jsonify({'error': 'Every text must be a non-empty string'}), 400
+    
+    texts = [text.strip() for text in texts]
+    
+    engine = data.get('engine') or default_engine()
+    engine_error = check_engine(engine)
+    if engine_error:
+        return engine_error
+    
+    try:
+        # One MGET for the whole batch
+        user_id = user_data.get('user', {}).get('id')
+        timestamp = datetime.utcnow().isoformat()
+        timer = get_stage_timer()
+        with timer.stage('cache_get'):
+            cache_keys = [emotion_cache_key(text, engine) for text in texts]
+            analyses = get_cached_results(cache_keys)
+        misses = [i for i, analysis in enumerate(analyses) if analysis is None]
+        timer.cache = 'miss' if len(misses) == len(texts) else 'partial' if misses else 'hit'
+        
+        if misses:
+            with timer.stage('analyze'):
+                for i, analysis in zip(misses, analyze_texts([texts[i] for i in misses], engine)):
+                    analyses[i] = analysis
+            
+            # One pipelined SETEX round trip for every miss
+            with timer.stage('cache_set'):
+                cache_results([(cache_keys[i], analyses[i]) for i in misses])
+        
+        results = [build_result(text, analysis, user_id, timestamp) for text, analysis in zip(texts, analyses)]
+        
+        # Queue one event per miss; the background publisher batches them
+        if misses and queue_client:
+            try:
+                with timer.stage('publish'):
+                    for i in misses:
+                        queue_client.publish_emotion_analyzed_async({
+                            'text': results[i]['text'],
+                            'emotion': results[i]['emotion'],
+                            'confidence': results[i]['confidence'],
+                            'sentiment': results[i]['sentiment'],
+                            'user_id': user_id,
+                            'timestamp': timestamp
+                        })
+                logger.info(f"Queued emotion analysis events for {len(misses)} texts")
+            except Exception as e:
+                logger.error(f"Failed to queue emotion analysis events: {e}")
+        
+        logger.info(f"Batch emotion analysis completed: {len(texts)} texts, {len(texts) - len(misses)} from cache")
+        
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'cache_hits': len(texts) - len(misses)
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Batch emotion analysis failed: {e}")
+        return jsonify({'error': 'Emotion analysis failed'}), 500
+
+@app.route('/api/emotion/stream', methods=['POST'])
+@metrics.counter('emotion_stream_requests', 'Number of streaming emotion detection requests')
+def detect_emotion_stream():
+    """
+    Detect emotion for an NDJSON request body, streaming NDJSON results.
+    
+    The body is read incrementally and scored in chunks, so memory use does
+    not grow with the input size. Results bypass the cache and event bus.
+    The engine can be chosen with the ?engine= query parameter.
+    """
+    engine = request.args.get('engine') or default_engine()
+    engine_error = check_engine(engine)
+    if engine_error:
+        return engine_error
+    
+    records = iter_ndjson_records(request.stream)
+    
+    logger.info(f"Started streaming emotion analysis ({engine} engine)")
+    
+    return Response(
+        stream_with_context(stream_analyses(records, engine=engine)),
+        mimetype='application/x-ndjson'
+    )
+
 @app.route('/api/analyze', methods=['POST'])
 @metrics.counter('emotion_analyze_requests', 'Number of emotion analyze requests')
 def analyze_text():
@@ -344,8 +777,8 @@ def validate_emotion():
         # Publish validation event to RabbitMQ for model improvement
         if queue_client:
             try:
-                queue_client.publish_event('emotion.validation', validation_data)
-                logger.info(f"Published emotion validation event for text: {text[:50]}...")
+                queue_client.publish_event_async('emotion.validation', validation_data)
+                logger.info(f"Queued emotion validation event for text: {text[:50]}...")
             except Exception as e:
                 logger.error(f"Failed to publish emotion validation event: {e}")
         
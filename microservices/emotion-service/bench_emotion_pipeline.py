@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Benchmark and regression suite for the emotion detection hot path.
+Times keyword detection, sentiment analysis, primary-emotion selection, the
+full /api/emotion/detect handler (Flask test client, Redis and RabbitMQ
+stubbed), the monolith EmotionService.detect_emotion and the stage-timing
+instrumentation itself over a realistic mix of text lengths, reporting
+ops/sec, p50 and p99. Batches of BATCH_SIZE texts are also scored with the
+keyword engine and with a throwaway classifier (trained on the keyword
+engine's own labels) to compare the two engines' throughput.
+
+Results can be saved as a JSON baseline and compared on a later run; any
+benchmark whose ops/sec or p50 is worse than the baseline by more than the
+threshold is flagged and the script exits with status 1.
+
+Usage:
+    git checkout main && python bench_emotion_pipeline.py --save /tmp/main.json
+    git checkout my-branch && python bench_emotion_pipeline.py --compare /tmp/main.json
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from unittest.mock import MagicMock
+
+# Score inline and fail fast on backends before app.py is imported
+os.environ.setdefault('SENTIMENT_POOL_SIZE', '0')
+os.environ.setdefault('REDIS_HOST', 'localhost')
+
+from bench_keyword_matcher import build_long_text
+
+MONOLITH_EMOTION_SERVICE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..', '..', 'monolith-backup', 'services.monolith', 'emotion_service.py'
+)
+
+# (share of texts, min chars, max chars): mostly chat messages, some
+# paragraphs and a tail of long pasted texts
+LENGTH_MIX = [
+    (0.65, 10, 120),
+    (0.30, 120, 800),
+    (0.05, 800, 4000),
+]
+
+DEFAULT_THRESHOLD = 0.10
+BATCH_SIZE = 100
+
+
+def build_corpus(size, seed=7):
+    """Deterministic texts whose lengths follow LENGTH_MIX."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        roll, cumulative = rng.random(), 0.0
+        for share, low, high in LENGTH_MIX:
+            cumulative += share
+            if roll <= cumulative:
+                break
+        length = rng.randint(low, high)
+        text = build_long_text(length, seed=seed * 100003 + i)[:length]
+        corpus.append(text.rsplit(' ', 1)[0] if ' ' in text else text)
+    return corpus
+
+
+def measure(func, inputs, min_time):
+    """Call func on each input (cycling) for at least min_time seconds."""
+    latencies = []
+    started = time.perf_counter()
+    while True:
+        for item in inputs:
+            t0 = time.perf_counter_ns()
+            func(item)
+            latencies.append(time.perf_counter_ns() - t0)
+        if time.perf_counter() - started >= min_time:
+            break
+
+    latencies.sort()
+    total = sum(latencies) / 1e9
+    return {
+        'n': len(latencies),
+        'ops_per_sec': round(len(latencies) / total, 1),
+        'p50_us': round(latencies[len(latencies) // 2] / 1e3, 2),
+        'p99_us': round(latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] / 1e3, 2),
+    }
+
+
+def load_monolith_emotion_service():
+    """Import the monolith EmotionService straight from its file."""
+    spec = importlib.util.spec_from_file_location('monolith_emotion_service', MONOLITH_EMOTION_SERVICE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.EmotionService
+
+
+def load_throwaway_classifier(corpus, analyze_texts):
+    """
+    Train a classifier on the keyword engine's labels for corpus and load it
+    back memory-mapped, the way the service does.
+    
+    Returns None when scikit-learn is not installed.
+    """
+    try:
+        from emotion_classifier import EmotionClassifier, train
+    except ImportError:
+        return None
+    labels = [analysis['emotion'] for analysis in analyze_texts(corpus)]
+    path = tempfile.mkdtemp(prefix='emotion-classifier-')
+    train(corpus, labels, n_features=2 ** 16, epochs=5).save(path, examples=len(corpus))
+    return EmotionClassifier.load(path)
+
+
+def build_benchmarks(corpus):
+    """Return [(name, func, inputs)] for every benchmark."""
+    import app as app_module
+    from local_cache import LocalCache
+    from stage_timer import StageTimer
+
+    # Stub the backends; a zero-size local tier keeps every request a cache miss
+    app_module.redis_client = MagicMock()
+    app_module.redis_client.mget.side_effect = lambda keys: [None] * len(keys)
+    app_module.queue_client = MagicMock()
+    app_module.local_cache = LocalCache(max_entries=0)
+    client = app_module.app.test_client()
+
+    def detect_request(text):
+        response = client.post('/api/emotion/detect', json={'text': text})
+        assert response.status_code == 200
+
+    def stage_timer_overhead(_text):
+        # The instrumentation one /api/emotion/detect miss adds on its own
+        timer = StageTimer()
+        for stage in ('cache_get', 'keywords', 'sentiment', 'primary_emotion', 'cache_set', 'publish'):
+            with timer.stage(stage):
+                pass
+        timer.cache = 'miss'
+        timer.observe(app_module.stage_duration)
+        timer.server_timing()
+
+    scored = [(app_module.detect_emotion_keywords(text), app_module.analyze_sentiment(text)) for text in corpus]
+    EmotionService = load_monolith_emotion_service()
+    batches = [corpus[i:i + BATCH_SIZE] for i in range(0, len(corpus), BATCH_SIZE)]
+    app_module.emotion_classifier = load_throwaway_classifier(corpus, app_module.analyze_texts)
+
+    benchmarks = [
+        ('detect_emotion_keywords', app_module.detect_emotion_keywords, corpus),
+        ('analyze_sentiment', app_module.analyze_sentiment, corpus),
+        ('get_primary_emotion', lambda args: app_module.get_primary_emotion(*args), scored),
+        ('POST /api/emotion/detect', detect_request, corpus),
+        ('monolith detect_emotion', EmotionService.detect_emotion, corpus),
+        ('stage timer overhead', stage_timer_overhead, corpus),
+        (f'keyword batch x{BATCH_SIZE}', lambda texts: app_module.analyze_texts(texts, 'keyword'), batches),
+    ]
+    if app_module.emotion_classifier:
+        benchmarks.append((f'classifier batch x{BATCH_SIZE}',
+                           lambda texts: app_module.analyze_texts(texts, 'classifier'), batches))
+    return benchmarks
+
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare results with a baseline.
+
+    Returns {name: {'ops_change', 'p50_change', 'p99_change', 'regressed'}}
+    with fractional changes (ops/sec down or latency up means slower).
+    """
+    comparison = {}
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        ops_change = current['ops_per_sec'] / previous['ops_per_sec'] - 1
+        p50_change = current['p50_us'] / previous['p50_us'] - 1
+        p99_change = current['p99_us'] / previous['p99_us'] - 1
+        comparison[name] = {
+            'ops_change': round(ops_change, 4),
+            'p50_change': round(p50_change, 4),
+            'p99_change': round(p99_change, 4),
+            # p99 is reported but too noisy on shared machines to gate on
+            'regressed': ops_change < -threshold or p50_change > threshold
+        }
+    return comparison
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the emotion detection pipeline')
+    parser.add_argument('--corpus-size', type=int, default=300)
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds per benchmark')
+    parser.add_argument('--only', action='append', help='run only benchmarks containing this text')
+    parser.add_argument('--save', help='write results as a JSON baseline')
+    parser.add_argument('--compare', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown before flagging a regression (default: 0.10)')
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.corpus_size)
+    results = {}
+
+    print(f"{'benchmark':<28}{'ops/sec':>12}{'p50 (us)':>12}{'p99 (us)':>12}")
+    for name, func, inputs in build_benchmarks(corpus):
+        if args.only and not any(part in name for part in args.only):
+            continue
+        func(inputs[0])  # warm caches and lazy imports
+        results[name] = measure(func, inputs, args.min_time)
+        r = results[name]
+        print(f"{name:<28}{r['ops_per_sec']:>12.1f}{r['p50_us']:>12.2f}{r['p99_us']:>12.2f}")
+
+    if 'stage timer overhead' in results and 'POST /api/emotion/detect' in results:
+        share = results['stage timer overhead']['p50_us'] / results['POST /api/emotion/detect']['p50_us']
+        print(f"Stage timing adds {share:.2%} to the p50 detect request")
+
+    keyword_batch, classifier_batch = f'keyword batch x{BATCH_SIZE}', f'classifier batch x{BATCH_SIZE}'
+    if keyword_batch in results and classifier_batch in results:
+        ratio = results[classifier_batch]['ops_per_sec'] / results[keyword_batch]['ops_per_sec']
+        print(f"Classifier engine runs at {ratio:.2f}x the keyword engine's batch throughput")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'commit': git_commit(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'corpus_size': args.corpus_size
+                },
+                'results': results
+            }, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        comparison = compare_results(results, baseline['results'], args.threshold)
+        print(f"\nCompared with {baseline['meta'].get('commit') or args.compare} "
+              f"(threshold {args.threshold:.0%})")
+        print(f"{'benchmark':<28}{'ops/sec':>10}{'p50':>10}{'p99':>10}")
+        for name, change in comparison.items():
+            flag = '  REGRESSION' if change['regressed'] else ''
+            print(f"{name:<28}{change['ops_change']:>+10.1%}{change['p50_change']:>+10.1%}"
+                  f"{change['p99_change']:>+10.1%}{flag}")
+        if any(change['regressed'] for change in comparison.values()):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for emotion keyword detection.
+Compares the original per-keyword substring scan with the single-pass
+KeywordMatcher on short chat messages and multi-kilobyte texts.
+
+Usage: python bench_keyword_matcher.py [--repeat 5] [--number 2000]
+"""
+
+import argparse
+import random
+import timeit
+
+from emotion_engine import EMOTION_KEYWORDS
+from keyword_matcher import KeywordMatcher
+
+CHAT_MESSAGES = [
+    "I'm feeling really excited about this new project!",
+    "I'm quite frustrated with how things are going.",
+    "This situation makes me very anxious and worried.",
+    "I feel incredibly happy and grateful today!",
+    "I'm disappointed with the recent developments.",
+    "This news makes me feel surprised and curious.",
+    "I'm feeling overwhelmed with all the work.",
+    "I feel peaceful and content with life right now."
+]
+
+
+def substring_scan(text):
+    """Original implementation: one substring search per keyword."""
+    text_lower = text.lower()
+    emotion_scores = {}
+
+    for emotion, keywords in EMOTION_KEYWORDS.items():
+        score = sum(1 for keyword in keywords if keyword in text_lower)
+        if score > 0:
+            emotion_scores[emotion] = score
+
+    return emotion_scores
+
+
+def build_long_text(size_bytes, seed=42):
+    """Build a deterministic multi-kilobyte text out of chat messages and filler."""
+    rng = random.Random(seed)
+    filler = "the meeting was moved to thursday and nobody made any notes about it".split()
+    parts = []
+    length = 0
+
+    while length < size_bytes:
+        if rng.random() < 0.2:
+            chunk = rng.choice(CHAT_MESSAGES)
+        else:
+            chunk = " ".join(rng.choice(filler) for _ in range(12)) + "."
+        parts.append(chunk)
+        length += len(chunk) + 1
+
+    return " ".join(parts)
+
+
+def bench(label, func, texts, repeat, number):
+    """Return best-of-repeat microseconds per call."""
+    timer = timeit.Timer(lambda: [func(text) for text in texts])
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return best / (number * len(texts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark emotion keyword detection')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    matcher = KeywordMatcher(EMOTION_KEYWORDS)
+    workloads = [
+        ('short chat messages', CHAT_MESSAGES, args.number),
+        ('4 KB texts', [build_long_text(4 * 1024, seed) for seed in range(4)], max(args.number // 20, 1)),
+        ('32 KB texts', [build_long_text(32 * 1024, seed) for seed in range(2)], max(args.number // 200, 1)),
+    ]
+
+    print(f"{'workload':<22}{'substring (us)':>16}{'matcher (us)':>16}{'speedup':>10}")
+    for label, texts, number in workloads:
+        old = bench(label, substring_scan, texts, args.repeat, number)
+        new = bench(label, matcher.score, texts, args.repeat, number)
+        print(f"{label:<22}{old:>16.2f}{new:>16.2f}{old / new:>9.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Cache hit-ratio report for canonical (near-duplicate) emotion cache keys.
+Replays a stream of texts through an unbounded cache keyed first on the
+exact normalized text and then on the canonical form, and reports how many
+extra hits canonicalization buys. Every canonical hit is also scored on its
+own text, to show how far a reused analysis drifts from a fresh one
+(emotion disagreements and sentiment differences).
+
+Texts come from JSONL/CSV files (as in score_corpus.py) and/or the
+load-test corpora. The load testers send a handful of fixed texts, so
+--replay samples requests from them the same way, and --variants rewrites a
+share of requests the way people type them (case, apostrophes, repeated
+punctuation, spacing, emoji skin tones).
+
+Usage:
+    python cache_hit_report.py ../../requests.jsonl --text-field title --text-field body
+    python cache_hit_report.py --load-test-corpora --replay 10000 --variants 0.5
+"""
+
+import argparse
+import ast
+import os
+import random
+import sys
+
+# Add shared-libs to path (compiled sentiment lexicon)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared-libs'))
+
+from emotion_engine import analyze_texts
+from score_corpus import read_records, record_text
+from sentiment_pool import ENGINE_LEXICON, resolve_engine
+from text_canonicalizer import canonicalize_text
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+LOAD_TEST_SCRIPTS = [
+    os.path.join(REPO_ROOT, 'simple_load_test.py'),
+    os.path.join(REPO_ROOT, 'run_load_test.py'),
+    os.path.join(REPO_ROOT, 'monolith-backup', 'tests.monolith', 'load_testing.py'),
+]
+
+SKIN_TONES = ['', '\U0001f3fb', '\U0001f3fd', '\U0001f3ff']
+
+
+def load_test_texts(paths=LOAD_TEST_SCRIPTS):
+    """Emotion texts from the load-test scripts' literal lists (emotions, emotion_texts)."""
+    texts = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Assign) or not isinstance(node.value, ast.List):
+                continue
+            names = [getattr(target, 'id', None) or getattr(target, 'attr', '') for target in node.targets]
+            values = node.value.elts
+            if any('emotion' in name for name in names) and values and all(
+                    isinstance(value, ast.Constant) and isinstance(value.value, str) for value in values):
+                texts.extend(value.value for value in values)
+    # Several scripts share the same list
+    return list(dict.fromkeys(texts))
+
+
+def typed_variant(text, rng):
+    """Rewrite text the way a chat user might type it."""
+    if rng.random() < 0.5:
+        text = text.lower()
+    if rng.random() < 0.5:
+        text = text.replace("'", '')
+    if rng.random() < 0.3:
+        text = text.replace(' ', '  ', 1)
+    if rng.random() < 0.4 and text[-1:] in '!?':
+        text += text[-1] * rng.randint(1, 3)
+    elif rng.random() < 0.3 and text[-1:] == '.':
+        text = text[:-1]
+    if rng.random() < 0.2:
+        text += ' \U0001f44d' + rng.choice(SKIN_TONES)
+    return text
+
+
+def replay(texts, count, variants, seed=7):
+    """Sample count requests from texts, rewriting a variants share of them."""
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        text = rng.choice(texts)
+        requests.append(typed_variant(text, rng) if rng.random() < variants else text)
+    return requests
+
+
+def hit_report(texts, engine=ENGINE_LEXICON):
+    """
+    Replay texts through exact and canonical key caches.
+
+    Returns a dict with request and hit counts for both keyings, plus the
+    drift of canonical hits from scoring the request text itself.
+    """
+    exact_seen, canonical_seen = set(), {}
+    exact_hits = canonical_hits = 0
+    reused = []  # (cached analysis index, request index)
+    first_scored = []
+
+    for index, text in enumerate(texts):
+        exact_key = text.strip()
+        if exact_key in exact_seen:
+            exact_hits += 1
+        exact_seen.add(exact_key)
+
+        canonical_key = canonicalize_text(text)
+        if canonical_key in canonical_seen:
+            canonical_hits += 1
+            reused.append((canonical_seen[canonical_key], index))
+        else:
+            canonical_seen[canonical_key] = index
+            first_scored.append(index)
+
+    analyses = dict(zip(first_scored, analyze_texts([texts[i] for i in first_scored], engine)))
+    # Only canonical hits that are not also exact hits can drift
+    drifting = [(cached, i) for cached, i in reused if texts[cached].strip() != texts[i].strip()]
+    fresh = analyze_texts([texts[i] for _cached, i in drifting], engine) if drifting else []
+    emotion_mismatches = 0
+    sentiment_deltas = []
+    for (cached, _i), analysis in zip(drifting, fresh):
+        emotion_mismatches += analyses[cached]['emotion'] != analysis['emotion']
+        sentiment_deltas.append(abs(analyses[cached]['sentiment'] - analysis['sentiment']))
+
+    total = len(texts)
+    return {
+        'requests': total,
+        'exact_keys': len(exact_seen),
+        'exact_hits': exact_hits,
+        'exact_hit_ratio': round(exact_hits / total, 4) if total else 0.0,
+        'canonical_keys': len(canonical_seen),
+        'canonical_hits': canonical_hits,
+        'canonical_hit_ratio': round(canonical_hits / total, 4) if total else 0.0,
+        'near_duplicate_hits': len(drifting),
+        'emotion_mismatches': emotion_mismatches,
+        'max_sentiment_delta': round(max(sentiment_deltas), 3) if sentiment_deltas else 0.0,
+        'mean_sentiment_delta': round(sum(sentiment_deltas) / len(sentiment_deltas), 4) if sentiment_deltas else 0.0,
+    }
+
+
+def print_report(name, report):
+    gain = report['canonical_hit_ratio'] - report['exact_hit_ratio']
+    print(f"{name}: {report['requests']} requests")
+    print(f"  exact keys:     {report['exact_keys']:>8} distinct, hit ratio {report['exact_hit_ratio']:.2%}")
+    print(f"  canonical keys: {report['canonical_keys']:>8} distinct, hit ratio {report['canonical_hit_ratio']:.2%} "
+          f"({gain:+.2%})")
+    print(f"  near-duplicate hits: {report['near_duplicate_hits']}, emotion mismatches: "
+          f"{report['emotion_mismatches']}, sentiment delta mean {report['mean_sentiment_delta']:.4f} "
+          f"max {report['max_sentiment_delta']:.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report emotion cache hit ratios with canonical keys')
+    parser.add_argument('inputs', nargs='*', help='JSONL or CSV files of texts')
+    parser.add_argument('--text-field', action='append',
+                        help="field holding the text; repeat to join several (default: text)")
+    parser.add_argument('--load-test-corpora', action='store_true',
+                        help='include the texts sent by the load-test scripts')
+    parser.add_argument('--replay', type=int, default=0,
+                        help='sample this many requests from each corpus instead of reading it once')
+    parser.add_argument('--variants', type=float, default=0.0,
+                        help='share of replayed requests rewritten as typed variants (0-1)')
+    parser.add_argument('--engine', default=os.environ.get('SENTIMENT_ENGINE', ENGINE_LEXICON),
+                        help='sentiment engine: lexicon or textblob')
+    args = parser.parse_args(argv)
+    args.text_field = args.text_field or ['text']
+
+    corpora = []
+    for path in args.inputs:
+        input_format = 'csv' if path.endswith('.csv') else 'jsonl'
+        texts = [record_text(record, args.text_field) for record in read_records(path, input_format)]
+        corpora.append((os.path.basename(path), [text for text in texts if text]))
+    if args.load_test_corpora:
+        corpora.append(('load-test corpora', load_test_texts()))
+    if not corpora:
+        parser.error('give input files and/or --load-test-corpora')
+
+    engine = resolve_engine(args.engine)
+    for name, texts in corpora:
+        if not texts:
+            print(f"{name}: no texts")
+            continue
+        if args.replay:
+            texts = replay(texts, args.replay, args.variants)
+            name = f"{name} (replay {args.replay}, {args.variants:.0%} variants)"
+        print_report(name, hit_report(texts, engine))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
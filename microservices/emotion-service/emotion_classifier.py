@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Emotion Classifier - Hashing-vectorizer linear model for emotion detection.
+Texts are hashed into a fixed-size sparse feature space (no vocabulary to
+store or fit), and a batch is classified with one sparse-dense matrix
+product against a weight matrix that is memory-mapped from disk, so every
+worker process shares the same pages.
+
+The model is trained offline from the emotion.validation feedback events:
+
+    python emotion_classifier.py export -o feedback.jsonl
+    python emotion_classifier.py train feedback.jsonl -o models/emotion_classifier
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+
+from emotion_engine import EMOTION_KEYWORDS
+from keyword_matcher import KeywordMatcher
+
+MODEL_VERSION = 1
+DEFAULT_MODEL_PATH = os.environ.get(
+    'EMOTION_CLASSIFIER_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'emotion_classifier')
+)
+DEFAULT_N_FEATURES = 2 ** 18
+DEFAULT_NGRAM_RANGE = (1, 2)
+
+# Labels the classifier may learn (the keyword engine's emotions plus neutral)
+EMOTION_LABELS = frozenset(EMOTION_KEYWORDS) | {'neutral'}
+
+# Feedback meaning "the detected emotion was right"
+POSITIVE_FEEDBACK = frozenset(('correct', 'yes', 'true', 'accurate', 'right', 'agree', 'thumbs_up'))
+
+
+def extract_features(text, ngram_range=DEFAULT_NGRAM_RANGE):
+    """
+    Word n-grams using the keyword matcher's tokenizer.
+    
+    The byte-translate tokenizer is ~25% faster than the vectorizer's
+    default regex analyzer, which dominates classification time.
+    """
+    words = [word.decode('ascii') for word in KeywordMatcher.tokenize(text)]
+    low, high = ngram_range
+    features = words[:] if low == 1 else []
+    for n in range(max(low, 2), high + 1):
+        features.extend(' '.join(words[i:i + n]) for i in range(len(words) - n + 1))
+    return features
+
+
+def build_vectorizer(n_features=DEFAULT_N_FEATURES, ngram_range=DEFAULT_NGRAM_RANGE):
+    """Stateless vectorizer; float32 output matches the stored weights."""
+    return HashingVectorizer(
+        n_features=n_features,
+        analyzer=partial(extract_features, ngram_range=tuple(ngram_range)),
+        alternate_sign=False,
+        norm='l2',
+        dtype=np.float32
+    )
+
+
+class EmotionClassifier:
+    """Linear emotion model over hashed word and bigram features."""
+
+    def __init__(self, weights, intercept, classes, n_features=DEFAULT_N_FEATURES,
+                 ngram_range=DEFAULT_NGRAM_RANGE, version=None):
+        self.weights = weights  # (n_features, n_classes), usually a read-only memmap
+        self.intercept = np.asarray(intercept, dtype=np.float32)
+        self.classes = list(classes)
+        self.version = version or 'untrained'
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.vectorizer = build_vectorizer(n_features, ngram_range)
+
+    @classmethod
+    def load(cls, path=None):
+        """Load a model directory, memory-mapping the weight matrix."""
+        path = path or DEFAULT_MODEL_PATH
+        with open(os.path.join(path, 'model.json')) as f:
+            meta = json.load(f)
+        if meta.get('format') != MODEL_VERSION:
+            raise ValueError(f"Unsupported emotion classifier format in {path}")
+        weights = np.load(os.path.join(path, 'weights.npy'), mmap_mode='r')
+        intercept = np.load(os.path.join(path, 'intercept.npy'))
+        return cls(weights, intercept, meta['classes'], meta['n_features'],
+                   meta['ngram_range'], meta['version'])
+
+    def save(self, path, examples=0):
+        """Write weights, intercept and metadata to a model directory."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'weights.npy'), np.ascontiguousarray(self.weights, dtype=np.float32))
+        np.save(os.path.join(path, 'intercept.npy'), self.intercept)
+        with open(os.path.join(path, 'model.json'), 'w') as f:
+            json.dump({
+                'format': MODEL_VERSION,
+                'version': self.version,
+                'classes': self.classes,
+                'n_features': self.n_features,
+                'ngram_range': list(self.ngram_range),
+                'examples': examples,
+                'trained_at': datetime.utcnow().isoformat()
+            }, f, indent=2)
+
+    def predict_proba(self, texts):
+        """Class probabilities for a batch: one sparse matrix product plus softmax."""
+        scores = self.vectorizer.transform(texts) @ self.weights
+        scores += self.intercept
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def classify(self, texts):
+        """Return (emotion, confidence, {emotion: probability}) per text."""
+        probabilities = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        results = []
+        for row, index in zip(probabilities.tolist(), best.tolist()):
+            scores = {emotion: round(p, 3) for emotion, p in zip(self.classes, row)}
+            results.append((self.classes[index], row[index], scores))
+        return results
+
+
+def feedback_label(event):
+    """
+    Training label for one validation event, or None if it has none.
+
+    user_feedback is either the emotion the user says is right, or a
+    positive confirmation of detected_emotion; other feedback is skipped.
+    """
+    feedback = str(event.get('user_feedback', '')).strip().lower()
+    detected = str(event.get('detected_emotion', '')).strip().lower()
+    if feedback in POSITIVE_FEEDBACK:
+        return detected if detected in EMOTION_LABELS else None
+    return feedback if feedback in EMOTION_LABELS else None
+
+
+def unwrap_event(message):
+    """The validation event in a published envelope or an already-unwrapped message."""
+    data = message.get('data', message) if isinstance(message, dict) else None
+    return data if isinstance(data, dict) else None
+
+
+def iter_feedback(path):
+    """Yield (text, label) pairs from a JSONL file of validation events."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            event = unwrap_event(message)
+            if event is None:
+                continue
+            text, label = event.get('text'), feedback_label(event)
+            if isinstance(text, str) and text.strip() and label:
+                yield text.strip(), label
+
+
+def train(texts, labels, n_features=DEFAULT_N_FEATURES, ngram_range=DEFAULT_NGRAM_RANGE, epochs=20):
+    """Fit a one-vs-rest logistic model on hashed features."""
+    from sklearn.linear_model import SGDClassifier
+
+    classes = sorted(set(labels))
+    if len(classes) < 2:
+        raise ValueError(f"Need at least two emotions to train, got {classes}")
+
+    vectorizer = build_vectorizer(n_features, ngram_range)
+    model = SGDClassifier(loss='log_loss', alpha=1e-5, max_iter=epochs, tol=None, random_state=0)
+    model.fit(vectorizer.transform(texts), labels)
+
+    coef, intercept = model.coef_, model.intercept_
+    if len(classes) == 2:
+        # Binary models have one weight row; expand to one column per class
+        coef = np.vstack([-coef[0], coef[0]]) / 2
+        intercept = np.array([-intercept[0], intercept[0]]) / 2
+
+    version = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    return EmotionClassifier(
+        np.ascontiguousarray(coef.T, dtype=np.float32), intercept,
+        [str(c) for c in model.classes_], n_features, ngram_range, version
+    )
+
+
+def export_feedback(output, queue_name='emotion.validation', limit=None):
+    """Drain validation events from RabbitMQ into a JSONL file (acked once written)."""
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared-libs'))
+    from message_queue import MessageQueueClient
+
+    client = MessageQueueClient('emotion-classifier-export')
+    if not client.ensure_connection():
+        raise SystemExit("Could not connect to RabbitMQ")
+    client.channel.queue_declare(queue=queue_name, durable=True, passive=True)
+
+    exported = 0
+    with open(output, 'a', encoding='utf-8') as f:
+        while limit is None or exported < limit:
+            method, _properties, body = client.channel.basic_get(queue=queue_name)
+            if method is None:
+                break
+            f.write(body.decode('utf-8').strip() + '\n')
+            f.flush()
+            client.channel.basic_ack(method.delivery_tag)
+            exported += 1
+    client.close()
+    return exported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train or export data for the emotion classifier')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help='drain emotion.validation events to JSONL')
+    export_parser.add_argument('-o', '--output', required=True)
+    export_parser.add_argument('--limit', type=int)
+
+    train_parser = commands.add_parser('train', help='train a model from validation events')
+    train_parser.add_argument('feedback', help='JSONL of emotion.validation events')
+    train_parser.add_argument('-o', '--output', default=DEFAULT_MODEL_PATH, help='model directory')
+    train_parser.add_argument('--n-features', type=int, default=DEFAULT_N_FEATURES)
+    train_parser.add_argument('--epochs', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        print(f"Exported {export_feedback(args.output, limit=args.limit)} messages to {args.output}")
+        return
+
+    examples = list(iter_feedback(args.feedback))
+    if not examples:
+        raise SystemExit(f"No labelled feedback found in {args.feedback}")
+    texts, labels = zip(*examples)
+    classifier = train(list(texts), list(labels), n_features=args.n_features, epochs=args.epochs)
+    classifier.save(args.output, examples=len(examples))
+    print(f"Trained emotion classifier {classifier.version} on {len(examples)} examples "
+          f"({len(classifier.classes)} emotions) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
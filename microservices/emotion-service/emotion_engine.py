@@ -0,0 +1,84 @@
+"""
+Emotion Engine - Pure emotion scoring with no Redis, RabbitMQ or HTTP.
+Shared by the Flask service and the offline corpus scorer so both produce
+identical results.
+"""
+
+from keyword_matcher import KeywordMatcher
+from sentiment_pool import ENGINE_TEXTBLOB, score_texts
+
+# Emotion categories and keywords
+EMOTION_KEYWORDS = {
+    'joy': ['happy', 'joy', 'excited', 'delighted', 'pleased', 'thrilled', 'ecstatic', 'elated'],
+    'sadness': ['sad', 'depressed', 'melancholy', 'grief', 'sorrow', 'unhappy', 'miserable', 'heartbroken'],
+    'anger': ['angry', 'furious', 'irritated', 'annoyed', 'mad', 'rage', 'frustrated', 'outraged'],
+    'fear': ['afraid', 'scared', 'terrified', 'anxious', 'worried', 'nervous', 'frightened', 'panicked'],
+    'surprise': ['surprised', 'shocked', 'amazed', 'astonished', 'stunned', 'bewildered', 'startled'],
+    'disgust': ['disgusted', 'revolted', 'repulsed', 'sickened', 'appalled', 'horrified'],
+    'trust': ['trust', 'confident', 'secure', 'reliable', 'faithful', 'loyal', 'dependable'],
+    'anticipation': ['excited', 'eager', 'hopeful', 'optimistic', 'enthusiastic', 'looking forward']
+}
+
+# Keyword index built once at import and shared by every caller
+keyword_matcher = KeywordMatcher(EMOTION_KEYWORDS)
+
+
+def detect_emotion_keywords(text):
+    """Detect emotion based on whole-word keyword matching."""
+    return keyword_matcher.score(text)
+
+
+def get_primary_emotion(emotion_scores, sentiment_polarity):
+    """Determine primary emotion based on scores and sentiment."""
+    if not emotion_scores:
+        # No emotion keywords found, use sentiment
+        if sentiment_polarity > 0.3:
+            return 'joy', 0.6
+        elif sentiment_polarity < -0.3:
+            return 'sadness', 0.6
+        else:
+            return 'neutral', 0.5
+    
+    # Find emotion with highest score
+    primary_emotion = max(emotion_scores.items(), key=lambda x: x[1])
+    
+    # Calculate confidence based on score and sentiment alignment
+    emotion_name, keyword_score = primary_emotion
+    max_possible_score = len(EMOTION_KEYWORDS[emotion_name])
+    keyword_confidence = keyword_score / max_possible_score
+    
+    # Adjust confidence based on sentiment alignment
+    if emotion_name in ['joy', 'trust', 'anticipation'] and sentiment_polarity > 0:
+        sentiment_boost = min(sentiment_polarity, 0.3)
+    elif emotion_name in ['sadness', 'fear', 'anger', 'disgust'] and sentiment_polarity < 0:
+        sentiment_boost = min(abs(sentiment_polarity), 0.3)
+    else:
+        sentiment_boost = 0
+    
+    final_confidence = min(keyword_confidence + sentiment_boost, 1.0)
+    
+    return emotion_name, final_confidence
+
+
+def build_analyses(texts, polarities):
+    """
+    Combine keyword scores with precomputed sentiment polarities.
+    
+    Returns a list of analysis dicts (emotion, confidence, sentiment,
+    emotion_scores) in the same order as texts.
+    """
+    analyses = []
+    for emotion_scores, sentiment_polarity in zip(keyword_matcher.score_many(texts), polarities):
+        primary_emotion, confidence = get_primary_emotion(emotion_scores, sentiment_polarity)
+        analyses.append({
+            'emotion': primary_emotion,
+            'confidence': round(confidence, 3),
+            'sentiment': round(sentiment_polarity, 3),
+            'emotion_scores': emotion_scores
+        })
+    return analyses
+
+
+def analyze_texts(texts, engine=ENGINE_TEXTBLOB):
+    """Score a batch of texts in the current process."""
+    return build_analyses(texts, score_texts(texts, engine))
@@ -0,0 +1,88 @@
+"""
+Keyword Matcher - Single-pass emotion keyword detection.
+Builds the keyword lookup tables once at startup so each text is tokenized in
+one linear pass instead of being rescanned once per keyword.
+"""
+
+import re
+
+# Byte translation table: letters and apostrophes survive, everything else
+# (punctuation, digits, whitespace, non-ASCII placeholders) becomes a space.
+_WORD_BYTES = set(b"abcdefghijklmnopqrstuvwxyz'")
+_SEPARATOR_TABLE = bytes(b if b in _WORD_BYTES else 0x20 for b in range(256))
+
+
+class KeywordMatcher:
+    """Match emotion keywords on whole-word boundaries in a single pass."""
+
+    def __init__(self, emotion_keywords):
+        self.emotions = list(emotion_keywords.keys())
+        # Single-word keyword -> emotions it counts towards
+        self.words = {}
+        # Multi-word keyword -> (first word, compiled pattern, emotions)
+        self.phrases = {}
+
+        for emotion, keywords in emotion_keywords.items():
+            for keyword in keywords:
+                tokens = self.tokenize(keyword)
+                if not tokens:
+                    continue
+                if len(tokens) == 1:
+                    self.words.setdefault(tokens[0], []).append(emotion)
+                    continue
+
+                if keyword not in self.phrases:
+                    pattern = re.compile(
+                        r"(?<![a-z'])" + r"[^a-z']+".join(re.escape(t.decode()) for t in tokens) + r"(?![a-z'])"
+                    )
+                    self.phrases[keyword] = (tokens[0], pattern, [])
+                self.phrases[keyword][2].append(emotion)
+
+        # Every token that can start a match, so one set intersection finds
+        # all candidate words and phrases at once
+        self.vocabulary = frozenset(self.words) | frozenset(first for first, _, _ in self.phrases.values())
+
+    @staticmethod
+    def tokenize(text):
+        """Split text into lowercase ASCII word tokens (as bytes)."""
+        return text.lower().encode('ascii', 'replace').translate(_SEPARATOR_TABLE).split()
+
+    def match(self, text):
+        """Return {emotion: set(keywords)} for every keyword found in text."""
+        found = self.vocabulary.intersection(self.tokenize(text))
+        hits = {}
+
+        for word in found:
+            emotions = self.words.get(word)
+            if emotions is None:
+                continue
+            keyword = word.decode()
+            for emotion in emotions:
+                hits.setdefault(emotion, set()).add(keyword)
+
+        if self.phrases and found:
+            text_lower = None
+            for keyword, (first, pattern, emotions) in self.phrases.items():
+                if first not in found:
+                    continue
+                if text_lower is None:
+                    text_lower = text.lower()
+                if pattern.search(text_lower):
+                    for emotion in emotions:
+                        hits.setdefault(emotion, set()).add(keyword)
+
+        return hits
+
+    def score(self, text):
+        """
+        Count distinct keywords per emotion found in text.
+
+        Emotions are returned in keyword-table order so ties resolve the same
+        way regardless of where the keywords appear in the text.
+        """
+        hits = self.match(text)
+        return {emotion: len(hits[emotion]) for emotion in self.emotions if emotion in hits}
+
+    def score_many(self, texts):
+        """Score a batch of texts, preserving input order."""
+        return [self.score(text) for text in texts]
@@ -0,0 +1,60 @@
+"""
+Local Cache - Bounded in-process LRU cache with per-entry expiry.
+Sits in front of Redis so repeated texts on the same replica skip the
+network round trip entirely.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """Thread-safe LRU cache whose entries expire after ttl seconds."""
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max(int(max_entries), 0)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_many(self, keys):
+        """Return cached values for keys, None for missing or expired entries."""
+        if not self.max_entries:
+            return [None] * len(keys)
+
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    values.append(None)
+                elif entry[0] <= now:
+                    del self._entries[key]
+                    values.append(None)
+                else:
+                    self._entries.move_to_end(key)
+                    values.append(entry[1])
+        return values
+
+    def set_many(self, items):
+        """Store (key, value) pairs, evicting the least recently used entries."""
+        if not self.max_entries:
+            return
+
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
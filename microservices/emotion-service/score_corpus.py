@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Offline corpus scoring for the emotion pipeline.
+Streams JSONL or CSV records through the same scoring code as the service,
+without HTTP, Redis or RabbitMQ, and fans chunks out across a process pool.
+Results are written as JSONL in input order, and a checkpoint written after
+every chunk lets an interrupted run resume where it stopped.
+
+Usage:
+    python score_corpus.py requests.jsonl -o scores.jsonl --text-field title --text-field body
+    python score_corpus.py conversations.csv -o scores.jsonl --text-field content --resume
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Add shared-libs to path (compiled sentiment lexicon)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared-libs'))
+
+from emotion_engine import analyze_texts
+from sentiment_pool import ENGINE_LEXICON, _warm_worker, resolve_engine
+
+PROGRESS_INTERVAL = 2.0  # seconds between progress lines
+
+
+def read_records(path, input_format):
+    """Yield input records as dicts, one at a time."""
+    stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    try:
+        if input_format == 'csv':
+            yield from csv.DictReader(stream)
+            return
+
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield {'__error__': 'Invalid JSON'}
+                continue
+            yield record if isinstance(record, dict) else {'text': record}
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def record_text(record, text_fields):
+    """Join the configured text fields of a record into one text."""
+    if '__error__' in record:
+        return None
+    parts = [record.get(field) for field in text_fields]
+    text = '\n'.join(part for part in parts if isinstance(part, str) and part.strip())
+    return text.strip() or None
+
+
+def iter_chunks(records, chunk_size, text_fields, id_field, skip):
+    """Group records into (start index, ids, texts) chunks, skipping the first skip records."""
+    ids, texts = [], []
+    start = skip
+    for index, record in enumerate(records):
+        if index < skip:
+            continue
+        ids.append(record.get(id_field) if isinstance(record, dict) else None)
+        texts.append(record_text(record, text_fields))
+        if len(texts) >= chunk_size:
+            yield start, ids, texts
+            start += len(texts)
+            ids, texts = [], []
+    if texts:
+        yield start, ids, texts
+
+
+def score_chunk(texts, engine):
+    """Score one chunk in a worker process; None texts become error results."""
+    scored = [text for text in texts if text is not None]
+    analyses = iter(analyze_texts(scored, engine)) if scored else iter(())
+    return [next(analyses) if text is not None else {'error': 'Text is required'} for text in texts]
+
+
+def load_checkpoint(path):
+    """Return the saved checkpoint, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path, state):
+    """Atomically replace the checkpoint file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def format_progress(records, started):
+    elapsed = time.monotonic() - started
+    rate = records / elapsed if elapsed > 0 else 0.0
+    return f"{records} records in {elapsed:.1f}s ({rate:.0f} records/s)"
+
+
+def score_corpus(args):
+    """Run the scoring job described by parsed command-line arguments."""
+    input_format = args.format or ('csv' if args.input.endswith('.csv') else 'jsonl')
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+    engine = resolve_engine(args.engine)
+
+    skip = 0
+    output_bytes = 0
+    checkpoint = load_checkpoint(checkpoint_path) if args.resume else None
+    if checkpoint and checkpoint.get('input') != os.path.abspath(args.input):
+        raise SystemExit(f"Checkpoint {checkpoint_path} belongs to {checkpoint.get('input')}")
+    if checkpoint and (not os.path.exists(args.output) or
+                       os.path.getsize(args.output) < checkpoint['output_bytes']):
+        # The results the checkpoint counts are gone, so nothing can be kept
+        print(f"Output {args.output} is missing or shorter than its checkpoint, starting over",
+              file=sys.stderr)
+        checkpoint = None
+    if checkpoint:
+        skip = checkpoint['records']
+        output_bytes = checkpoint['output_bytes']
+        print(f"Resuming after {skip} records", file=sys.stderr)
+
+    # Anything written after the last checkpoint is discarded and rescored
+    output = open(args.output, 'r+b' if checkpoint else 'wb')
+    output.truncate(output_bytes)
+    output.seek(output_bytes)
+
+    chunks = iter_chunks(read_records(args.input, input_format), args.chunk_size,
+                         args.text_field, args.id_field, skip)
+    records_done = skip
+    scored_this_run = 0
+    started = time.monotonic()
+    last_report = started
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_warm_worker,
+                                 initargs=(engine,)) as executor:
+            # Bounded window of in-flight chunks keeps memory flat and output ordered
+            in_flight = deque()
+            max_in_flight = args.workers * 2
+
+            def drain_one():
+                nonlocal records_done, scored_this_run, output_bytes, last_report
+                start, ids, future = in_flight.popleft()
+                lines = []
+                for offset, (record_id, analysis) in enumerate(zip(ids, future.result())):
+                    result = {'record': start + offset}
+                    if record_id is not None:
+                        result['id'] = record_id
+                    result.update(analysis)
+                    lines.append(json.dumps(result) + '\n')
+
+                output.write(''.join(lines).encode('utf-8'))
+                output.flush()
+                output_bytes = output.tell()
+                records_done += len(ids)
+                scored_this_run += len(ids)
+                save_checkpoint(checkpoint_path, {
+                    'input': os.path.abspath(args.input),
+                    'records': records_done,
+                    'output_bytes': output_bytes
+                })
+
+                now = time.monotonic()
+                if not args.quiet and now - last_report >= PROGRESS_INTERVAL:
+                    print(f"Progress: {format_progress(scored_this_run, started)}, "
+                          f"{records_done} total", file=sys.stderr)
+                    last_report = now
+
+            for start, ids, texts in chunks:
+                in_flight.append((start, ids, executor.submit(score_chunk, texts, engine)))
+                if len(in_flight) >= max_in_flight:
+                    drain_one()
+            while in_flight:
+                drain_one()
+    finally:
+        output.close()
+
+    # A finished run needs no checkpoint
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    print(f"Done: {format_progress(scored_this_run, started)}, {records_done} total "
+          f"({args.workers} workers, {engine} engine)", file=sys.stderr)
+    return records_done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a JSONL/CSV corpus with the emotion pipeline')
+    parser.add_argument('input', help="JSONL or CSV file ('-' for JSONL on stdin)")
+    parser.add_argument('-o', '--output', required=True, help='JSONL file to write results to')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='input format (default: from extension)')
+    parser.add_argument('--text-field', action='append',
+                        help="field holding the text; repeat to join several (default: text)")
+    parser.add_argument('--id-field', default='id', help='field copied into each result (default: id)')
+    parser.add_argument('--workers', type=positive_int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=positive_int, default=500)
+    parser.add_argument('--engine', default=os.environ.get('SENTIMENT_ENGINE', ENGINE_LEXICON),
+                        help='sentiment engine: lexicon or textblob')
+    parser.add_argument('--checkpoint', help='checkpoint file (default: OUTPUT.checkpoint)')
+    parser.add_argument('--resume', action='store_true', help='continue from the checkpoint')
+    parser.add_argument('--quiet', action='store_true', help='only print the final report')
+    args = parser.parse_args(argv)
+    args.text_field = args.text_field or ['text']
+
+    if args.resume and args.input == '-':
+        parser.error('--resume needs a file input')
+
+    score_corpus(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""
+Sentiment Pool - Runs sentiment scoring in pre-warmed worker processes.
+Moves the CPU-bound polarity step off the request thread so one Flask process
+can use every core, with inline execution as the fallback under overload.
+"""
+
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from textblob import TextBlob
+
+# Compiled lexicon lives in shared-libs; fall back to TextBlob without it
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared-libs'))
+try:
+    from sentiment_lexicon import get_lexicon
+    LEXICON_AVAILABLE = True
+except ImportError:
+    LEXICON_AVAILABLE = False
+    get_lexicon = None
+
+logger = logging.getLogger(__name__)
+
+ENGINE_LEXICON = 'lexicon'
+ENGINE_TEXTBLOB = 'textblob'
+
+
+def _warm_worker(engine):
+    """Load the sentiment lexicon once per worker process."""
+    score_texts(["warm up the sentiment lexicon"], engine)
+
+
+def _noop():
+    return True
+
+
+def score_texts(texts, engine=ENGINE_TEXTBLOB):
+    """Return polarity for each text (runs in a worker or inline)."""
+    if engine == ENGINE_LEXICON:
+        lexicon = get_lexicon()
+        return [lexicon.polarity(text) for text in texts]
+    return [TextBlob(text).sentiment.polarity for text in texts]
+
+
+def resolve_engine(engine):
+    """Return engine if it can be used here, otherwise the TextBlob engine."""
+    if engine != ENGINE_LEXICON:
+        return ENGINE_TEXTBLOB
+    if not LEXICON_AVAILABLE:
+        logger.warning("Sentiment lexicon library not available, using TextBlob")
+        return ENGINE_TEXTBLOB
+    try:
+        get_lexicon()
+        return ENGINE_LEXICON
+    except Exception as e:
+        logger.warning(f"Failed to load sentiment lexicon, using TextBlob: {e}")
+        return ENGINE_TEXTBLOB
+
+
+class SentimentPool:
+    """Pool of sentiment worker processes with a submit/await API."""
+
+    def __init__(self, size=0, max_pending=None, timeout=5.0, engine=ENGINE_TEXTBLOB):
+        # Resolved before forking so workers inherit the memory-mapped lexicon
+        self.engine = resolve_engine(engine)
+        self.size = max(int(size), 0)
+        self.max_pending = max_pending if max_pending is not None else self.size * 4
+        self.timeout = timeout
+        self.inline_fallbacks = 0
+        self.restarts = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+        if self.size > 0:
+            try:
+                self._executor = self._new_executor()
+                self.warm_up()
+                logger.info(f"Sentiment pool started with {self.size} {self.engine} worker processes")
+            except Exception as e:
+                logger.warning(f"Sentiment pool unavailable, scoring inline: {e}")
+                self._executor = None
+                self.size = 0
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.size,
+            initializer=_warm_worker,
+            initargs=(self.engine,)
+        )
+
+    def _replace_broken(self, executor):
+        """
+        Replace executor after one of its workers died. Every batch on it
+        fails at once, so only the first caller to notice replaces it.
+        """
+        with self._lock:
+            if self._executor is not executor:
+                return
+            try:
+                self._executor = self._new_executor()
+                logger.warning("Restarted the sentiment pool after a worker died")
+            except Exception as e:
+                logger.warning(f"Could not restart sentiment pool, scoring inline: {e}")
+                self._executor = None
+                self.size = 0
+            self.restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def pending(self):
+        """Number of submitted batches that have not finished yet."""
+        return self._pending
+
+    def warm_up(self):
+        """Start every worker process now instead of on the first request."""
+        if self._executor:
+            for future in [self._executor.submit(_noop) for _ in range(self.size)]:
+                future.result()
+
+    def _run_inline(self, texts):
+        future = Future()
+        try:
+            future.set_result(score_texts(texts, self.engine))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, texts):
+        """
+        Submit texts for scoring and return a Future of polarities.
+
+        Runs inline (already-completed Future) when the pool is disabled or
+        more than max_pending batches are queued.
+        """
+        if not self._executor:
+            return self._run_inline(texts)
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.inline_fallbacks += 1
+                saturated = True
+            else:
+                self._pending += 1
+                saturated = False
+
+        if saturated:
+            return self._run_inline(texts)
+
+        executor = self._executor
+        try:
+            future = executor.submit(score_texts, list(texts), self.engine)
+        except Exception as e:
+            self._release(None)
+            logger.warning(f"Sentiment pool submit failed, scoring inline: {e}")
+            if isinstance(e, BrokenProcessPool):
+                self._replace_broken(executor)
+            return self._run_inline(texts)
+
+        future.executor = executor
+        future.add_done_callback(self._release)
+        return future
+
+    def await_result(self, future, texts):
+        """
+        Wait for a submitted batch, scoring inline if the worker times out
+        or dies (the pool is then restarted for later batches).
+        """
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            logger.warning("Sentiment pool timed out, scoring inline")
+        except BrokenProcessPool:
+            logger.warning("Sentiment pool worker died, scoring inline")
+            self._replace_broken(getattr(future, 'executor', None))
+        with self._lock:
+            self.inline_fallbacks += 1
+        return score_texts(texts, self.engine)
+
+    def score(self, text):
+        """Score a single text."""
+        return self.score_many([text])[0]
+
+    def score_many(self, texts):
+        """Score a batch, spreading it across workers in contiguous chunks."""
+        texts = list(texts)
+        if not texts:
+            return []
+
+        chunk_count = min(max(self.size, 1), len(texts))
+        chunk_size = -(-len(texts) // chunk_count)
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        futures = [self.submit(chunk) for chunk in chunks]
+
+        polarities = []
+        for future, chunk in zip(futures, chunks):
+            polarities.extend(self.await_result(future, chunk))
+        return polarities
+
+    def shutdown(self):
+        """Stop worker processes."""
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,56 @@
+"""
+Stage Timer - Lightweight per-request timing of named pipeline stages.
+Stage durations are observed into a Prometheus histogram labeled by stage
+and cache outcome, and can be rendered as a Server-Timing header.
+"""
+
+from time import perf_counter
+
+# (histogram id, stage, cache outcome) -> labeled histogram child
+_children = {}
+
+
+class _Stage:
+    """Context manager that records one stage duration on exit."""
+
+    __slots__ = ('timer', 'name', 'started')
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.stages.append((self.name, perf_counter() - self.started))
+        return False
+
+
+class StageTimer:
+    """Collects (stage, seconds) pairs for one request."""
+
+    __slots__ = ('stages', 'cache')
+
+    def __init__(self):
+        self.stages = []
+        self.cache = 'none'
+
+    def stage(self, name):
+        """Time the enclosed block as stage name."""
+        return _Stage(self, name)
+
+    def observe(self, histogram):
+        """Record every stage in a histogram with (stage, cache) labels."""
+        for name, seconds in self.stages:
+            key = (id(histogram), name, self.cache)
+            child = _children.get(key)
+            if child is None:
+                # labels() takes a lock and builds a key on every call; cache the child
+                child = _children[key] = histogram.labels(stage=name, cache=self.cache)
+            child.observe(seconds)
+
+    def server_timing(self):
+        """Render stages as a Server-Timing header value (durations in ms)."""
+        return ', '.join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in self.stages)
@@ -16,7 +16,7 @@ os.environ.update({
     'REDIS_PORT': '6379'
 })
 
-from app import app
+from app import app, detect_emotion_keywords
 
 
 @pytest.fixture
@@ -266,5 +266,679 @@ class TestServiceSecrets:
         assert response.status_code in [403, 404]
 
 
+class TestKeywordMatching:
+    """Test single-pass emotion keyword matching."""
+    
+    def test_keywords_match_whole_words_only(self):
+        """Test that keywords do not match inside longer words."""
+        assert detect_emotion_keywords('I made it home') == {}
+        assert detect_emotion_keywords('I am so mad!') == {'anger': 1}
+        
+    def test_keywords_counted_once_per_emotion(self):
+        """Test that repeated keywords count as a single hit."""
+        assert detect_emotion_keywords('Sad, SAD and sad again.') == {'sadness': 1}
+        
+    def test_multi_word_keywords(self):
+        """Test that phrases match across whitespace and punctuation."""
+        scores = detect_emotion_keywords('Really looking  forward to it and excited!')
+        assert scores == {'joy': 1, 'anticipation': 2}
+        
+    def test_keyword_scores_keep_table_order(self):
+        """Test that emotion order follows EMOTION_KEYWORDS for tie-breaking."""
+        scores = detect_emotion_keywords('worried but happy')
+        assert list(scores) == ['joy', 'fear']
+
+
+class TestBatchDetection:
+    """Test the batch emotion detection endpoint."""
+    
+    @pytest.fixture
+    def stub_backends(self, monkeypatch):
+        """Stub Redis and RabbitMQ so the batch path can be inspected."""
+        import app as app_module
+        from local_cache import LocalCache
+        redis_stub = MagicMock()
+        queue_stub = MagicMock()
+        monkeypatch.setattr(app_module, 'redis_client', redis_stub)
+        monkeypatch.setattr(app_module, 'queue_client', queue_stub)
+        monkeypatch.setattr(app_module, 'local_cache', LocalCache(max_entries=100, ttl=60))
+        return redis_stub, queue_stub
+    
+    def test_batch_requires_texts_list(self, client, stub_backends):
+        """Test that texts must be a non-empty list of strings."""
+        assert client.post('/api/emotion/detect/batch', json={'texts': 'hi'}).status_code == 400
+        assert client.post('/api/emotion/detect/batch', json={'texts': []}).status_code == 400
+        assert client.post('/api/emotion/detect/batch', json={'texts': ['ok', '']}).status_code == 400
+        
+    def test_batch_rejects_oversized_requests(self, client, stub_backends, monkeypatch):
+        """Test that batches above the configured limit are rejected."""
+        import app as app_module
+        monkeypatch.setattr(app_module, 'EMOTION_BATCH_MAX_TEXTS', 2)
+        response = client.post('/api/emotion/detect/batch', json={'texts': ['a', 'b', 'c']})
+        assert response.status_code == 413
+        
+    def test_batch_scores_only_cache_misses(self, client, stub_backends):
+        """Test one MGET, one pipelined write and one queued event per miss."""
+        redis_stub, queue_stub = stub_backends
+        cached = {'emotion': 'trust', 'confidence': 0.5,
+                  'sentiment': 0.0, 'emotion_scores': {'trust': 1}}
+        redis_stub.mget.return_value = [None, json.dumps(cached), None]
+        
+        response = client.post('/api/emotion/detect/batch', json={
+            'texts': ['I am so happy today!', 'cached text', 'I feel sad and miserable.']
+        })
+        assert response.status_code == 200
+        
+        data = json.loads(response.data)
+        assert data['count'] == 3
+        assert data['cache_hits'] == 1
+        assert [r['emotion'] for r in data['results']] == ['joy', 'trust', 'sadness']
+        
+        redis_stub.mget.assert_called_once()
+        pipe = redis_stub.pipeline.return_value
+        assert pipe.setex.call_count == 2
+        pipe.execute.assert_called_once()
+        assert queue_stub.publish_emotion_analyzed_async.call_count == 2
+
+
+class TestEmotionCache:
+    """Test content-addressed cache keys and the local cache tier."""
+    
+    @pytest.fixture
+    def stub_backends(self, monkeypatch):
+        """Stub Redis and RabbitMQ and start with an empty local tier."""
+        import app as app_module
+        from local_cache import LocalCache
+        redis_stub = MagicMock()
+        redis_stub.mget.return_value = [None]
+        monkeypatch.setattr(app_module, 'redis_client', redis_stub)
+        monkeypatch.setattr(app_module, 'queue_client', MagicMock())
+        monkeypatch.setattr(app_module, 'local_cache', LocalCache(max_entries=100, ttl=60))
+        return redis_stub
+    
+    def test_cache_key_is_stable_digest(self):
+        """Test that keys are deterministic SHA-256 digests of normalized text."""
+        import hashlib
+        from app import emotion_cache_key
+        key = emotion_cache_key('  I am happy!  ')
+        assert key == emotion_cache_key('I am happy!')
+        assert key.endswith(hashlib.sha256('I am happy!'.encode('utf-8')).hexdigest())
+        # NFC and NFD spellings of the same text share a key
+        assert emotion_cache_key('caf\u00e9') == emotion_cache_key('cafe\u0301')
+        
+    def test_only_analysis_is_cached(self, client, stub_backends):
+        """Test that the per-request envelope is not written to Redis."""
+        response = client.post('/api/emotion/detect', json={'text': 'I am so happy today!'})
+        assert response.status_code == 200
+        assert 'timestamp' in json.loads(response.data)
+        
+        pipe = stub_backends.pipeline.return_value
+        cached = json.loads(pipe.setex.call_args[0][2])
+        assert set(cached) == {'emotion', 'confidence', 'sentiment', 'emotion_scores'}
+        
+    def test_local_tier_answers_before_redis(self, client, stub_backends):
+        """Test that a repeated text is served locally without a Redis round trip."""
+        client.post('/api/emotion/detect', json={'text': 'I feel sad and miserable.'})
+        stub_backends.mget.reset_mock()
+        
+        response = client.post('/api/emotion/detect', json={'text': 'I feel sad and miserable.'})
+        data = json.loads(response.data)
+        assert data['emotion'] == 'sadness'
+        assert data['text'] == 'I feel sad and miserable.'
+        stub_backends.mget.assert_not_called()
+        
+    def test_local_cache_evicts_and_expires(self, monkeypatch):
+        """Test LRU eviction and TTL expiry of the local tier."""
+        import local_cache as local_cache_module
+        from local_cache import LocalCache
+        cache = LocalCache(max_entries=2, ttl=10)
+        cache.set_many([('a', 1), ('b', 2)])
+        cache.get_many(['a'])
+        cache.set_many([('c', 3)])
+        assert cache.get_many(['a', 'b', 'c']) == [1, None, 3]
+        
+        now = local_cache_module.time.monotonic()
+        monkeypatch.setattr(local_cache_module.time, 'monotonic', lambda: now + 11)
+        assert cache.get_many(['a', 'c']) == [None, None]
+        assert len(cache) == 0
+
+
+class TestStageTiming:
+    """Test per-stage latency histograms and the Server-Timing header."""
+    
+    @pytest.fixture
+    def stub_backends(self, monkeypatch):
+        """Stub Redis and RabbitMQ and start with an empty local tier."""
+        import app as app_module
+        from local_cache import LocalCache
+        redis_stub = MagicMock()
+        redis_stub.mget.return_value = [None]
+        monkeypatch.setattr(app_module, 'redis_client', redis_stub)
+        monkeypatch.setattr(app_module, 'queue_client', MagicMock())
+        monkeypatch.setattr(app_module, 'local_cache', LocalCache(max_entries=100, ttl=60))
+        return redis_stub
+    
+    @staticmethod
+    def stage_count(stage, cache):
+        from prometheus_client import REGISTRY
+        value = REGISTRY.get_sample_value(
+            'emotion_stage_duration_seconds_count', {'stage': stage, 'cache': cache}
+        )
+        return value or 0
+    
+    def test_stages_recorded_by_cache_outcome(self, client, stub_backends):
+        """Test that a miss records every stage and a hit only the lookup."""
+        before_miss = self.stage_count('sentiment', 'miss')
+        before_hit = self.stage_count('cache_get', 'hit')
+        
+        client.post('/api/emotion/detect', json={'text': 'I am thrilled with this!'})
+        client.post('/api/emotion/detect', json={'text': 'I am thrilled with this!'})
+        
+        assert self.stage_count('sentiment', 'miss') == before_miss + 1
+        assert self.stage_count('cache_get', 'hit') == before_hit + 1
+        assert self.stage_count('sentiment', 'hit') == 0
+        
+    def test_server_timing_header_is_optional(self, client, stub_backends, monkeypatch):
+        """Test that Server-Timing is only sent when enabled."""
+        import app as app_module
+        response = client.post('/api/emotion/detect', json={'text': 'I feel nervous.'})
+        assert 'Server-Timing' not in response.headers
+        
+        monkeypatch.setattr(app_module, 'EMOTION_SERVER_TIMING', True)
+        response = client.post('/api/emotion/detect', json={'text': 'I feel so nervous.'})
+        stages = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+        assert stages == ['cache_get', 'keywords', 'sentiment', 'primary_emotion', 'cache_set', 'publish']
+
+
+class TestStreamDetection:
+    """Test the NDJSON streaming endpoint."""
+    
+    def test_stream_scores_records_in_order(self, client):
+        """Test results come back one per line, in input order, with a summary."""
+        body = '\n'.join([
+            json.dumps({'id': 'a', 'text': 'I am so happy today!'}),
+            '',
+            json.dumps('I feel sad and miserable.'),
+            'not json',
+            json.dumps({'id': 'd', 'text': ''}),
+            json.dumps({'text': 'The weather is okay.'})
+        ])
+        response = client.post('/api/emotion/stream', data=body, content_type='application/x-ndjson')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        results, summary = lines[:-1], lines[-1]['summary']
+        assert [r['line'] for r in results] == [1, 3, 4, 5, 6]
+        assert results[0]['id'] == 'a' and results[0]['emotion'] == 'joy'
+        assert results[1]['emotion'] == 'sadness'
+        assert results[2]['error'] == 'Invalid JSON'
+        assert results[3]['error'] == 'Text is required'
+        assert summary['records'] == 3
+        assert summary['errors'] == 2
+        
+    def test_stream_chunks_are_bounded(self, monkeypatch):
+        """Test that no more than chunk_size records are scored at once."""
+        import io
+        import app as app_module
+        chunk_sizes = []
+        real_analyze = app_module.analyze_texts
+        
+        def recording_analyze(texts, engine=None):
+            chunk_sizes.append(len(texts))
+            return real_analyze(texts, engine)
+        
+        monkeypatch.setattr(app_module, 'analyze_texts', recording_analyze)
+        body = io.BytesIO(('\n'.join(json.dumps(f'I am happy {i}') for i in range(25)) + '\n').encode())
+        output = list(app_module.stream_analyses(app_module.iter_ndjson_records(body), chunk_size=10))
+        
+        assert chunk_sizes == [10, 10, 5]
+        summary = json.loads(output[-1])['summary']
+        assert summary['chunks'] == 3
+        assert summary['chunk_records_per_second']['min'] > 0
+        
+    def test_stream_rejects_oversized_lines(self):
+        """Test that an oversized line is skipped without stopping the stream."""
+        import io
+        from app import iter_ndjson_records
+        body = io.BytesIO(json.dumps('x' * 100).encode() + b'\n' + json.dumps('I am happy').encode())
+        records = list(iter_ndjson_records(body, max_line_bytes=32))
+        assert records[0][3] == 'Line exceeds 32 bytes'
+        assert records[1] == (2, 'I am happy', None, None)
+
+
+class TestCorpusScoring:
+    """Test the offline corpus scoring CLI."""
+    
+    def test_scores_jsonl_in_order(self, tmp_path):
+        """Test results are written in input order with ids and error records."""
+        from score_corpus import main
+        source = tmp_path / 'corpus.jsonl'
+        source.write_text('\n'.join(json.dumps(r) for r in [
+            {'id': 'a', 'text': 'I am so happy today!'},
+            {'id': 'b', 'text': ''},
+            {'id': 'c', 'text': 'I feel sad and miserable.'}
+        ]))
+        output = tmp_path / 'scores.jsonl'
+        main([str(source), '-o', str(output), '--workers', '1', '--chunk-size', '2', '--quiet'])
+        
+        results = [json.loads(line) for line in output.read_text().splitlines()]
+        assert [r['id'] for r in results] == ['a', 'b', 'c']
+        assert results[0]['emotion'] == 'joy'
+        assert results[1]['error'] == 'Text is required'
+        assert results[2]['emotion'] == 'sadness'
+        assert not (tmp_path / 'scores.jsonl.checkpoint').exists()
+        
+    def test_scores_csv_with_joined_fields(self, tmp_path):
+        """Test CSV input with several text fields."""
+        from score_corpus import main
+        source = tmp_path / 'corpus.csv'
+        source.write_text('id,title,body\n1,Great news,I am thrilled and delighted\n')
+        output = tmp_path / 'scores.jsonl'
+        main([str(source), '-o', str(output), '--workers', '1', '--quiet',
+              '--text-field', 'title', '--text-field', 'body'])
+        
+        result = json.loads(output.read_text())
+        assert result['id'] == '1'
+        assert result['emotion_scores'] == {'joy': 2}
+        
+    def test_resume_from_checkpoint(self, tmp_path):
+        """Test that a resumed run discards partial output and matches a full run."""
+        from score_corpus import main, save_checkpoint
+        import os
+        source = tmp_path / 'corpus.jsonl'
+        source.write_text('\n'.join(json.dumps(f'I am happy number {i}') for i in range(10)))
+        full = tmp_path / 'full.jsonl'
+        main([str(source), '-o', str(full), '--workers', '1', '--chunk-size', '3', '--quiet'])
+        
+        lines = full.read_bytes().splitlines(keepends=True)
+        partial = tmp_path / 'partial.jsonl'
+        partial.write_bytes(b''.join(lines[:6]) + b'{"record": 6, "trunc')
+        save_checkpoint(f"{partial}.checkpoint", {
+            'input': os.path.abspath(str(source)),
+            'records': 6,
+            'output_bytes': len(b''.join(lines[:6]))
+        })
+        main([str(source), '-o', str(partial), '--workers', '1', '--chunk-size', '3', '--quiet', '--resume'])
+        
+        assert partial.read_bytes() == full.read_bytes()
+        
+    def test_resume_without_output_starts_over(self, tmp_path):
+        """Test that a checkpoint whose output file is gone is ignored."""
+        from score_corpus import main, save_checkpoint
+        import os
+        source = tmp_path / 'corpus.jsonl'
+        source.write_text('\n'.join(json.dumps(f'I am happy number {i}') for i in range(5)))
+        output = tmp_path / 'scores.jsonl'
+        save_checkpoint(f"{output}.checkpoint", {
+            'input': os.path.abspath(str(source)),
+            'records': 3,
+            'output_bytes': 300
+        })
+        main([str(source), '-o', str(output), '--workers', '1', '--quiet', '--resume'])
+        
+        assert [json.loads(line)['record'] for line in output.read_text().splitlines()] == [0, 1, 2, 3, 4]
+        
+    def test_workers_must_be_positive(self, tmp_path, capsys):
+        """Test that --workers 0 is a usage error."""
+        from score_corpus import main
+        with pytest.raises(SystemExit) as excinfo:
+            main([str(tmp_path / 'corpus.jsonl'), '-o', str(tmp_path / 'scores.jsonl'), '--workers', '0'])
+        assert excinfo.value.code == 2
+        assert '--workers: must be at least 1' in capsys.readouterr().err
+
+
+class TestBackgroundPublisher:
+    """Test the non-blocking batched event publisher."""
+    
+    @pytest.fixture
+    def publisher(self):
+        """Publisher whose RabbitMQ connection is stubbed out."""
+        from message_queue import BackgroundPublisher
+        publisher = BackgroundPublisher('emotion-service', max_queue_size=3, batch_size=10, flush_interval=0.05)
+        publisher._client = MagicMock()
+        publisher._client.connection.is_open = True
+        publisher._client.retry_delay = 0
+        yield publisher
+        publisher.close(timeout=1)
+    
+    def test_overflow_is_counted_not_blocking(self, publisher):
+        """Test that a full queue drops and counts events immediately."""
+        results = [publisher.enqueue('emotion.analyzed', {'n': i}) for i in range(5)]
+        assert results == [True, True, True, False, False]
+        assert publisher.dropped == 2
+        assert publisher.pending == 3
+        
+    def test_each_event_is_its_own_message(self, publisher):
+        """Test that queued events go out as standard envelopes, committed once per batch."""
+        publisher.enqueue('emotion.analyzed', {'n': 1})
+        publisher.enqueue('emotion.analyzed', {'n': 2})
+        publisher.enqueue('emotion.validation', {'n': 3})
+        publisher.start()
+        assert publisher.flush(timeout=2)
+        
+        calls = publisher._client.channel.basic_publish.call_args_list
+        bodies = [json.loads(c.kwargs['body']) for c in calls]
+        assert [c.kwargs['routing_key'] for c in calls] == ['emotion.analyzed', 'emotion.analyzed', 'emotion.validation']
+        assert [body['data'] for body in bodies] == [{'n': 1}, {'n': 2}, {'n': 3}]
+        assert all(body['metadata']['service'] == 'emotion-service' and body['metadata']['timestamp'] for body in bodies)
+        assert publisher._client.channel.tx_commit.call_count == 1
+        assert publisher.published == 3
+        
+    def test_failed_batches_are_retried_then_dropped(self, publisher):
+        """Test that publish failures are retried and finally counted as failed."""
+        publisher.max_attempts = 2
+        publisher._client.channel.basic_publish.side_effect = Exception('nack')
+        publisher.enqueue('emotion.analyzed', {'n': 1})
+        publisher.start()
+        assert publisher.flush(timeout=2)
+        assert publisher.failed == 1
+        assert publisher.published == 0
+
+
+class TestBenchmarkSuite:
+    """Test the benchmark corpus and baseline comparison."""
+    
+    def test_corpus_is_deterministic_and_mixed(self):
+        """Test that the corpus is reproducible and covers short and long texts."""
+        from bench_emotion_pipeline import build_corpus
+        corpus = build_corpus(200)
+        assert corpus == build_corpus(200)
+        assert min(len(text) for text in corpus) <= 120
+        assert max(len(text) for text in corpus) > 800
+        
+    def test_regressions_beyond_threshold_are_flagged(self):
+        """Test that only slowdowns larger than the threshold are flagged."""
+        from bench_emotion_pipeline import compare_results
+        baseline = {
+            'fast': {'ops_per_sec': 1000.0, 'p50_us': 10.0, 'p99_us': 50.0},
+            'slow': {'ops_per_sec': 1000.0, 'p50_us': 10.0, 'p99_us': 50.0}
+        }
+        results = {
+            'fast': {'ops_per_sec': 950.0, 'p50_us': 10.5, 'p99_us': 90.0},
+            'slow': {'ops_per_sec': 700.0, 'p50_us': 14.0, 'p99_us': 60.0},
+            'new': {'ops_per_sec': 10.0, 'p50_us': 1.0, 'p99_us': 1.0}
+        }
+        comparison = compare_results(results, baseline, threshold=0.10)
+        assert comparison['fast']['regressed'] is False
+        assert comparison['slow']['regressed'] is True
+        assert 'new' not in comparison
+
+
+class TestSentimentPool:
+    """Test the process-pool sentiment engine."""
+    
+    def test_inline_pool_matches_textblob(self):
+        """Test that a disabled pool scores inline with TextBlob."""
+        from textblob import TextBlob
+        from sentiment_pool import SentimentPool
+        pool = SentimentPool(size=0)
+        text = 'I am so happy and excited today!'
+        assert pool.score(text) == TextBlob(text).sentiment.polarity
+        
+    def test_worker_pool_preserves_order(self):
+        """Test that batches split across workers come back in order."""
+        from sentiment_pool import SentimentPool, score_texts
+        texts = ['great day', 'terrible news', 'okay', 'awful', 'wonderful']
+        pool = SentimentPool(size=2)
+        try:
+            assert pool.size == 2
+            assert pool.score_many(texts) == score_texts(texts)
+        finally:
+            pool.shutdown()
+            
+    def test_saturated_pool_falls_back_inline(self):
+        """Test that work beyond the pending bound runs inline."""
+        from sentiment_pool import SentimentPool
+        pool = SentimentPool(size=1, max_pending=0)
+        try:
+            assert pool.score('good') > 0
+            assert pool.inline_fallbacks == 1
+        finally:
+            pool.shutdown()
+            
+    def test_crashed_worker_restarts_pool(self):
+        """Test that a dead worker process is replaced and its batch scored inline."""
+        import os
+        import signal
+        from sentiment_pool import SentimentPool, score_texts
+        texts = ['great day', 'terrible news']
+        pool = SentimentPool(size=1)
+        try:
+            broken = pool._executor
+            future = broken.submit(os.kill, next(iter(broken._processes)), signal.SIGKILL)
+            future.executor = broken
+            assert pool.await_result(future, texts) == score_texts(texts)
+            assert pool.restarts == 1
+            assert pool._executor is not broken
+            assert pool.score_many(texts) == score_texts(texts)
+        finally:
+            pool.shutdown()
+
+
+class TestSentimentLexicon:
+    """Test the compiled sentiment lexicon against TextBlob."""
+    
+    PARITY_CORPUS = [
+        'I am so excited and happy today!',
+        'I feel very sad and disappointed.',
+        'This makes me furious and angry!',
+        'The weather is okay today.',
+        "I'm not happy at all!!",
+        "I don't think this is bad, it's actually really not bad :)",
+        'This is NOT good. Never good.',
+        'Very very good, extremely good, incredibly bad',
+        'Oh great, another meeting (!)',
+        'Terrible service :( but the food was amazing :D XD',
+        '"Wonderful" he said... e.g. Mr. Smith was thrilled.\n\nAwful ending.',
+        "I can't believe how beautiful it is <3",
+        'I feel happy! 😊🎉 Très bien! 中文测试',
+        'no good, not a good idea, really not good',
+        '',
+    ]
+    
+    @pytest.fixture(scope='class')
+    @classmethod
+    def lexicon(cls, tmp_path_factory):
+        """Build the lexicon artifact into a temporary directory."""
+        from sentiment_lexicon import SentimentLexicon
+        return SentimentLexicon.load(str(tmp_path_factory.mktemp('lexicon') / 'lexicon.npy'))
+    
+    def test_artifact_is_memory_mapped(self, lexicon):
+        """Test that the table is loaded as a read-only memory map."""
+        import numpy as np
+        assert isinstance(lexicon.table, np.memmap)
+        assert len(lexicon) > 1000
+        # Scores are read from the mapping, not copied into the process
+        assert np.shares_memory(lexicon._scores, lexicon.table)
+        
+    def test_parity_with_textblob(self, lexicon):
+        """Test polarity and subjectivity match TextBlob within tolerance."""
+        from textblob import TextBlob
+        from sentiment_lexicon import PARITY_TOLERANCE
+        for text in self.PARITY_CORPUS:
+            expected = TextBlob(text).sentiment
+            polarity, subjectivity = lexicon.sentiment(text)
+            assert abs(polarity - expected.polarity) <= PARITY_TOLERANCE, text
+            assert abs(subjectivity - expected.subjectivity) <= PARITY_TOLERANCE, text
+            
+    def test_incremental_matches_full_rescoring(self, lexicon):
+        """Test that typing, deleting and editing give the same scores as rescoring."""
+        from sentiment_lexicon import IncrementalSentiment
+        draft = IncrementalSentiment(lexicon)
+        text = ''
+        for piece in self.PARITY_CORPUS:
+            for char in piece + ' ':
+                text += char
+                assert draft.append(char) == lexicon.sentiment(text), text
+        
+        for edit in [text[:-40], text[:25] + 'not ' + text[25:], 'Mr. Smith was thrilled. ' + text]:
+            assert draft.update(edit) == lexicon.sentiment(edit), edit
+        
+    def test_incremental_rescores_only_the_tail(self, lexicon):
+        """Test that appending to a long draft does not rescore earlier sentences."""
+        from sentiment_lexicon import IncrementalSentiment
+        draft = IncrementalSentiment(lexicon)
+        draft.update('I was happy about the trip. ' * 200)
+        draft.append('And then')
+        # Only the last sentence and the new text are scored again
+        assert draft.chars_rescored == len('I was happy about the trip. And then')
+        
+    def test_pool_uses_lexicon_engine(self):
+        """Test that the sentiment pool scores with the lexicon engine."""
+        from sentiment_pool import SentimentPool, ENGINE_LEXICON
+        pool = SentimentPool(size=0, engine=ENGINE_LEXICON)
+        assert pool.engine == ENGINE_LEXICON
+        assert pool.score('What a wonderful day') > 0
+
+
 if __name__ == '__main__':
-    pytest.main([__file__, '-v']) 
\ No newline at end of file
+    pytest.main([__file__, '-v']) 
+
+
+class TestEmotionClassifier:
+    """Test the hashing-vectorizer classifier engine."""
+    
+    FEEDBACK = [
+        ('I am so happy and excited today', 'joy', 'correct'),
+        ('What a wonderful happy surprise', 'joy', 'yes'),
+        ('I feel sad and lonely tonight', 'joy', 'sadness'),
+        ('This is so sad and disappointing', 'sadness', 'correct'),
+        ('I am furious and angry about this', 'anger', 'correct'),
+        ('This makes me so angry and mad', 'fear', 'anger'),
+        ('The meeting is at noon', 'neutral', 'not sure'),
+    ]
+    
+    @pytest.fixture(scope='class')
+    @classmethod
+    def model_path(cls, tmp_path_factory):
+        """Feedback events written as published envelopes, trained to a model."""
+        from emotion_classifier import main
+        path = tmp_path_factory.mktemp('classifier')
+        events = [{'text': text, 'detected_emotion': detected, 'user_feedback': feedback}
+                  for text, detected, feedback in cls.FEEDBACK]
+        (path / 'feedback.jsonl').write_text('\n'.join([
+            *(json.dumps({'data': event, 'metadata': {'routing_key': 'emotion.validation'}}) for event in events[:4]),
+            *(json.dumps(event) for event in events[4:]),
+            'not json'
+        ]))
+        main(['train', str(path / 'feedback.jsonl'), '-o', str(path / 'model'),
+              '--n-features', str(2 ** 12), '--epochs', '50'])
+        return path / 'model'
+    
+    @pytest.fixture
+    def classifier_app(self, monkeypatch, model_path):
+        """App with the trained classifier loaded and backends stubbed."""
+        import app as app_module
+        from emotion_classifier import EmotionClassifier
+        from local_cache import LocalCache
+        monkeypatch.setattr(app_module, 'emotion_classifier', EmotionClassifier.load(str(model_path)))
+        monkeypatch.setattr(app_module, 'redis_client', None)
+        monkeypatch.setattr(app_module, 'queue_client', MagicMock())
+        monkeypatch.setattr(app_module, 'local_cache', LocalCache(max_entries=100, ttl=60))
+        return app_module
+    
+    def test_feedback_labels(self):
+        """Test that confirmations keep the detected emotion and corrections replace it."""
+        from emotion_classifier import feedback_label
+        assert feedback_label({'detected_emotion': 'joy', 'user_feedback': 'Correct'}) == 'joy'
+        assert feedback_label({'detected_emotion': 'joy', 'user_feedback': 'sadness'}) == 'sadness'
+        assert feedback_label({'detected_emotion': 'joy', 'user_feedback': 'meh'}) is None
+        
+    def test_model_is_memory_mapped(self, model_path):
+        """Test that the trained model loads with memory-mapped weights."""
+        import numpy as np
+        from emotion_classifier import EmotionClassifier
+        classifier = EmotionClassifier.load(str(model_path))
+        assert isinstance(classifier.weights, np.memmap)
+        assert classifier.classes == ['anger', 'joy', 'sadness']
+        assert classifier.weights.shape == (2 ** 12, 3)
+        
+    def test_batch_probabilities(self, model_path):
+        """Test that a batch is classified in one pass with normalized probabilities."""
+        from emotion_classifier import EmotionClassifier
+        classifier = EmotionClassifier.load(str(model_path))
+        results = classifier.classify(['so happy and excited', 'angry and furious', 'sad and lonely'])
+        assert [emotion for emotion, _confidence, _scores in results] == ['joy', 'anger', 'sadness']
+        for _emotion, confidence, scores in results:
+            assert abs(sum(scores.values()) - 1) < 0.01
+            assert 0 < confidence <= 1
+            
+    def test_engine_selected_per_request(self, client, classifier_app):
+        """Test that the request engine overrides the default and is cached separately."""
+        response = client.post('/api/emotion/detect', json={'text': 'I am angry and furious', 'engine': 'classifier'})
+        assert response.status_code == 200
+        assert response.get_json()['emotion'] == 'anger'
+        assert set(response.get_json()['emotion_scores']) == {'anger', 'joy', 'sadness'}
+        
+        response = client.post('/api/emotion/detect/batch', json={'texts': ['I am angry and furious'], 'engine': 'keyword'})
+        assert response.get_json()['cache_hits'] == 0
+        assert response.get_json()['results'][0]['emotion_scores'] == detect_emotion_keywords('I am angry and furious')
+        
+    def test_unavailable_or_unknown_engine(self, client, monkeypatch):
+        """Test 503 without a loaded model and 400 for an unknown engine."""
+        import app as app_module
+        monkeypatch.setattr(app_module, 'emotion_classifier', None)
+        response = client.post('/api/emotion/detect', json={'text': 'hello', 'engine': 'classifier'})
+        assert response.status_code == 503
+        response = client.post('/api/emotion/stream?engine=bogus', data='"hello"')
+        assert response.status_code == 400
+        
+    def test_default_classifier_falls_back_without_model(self, client, monkeypatch):
+        """Test that EMOTION_ENGINE=classifier without a model serves keyword results."""
+        import app as app_module
+        monkeypatch.setattr(app_module, 'EMOTION_ENGINE', 'classifier')
+        monkeypatch.setattr(app_module, 'emotion_classifier', None)
+        response = client.post('/api/emotion/detect/batch', json={'texts': ['I am angry and furious']})
+        assert response.status_code == 200
+        assert response.get_json()['results'][0]['emotion_scores'] == detect_emotion_keywords('I am angry and furious')
+        response = client.post('/api/emotion/detect/batch', json={'texts': ['hello'], 'engine': 'classifier'})
+        assert response.status_code == 503
+
+
+class TestCanonicalCache:
+    """Test near-duplicate cache keys."""
+    
+    def test_near_duplicates_share_a_form(self):
+        """Test that case, contractions, spacing, punctuation runs and emoji variants fold together."""
+        from text_canonicalizer import canonicalize_text
+        assert canonicalize_text("I'm so happy!!") == canonicalize_text('im  so HAPPY!') == 'i am so happy!'
+        assert canonicalize_text('I don\u2019t like it.') == canonicalize_text('i dont like it') == 'i do not like it'
+        assert canonicalize_text('great \U0001f44d\U0001f3fd\U0001f44d') == 'great \U0001f44d'
+        
+    def test_scoring_features_are_kept(self):
+        """Test that negation, exclamation and emoticons still separate texts."""
+        from text_canonicalizer import canonicalize_text
+        assert canonicalize_text('I am not happy') != canonicalize_text('I am happy')
+        assert canonicalize_text('happy!') != canonicalize_text('happy')
+        assert canonicalize_text('so sad :\'\'(') != canonicalize_text("so sad :'(")
+        assert canonicalize_text('great :D') != canonicalize_text('great :d')
+        
+    def test_emoticons_score_the_same(self, tmp_path):
+        """Test that texts sharing a canonical form with emoticons get the same score."""
+        from sentiment_lexicon import EMOTICONS, SentimentLexicon
+        from text_canonicalizer import canonicalize_text
+        lexicon = SentimentLexicon.load(str(tmp_path / 'lexicon.npy'))
+        for emoticons, _polarity in EMOTICONS:
+            for emoticon in emoticons:
+                for text in (f"I'm so sad {emoticon}", f'ok {emoticon}  FINE...', f'{emoticon[0]}{emoticon}'):
+                    assert lexicon.polarity(canonicalize_text(text)) == lexicon.polarity(text), text
+        
+    def test_switch_changes_cache_key(self, monkeypatch):
+        """Test that only the canonical switch makes near-duplicates share a key."""
+        import app as app_module
+        key = app_module.emotion_cache_key
+        assert key("I'm so happy!!") != key('im so happy!')
+        monkeypatch.setattr(app_module, 'EMOTION_CACHE_CANONICAL', True)
+        assert key("I'm so happy!!") == key('im so happy!')
+        assert key("I'm so happy!!").startswith('emotion:v2:c2:')
+        assert key('I am so happy') != key('I am not happy')
+        
+    def test_hit_report(self):
+        """Test that the report counts exact and near-duplicate hits."""
+        from cache_hit_report import hit_report
+        report = hit_report(["I'm so happy!", "I'm so happy!", 'im so happy!', 'I am sad'])
+        assert report['exact_hits'] == 1
+        assert report['canonical_hits'] == 2
+        assert report['near_duplicate_hits'] == 1
+        assert report['emotion_mismatches'] == 0
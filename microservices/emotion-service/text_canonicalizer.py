@@ -0,0 +1,107 @@
+"""
+Text Canonicalizer - Folds near-identical chat messages onto one cache key.
+Case, whitespace, punctuation runs and emoji variants are normalized and
+common contractions are expanded. Negations, exclamation marks and
+emoticons are kept, since they change the sentiment score.
+"""
+
+import re
+import unicodedata
+
+# Bump when the rules change so old canonical cache keys are not reused
+CANONICAL_VERSION = 2
+
+_APOSTROPHES = str.maketrans({'\u2019': "'", '\u2018': "'", '\u02bc': "'", '`': "'"})
+
+# Emoji presentation selectors and skin-tone modifiers
+_EMOJI_MODIFIERS = re.compile('[\ufe0e\ufe0f\U0001f3fb-\U0001f3ff]')
+
+# Punctuation and symbols that appear in the lexicon's emoticons. Runs of
+# these are left alone: ":''(" and ":'(" or "<<3" and "<3" score differently.
+EMOTICON_CHARACTERS = "'()*-./:;<=>[\\]^_{}\u00b0\u2665"
+
+# Any other repeated punctuation or symbol ("!!!", "???", repeated emoji)
+_SYMBOL_RUN = re.compile(r'([^\w\s%s])\1+' % re.escape(EMOTICON_CHARACTERS))
+
+# Punctuation detached from the preceding word ("happy !")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r'\s+([!?.,;])(?=\s|$)')
+
+# Periods ending an emoticon (":-.") are part of it, not sentence punctuation
+_TRAILING_PERIODS = re.compile(r'(?<![%s])[\s.]+$' % re.escape(EMOTICON_CHARACTERS))
+
+_WHITESPACE = re.compile(r'\s+')
+_TOKEN = re.compile(r'\S+')
+_LETTER_RUN = re.compile(r'[^\W\d_]{2}')
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+# Contractions with and without the apostrophe. Negations expand to "not";
+# spellings that are also ordinary words (ill, id, were, well, its) are left alone.
+CONTRACTIONS = {
+    "i'm": 'i am', 'im': 'i am',
+    "i've": 'i have', 'ive': 'i have',
+    "i'll": 'i will',
+    "i'd": 'i would',
+    "you're": 'you are', 'youre': 'you are',
+    "you've": 'you have', 'youve': 'you have',
+    "you'll": 'you will', 'youll': 'you will',
+    "we're": 'we are',
+    "we've": 'we have',
+    "they're": 'they are', 'theyre': 'they are',
+    "they've": 'they have', 'theyve': 'they have',
+    "they'll": 'they will',
+    "it's": 'it is',
+    "that's": 'that is', 'thats': 'that is',
+    "what's": 'what is', 'whats': 'what is',
+    "there's": 'there is', 'theres': 'there is',
+    "he's": 'he is',
+    "she's": 'she is',
+    "let's": 'let us',
+    "don't": 'do not', 'dont': 'do not',
+    "doesn't": 'does not', 'doesnt': 'does not',
+    "didn't": 'did not', 'didnt': 'did not',
+    "can't": 'can not', 'cant': 'can not', 'cannot': 'can not',
+    "couldn't": 'could not', 'couldnt': 'could not',
+    "won't": 'will not',
+    "wouldn't": 'would not', 'wouldnt': 'would not',
+    "shouldn't": 'should not', 'shouldnt': 'should not',
+    "isn't": 'is not', 'isnt': 'is not',
+    "aren't": 'are not', 'arent': 'are not',
+    "wasn't": 'was not', 'wasnt': 'was not',
+    "weren't": 'were not', 'werent': 'were not',
+    "haven't": 'have not', 'havent': 'have not',
+    "hasn't": 'has not', 'hasnt': 'has not',
+    "hadn't": 'had not', 'hadnt': 'had not',
+    "ain't": 'is not', 'aint': 'is not',
+}
+
+
+def _casefold_token(match):
+    token = match.group(0)
+    # Emoticons keep their case: ":D" scores as an emoticon, ":d" does not
+    if token[0] in EMOTICON_CHARACTERS and not _LETTER_RUN.search(token):
+        return token
+    return token.casefold()
+
+
+def _expand_contraction(match):
+    word = match.group(0)
+    return CONTRACTIONS.get(word, word)
+
+
+def canonicalize_text(text):
+    """
+    Canonical form of a text for cache keying.
+
+    "I'm so happy!!" and "im  so HAPPY!" share a form, while "not happy"
+    and "happy", or "happy!" and "happy", do not.
+    """
+    canonical = unicodedata.normalize('NFKC', text).translate(_APOSTROPHES)
+    canonical = _TOKEN.sub(_casefold_token, canonical)
+    canonical = _EMOJI_MODIFIERS.sub('', canonical)
+    canonical = _WORD.sub(_expand_contraction, canonical)
+    canonical = _SYMBOL_RUN.sub(r'\1', canonical)
+    canonical = _SPACE_BEFORE_PUNCTUATION.sub(r'\1', canonical)
+    canonical = _WHITESPACE.sub(' ', canonical)
+    canonical = _TRAILING_PERIODS.sub('', canonical).strip()
+    # Texts made only of periods keep their plain normalized form
+    return canonical or unicodedata.normalize('NFC', text).strip()
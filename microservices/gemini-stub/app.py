@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Gemini Stub - Local stand-in for the Gemini generateContent API
+Answers generateContent and streamGenerateContent (JSON array or ?alt=sse)
+with synthetic responses after a sampled latency, and injects server errors
+and 429 rate limits at configurable rates, so the real client code paths
+can be load tested without a GEMINI_API_KEY.
+
+Latency specs (GEMINI_STUB_LATENCY, seconds to the first chunk):
+    fixed:0.8
+    lognormal:median=0.8,sigma=0.5
+    bimodal:fast=0.4,slow=4.0,tail=0.05,sigma=0.25
+"""
+
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+from prometheus_client import Counter
+from prometheus_flask_exporter import PrometheusMetrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+
+# Prometheus metrics
+metrics = PrometheusMetrics(app)
+
+stub_outcomes = Counter('gemini_stub_responses', 'Stub responses by outcome', ['method', 'outcome'])
+
+WORDS = (
+    "I hear you and it sounds like today has been a lot to carry. It is completely okay to feel this way, "
+    "and you do not have to work through it alone. What part of it feels heaviest right now? Sometimes "
+    "naming the feeling helps it loosen its grip a little. I am glad you shared this with me, and I am here "
+    "to listen for as long as you need. Would it help to talk about what happened, or would you rather "
+    "focus on something that might lift your mood a bit?"
+).split()
+
+
+def parse_latency(spec):
+    """Parse a latency spec into a sampler returning seconds."""
+    kind, _, params = spec.partition(':')
+    kind = kind.strip().lower()
+    if kind == 'fixed':
+        seconds = float(params or 0)
+        return lambda rng: seconds
+
+    values = {}
+    for param in filter(None, params.split(',')):
+        key, _, value = param.partition('=')
+        values[key.strip()] = float(value)
+
+    if kind == 'lognormal':
+        mu = math.log(values.get('median', 0.8))
+        sigma = values.get('sigma', 0.5)
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    if kind == 'bimodal':
+        fast, slow = math.log(values.get('fast', 0.4)), math.log(values.get('slow', 4.0))
+        tail, sigma = values.get('tail', 0.05), values.get('sigma', 0.25)
+        return lambda rng: rng.lognormvariate(slow if rng.random() < tail else fast, sigma)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def parse_range(spec):
+    """Parse 'min:max' (or a single number) into an integer range."""
+    low, _, high = str(spec).partition(':')
+    return int(low), int(high or low)
+
+
+class StubConfig:
+    """Runtime settings; GET/PUT /stub/config reads and changes them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rng = random.Random(os.environ.get('GEMINI_STUB_SEED'))
+        self.update({
+            'latency': os.environ.get('GEMINI_STUB_LATENCY', 'fixed:0.5'),
+            'chunk_interval': float(os.environ.get('GEMINI_STUB_CHUNK_INTERVAL', 0.05)),
+            'chunk_words': int(os.environ.get('GEMINI_STUB_CHUNK_WORDS', 8)),
+            'error_rate': float(os.environ.get('GEMINI_STUB_ERROR_RATE', 0)),
+            'rate_limit_rate': float(os.environ.get('GEMINI_STUB_RATE_LIMIT_RATE', 0)),
+            'response_words': os.environ.get('GEMINI_STUB_RESPONSE_WORDS', '30:90'),
+        })
+
+    def update(self, settings):
+        """Apply settings (validated before any is changed); returns the current settings."""
+        with self._lock:
+            current = dict(getattr(self, 'settings', {}), **settings)
+            sampler = parse_latency(current['latency'])
+            response_words = parse_range(current['response_words'])
+            for key in ('error_rate', 'rate_limit_rate'):
+                if not 0 <= float(current[key]) <= 1:
+                    raise ValueError(f"{key} must be between 0 and 1")
+            self.settings = current
+            self._sampler = sampler
+            self._response_words = response_words
+            return dict(current)
+
+    def sample(self, max_output_tokens=None):
+        """Draw (outcome, first-chunk latency, response text) for one request."""
+        with self._lock:
+            roll = self.rng.random()
+            if roll < self.settings['rate_limit_rate']:
+                outcome = 'rate_limited'
+            elif roll < self.settings['rate_limit_rate'] + self.settings['error_rate']:
+                outcome = 'error'
+            else:
+                outcome = 'ok'
+            latency = self._sampler(self.rng)
+            words = self.rng.randint(*self._response_words)
+            offset = self.rng.randrange(len(WORDS))
+        if max_output_tokens:
+            # About three words per four tokens
+            words = min(words, max(1, int(max_output_tokens) * 3 // 4))
+        text = ' '.join(WORDS[(offset + i) % len(WORDS)] for i in range(words))
+        return outcome, latency, text
+
+
+config = StubConfig()
+
+
+def prompt_text(body):
+    return ' '.join(part.get('text', '') for content in body.get('contents', [])
+                    for part in content.get('parts', []))
+
+
+def error_body(code, status, message):
+    return {'error': {'code': code, 'message': message, 'status': status}}
+
+
+def error_response(outcome):
+    if outcome == 'rate_limited':
+        response = jsonify(error_body(429, 'RESOURCE_EXHAUSTED', 'Resource has been exhausted (e.g. check quota).'))
+        response.status_code = 429
+        response.headers['Retry-After'] = '1'
+        return response
+    response = jsonify(error_body(500, 'INTERNAL', 'An internal error has occurred.'))
+    response.status_code = 500
+    return response
+
+
+def candidate_response(model, text, prompt_tokens, output_tokens, final=True):
+    """One GenerateContentResponse; stream chunks only carry finishReason and usage on the last."""
+    candidate = {'content': {'parts': [{'text': text}], 'role': 'model'}, 'index': 0}
+    response = {'candidates': [candidate], 'modelVersion': model}
+    if final:
+        candidate['finishReason'] = 'STOP'
+        response['usageMetadata'] = {
+            'promptTokenCount': prompt_tokens,
+            'candidatesTokenCount': output_tokens,
+            'totalTokenCount': prompt_tokens + output_tokens
+        }
+    return response
+
+
+def split_chunks(text, chunk_words):
+    words = text.split(' ')
+    return [' '.join(words[i:i + chunk_words]) + (' ' if i + chunk_words < len(words) else '')
+            for i in range(0, len(words), chunk_words)]
+
+
+@app.route('/health', methods=['GET'])
+@metrics.counter('health_checks', 'Number of health check requests')
+def health_check():
+    """Health check endpoint."""
+    return jsonify({'service': 'gemini-stub', 'status': 'healthy', 'config': config.settings}), 200
+
+
+@app.route('/stub/config', methods=['GET', 'PUT'])
+def stub_config():
+    """Read or change the stub settings at runtime."""
+    if request.method == 'GET':
+        return jsonify(config.settings), 200
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'JSON data required'}), 400
+    unknown = set(data) - set(config.settings)
+    if unknown:
+        return jsonify({'error': f"Unknown settings: {', '.join(sorted(unknown))}"}), 400
+    try:
+        settings = config.update(data)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    logger.info(f"Stub config updated: {settings}")
+    return jsonify(settings), 200
+
+
+@app.route('/<version>/models/<path:model_method>', methods=['POST'])
+def generate(version, model_method):
+    """generateContent and streamGenerateContent for any model name."""
+    model, _, method = model_method.partition(':')
+    if method not in ('generateContent', 'streamGenerateContent'):
+        return jsonify(error_body(404, 'NOT_FOUND', f"Method not found: {method}")), 404
+
+    body = request.get_json(silent=True) or {}
+    generation_config = body.get('generationConfig') or body.get('generation_config') or {}
+    outcome, latency, text = config.sample(
+        generation_config.get('maxOutputTokens') or generation_config.get('max_output_tokens')
+    )
+    stub_outcomes.labels(method=method, outcome=outcome).inc()
+    time.sleep(latency)
+    if outcome != 'ok':
+        return error_response(outcome)
+
+    settings = config.settings
+    chunks = split_chunks(text, max(1, int(settings['chunk_words'])))
+    prompt_tokens = max(1, len(prompt_text(body)) // 4)
+    output_tokens = max(1, len(text) // 4)
+
+    if method == 'generateContent':
+        # Same total generation time as the streamed variant
+        time.sleep(settings['chunk_interval'] * (len(chunks) - 1))
+        return jsonify(candidate_response(model, text, prompt_tokens, output_tokens)), 200
+
+    sse = request.args.get('alt') == 'sse'
+
+    def events():
+        for index, chunk in enumerate(chunks):
+            if index:
+                time.sleep(settings['chunk_interval'])
+            final = index == len(chunks) - 1
+            payload = json.dumps(candidate_response(model, chunk, prompt_tokens, output_tokens, final))
+            if sse:
+                yield f"data: {payload}\r\n\r\n"
+            else:
+                yield ('[' if index == 0 else ',\r\n') + payload + (']' if final else '')
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream' if sse else 'application/json'
+    )
+
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 8010))
+    logger.info(f"Starting Gemini stub on port {port} with {config.settings}")
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
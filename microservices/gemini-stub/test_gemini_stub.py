@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Gemini stub
+"""
+
+import json
+import os
+import random
+import sys
+
+import pytest
+
+# Add the current directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+os.environ.update({
+    'GEMINI_STUB_LATENCY': 'fixed:0',
+    'GEMINI_STUB_CHUNK_INTERVAL': '0',
+    'GEMINI_STUB_SEED': '7'
+})
+
+from app import app, config, parse_latency
+
+DEFAULTS = dict(config.settings)
+REQUEST = {'contents': [{'parts': [{'text': 'I feel a bit down today'}]}]}
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+    config.update(DEFAULTS)
+
+
+class TestLatencyDistributions:
+    """Test latency spec parsing and sampling."""
+
+    def test_fixed_latency(self):
+        """Fixed latency always returns the same value."""
+        sample = parse_latency('fixed:0.25')
+        assert sample(random.Random(1)) == 0.25
+
+    def test_lognormal_latency_median(self):
+        """Lognormal samples are centred on the configured median."""
+        sample = parse_latency('lognormal:median=0.8,sigma=0.5')
+        rng = random.Random(1)
+        samples = sorted(sample(rng) for _ in range(2001))
+        assert 0.7 < samples[1000] < 0.9
+
+    def test_bimodal_latency_tail(self):
+        """Bimodal latency sends roughly the tail share to the slow mode."""
+        sample = parse_latency('bimodal:fast=0.1,slow=5,tail=0.1,sigma=0.1')
+        rng = random.Random(1)
+        slow = sum(sample(rng) > 1 for _ in range(2000))
+        assert 150 < slow < 250
+
+    def test_unknown_distribution_rejected(self):
+        """Unknown distributions raise ValueError."""
+        with pytest.raises(ValueError):
+            parse_latency('uniform:1')
+
+
+class TestGenerateContent:
+    """Test the generateContent and streamGenerateContent endpoints."""
+
+    def test_generate_content_shape(self, client):
+        """Responses carry a candidate with text, a finish reason and usage."""
+        response = client.post('/v1beta/models/gemini-1.5-flash:generateContent?key=test', json=REQUEST)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        candidate = data['candidates'][0]
+        assert candidate['content']['parts'][0]['text']
+        assert candidate['finishReason'] == 'STOP'
+        assert data['usageMetadata']['totalTokenCount'] > 0
+
+    def test_max_output_tokens_caps_length(self, client):
+        """maxOutputTokens bounds the response length."""
+        body = dict(REQUEST, generationConfig={'maxOutputTokens': 8})
+        response = client.post('/v1beta/models/gemini-1.5-flash:generateContent', json=body)
+
+        assert len(response.get_json()['candidates'][0]['content']['parts'][0]['text'].split()) <= 6
+
+    def test_stream_json_array(self, client):
+        """The default stream is a JSON array of partial responses."""
+        response = client.post('/v1beta/models/gemini-1.5-flash:streamGenerateContent', json=REQUEST)
+
+        chunks = json.loads(response.get_data(as_text=True))
+        assert len(chunks) > 1
+        assert 'finishReason' not in chunks[0]['candidates'][0]
+        assert chunks[-1]['candidates'][0]['finishReason'] == 'STOP'
+
+    def test_stream_sse(self, client):
+        """alt=sse streams server-sent events."""
+        response = client.post('/v1beta/models/gemini-1.5-flash:streamGenerateContent?alt=sse', json=REQUEST)
+
+        events = [line[len('data: '):] for line in response.get_data(as_text=True).splitlines()
+                  if line.startswith('data: ')]
+        text = ''.join(json.loads(event)['candidates'][0]['content']['parts'][0]['text'] for event in events)
+        assert response.mimetype == 'text/event-stream'
+        assert len(events) > 1 and text
+
+    def test_rate_limit_injection(self, client):
+        """A rate-limit rate of 1 answers every request with 429."""
+        config.update({'rate_limit_rate': 1.0})
+        response = client.post('/v1beta/models/gemini-1.5-flash:generateContent', json=REQUEST)
+
+        assert response.status_code == 429
+        assert response.get_json()['error']['status'] == 'RESOURCE_EXHAUSTED'
+        assert response.headers['Retry-After']
+
+    def test_error_injection(self, client):
+        """An error rate of 1 answers every request with 500."""
+        config.update({'error_rate': 1.0})
+        response = client.post('/v1beta/models/gemini-1.5-flash:generateContent', json=REQUEST)
+
+        assert response.status_code == 500
+
+    def test_unknown_method(self, client):
+        """Other model methods return 404."""
+        response = client.post('/v1beta/models/gemini-1.5-flash:countTokens', json=REQUEST)
+        assert response.status_code == 404
+
+
+class TestStubConfig:
+    """Test runtime configuration."""
+
+    def test_update_config(self, client):
+        """PUT /stub/config changes the settings."""
+        response = client.put('/stub/config', json={'latency': 'lognormal:median=0.5,sigma=0.3'})
+
+        assert response.status_code == 200
+        assert client.get('/stub/config').get_json()['latency'] == 'lognormal:median=0.5,sigma=0.3'
+
+    def test_invalid_config_rejected(self, client):
+        """Invalid settings are rejected without changing anything."""
+        response = client.put('/stub/config', json={'latency': 'fixed:0.1', 'error_rate': 2})
+
+        assert response.status_code == 400
+        assert client.get('/stub/config').get_json()['latency'] == 'fixed:0'
+
+    def test_unknown_setting_rejected(self, client):
+        """Unknown setting names are rejected."""
+        response = client.put('/stub/config', json={'latncy': 'fixed:1'})
+        assert response.status_code == 400
@@ -8,12 +8,27 @@ import json
 import logging
 import os
 from datetime import datetime
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, Optional, Callable, List
 import threading
 import time
+import queue
+import atexit
+import functools
+import uuid
 
 logger = logging.getLogger(__name__)
 
+def build_envelope(service_name: str, routing_key: str, message: Dict) -> Dict:
+    """Wrap an event in the standard {'data', 'metadata'} message envelope."""
+    return {
+        'data': message,
+        'metadata': {
+            'service': service_name,
+            'timestamp': datetime.utcnow().isoformat(),
+            'routing_key': routing_key
+        }
+    }
+
 class MessageQueueClient:
     """Base class for RabbitMQ communication."""
     
@@ -34,6 +49,11 @@ class MessageQueueClient:
         # Connection retry settings
         self.max_retries = 5
         self.retry_delay = 5
+        # Consumers back off up to this long between reconnects
+        self.max_retry_delay = 60
+        
+        # Optional background publisher (see start_background_publisher)
+        self.background_publisher = None
         
     def connect(self) -> bool:
         """Establish connection to RabbitMQ."""
@@ -92,20 +112,10 @@ class MessageQueueClient:
             return False
         
         try:
-            # Add metadata to message
-            message_with_metadata = {
-                'data': message,
-                'metadata': {
-                    'service': self.service_name,
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'routing_key': routing_key
-                }
-            }
-            
             self.channel.basic_publish(
                 exchange=exchange,
                 routing_key=routing_key,
-                body=json.dumps(message_with_metadata),
+                body=json.dumps(build_envelope(self.service_name, routing_key, message)),
                 properties=pika.BasicProperties(
                     delivery_mode=2,  # Make message persistent
                     content_type='application/json'
@@ -119,6 +129,25 @@ class MessageQueueClient:
             logger.error(f"Failed to publish event {routing_key}: {e}")
             return False
     
+    def start_background_publisher(self, **kwargs) -> 'BackgroundPublisher':
+        """Start a background publisher used by publish_event_async."""
+        if self.background_publisher is None:
+            self.background_publisher = BackgroundPublisher(self.service_name, **kwargs)
+            self.background_publisher.start()
+            atexit.register(self.background_publisher.close)
+        return self.background_publisher
+    
+    def publish_event_async(self, routing_key: str, message: Dict, exchange: str = 'emotibot.events') -> bool:
+        """
+        Queue an event for the background publisher without blocking.
+        
+        Falls back to a synchronous publish_event when no background
+        publisher has been started.
+        """
+        if self.background_publisher is None:
+            return self.publish_event(routing_key, message, exchange)
+        return self.background_publisher.enqueue(routing_key, message, exchange)
+    
     def publish_notification(self, message: Dict) -> bool:
         """Publish notification message to fanout exchange."""
         return self.publish_event('', message, 'emotibot.notifications')
@@ -132,61 +161,132 @@ class MessageQueueClient:
         }
         return self.publish_event('analytics.event', message, 'emotibot.analytics')
     
-    def consume_queue(self, queue_name: str, callback: Callable, auto_ack: bool = False):
-        """Start consuming messages from a queue."""
+    def publish_generation_job(self, request: Dict, job_id: str = None, reply_to: str = None,
+                               correlation_id: str = None) -> Optional[str]:
+        """
+        Queue an AI generation request for the AI Service's job workers.
+        
+        Returns the job's ID, or None if it could not be published.
+        correlation_id is the caller's own ID, echoed back with the result.
+        The result belongs to this service: it is kept for pickup
+        (GET /api/ai/jobs/<job_id>) and, with reply_to (an ai.response.*
+        routing key), also published on emotibot.events under that key.
+        """
+        job = dict(request, job_id=job_id or uuid.uuid4().hex, submitted_at=time.time())
+        if reply_to:
+            job['reply_to'] = reply_to
+        if correlation_id:
+            job['correlation_id'] = correlation_id
+        return job['job_id'] if self.publish_event('ai.generate', job) else None
+    
+    def consume_queue(self, queue_name: str, callback: Callable, auto_ack: bool = False,
+                      prefetch_count: int = None, queue_arguments: Dict = None, routing_key: str = None,
+                      exchange: str = 'emotibot.events', long_running: bool = False):
+        """
+        Start consuming messages from a queue.
+        
+        queue_arguments must match the queue's definition, if it has one.
+        With routing_key the queue is bound to exchange; prefetch_count
+        bounds the unacknowledged messages delivered to this consumer.
+        
+        If the connection drops, the consumer reconnects with backoff and
+        unacknowledged messages are redelivered. With long_running, each
+        message is processed on its own thread while the consumer thread
+        keeps the connection's heartbeats going; set prefetch_count to
+        bound how many run at once.
+        """
         if not self.ensure_connection():
             return False
         
-        try:
+        def settle(ch, delivery_tag, ack, requeue=False):
+            if ack:
+                action = functools.partial(ch.basic_ack, delivery_tag=delivery_tag)
+            else:
+                action = functools.partial(ch.basic_nack, delivery_tag=delivery_tag, requeue=requeue)
+            if not long_running:
+                action()
+                return
+            try:
+                # Channels belong to the consumer thread; hand the ack back to it
+                ch.connection.add_callback_threadsafe(action)
+            except Exception as e:
+                logger.warning(f"Could not settle message from {queue_name}, it will be redelivered: {e}")
+        
+        def process(ch, delivery_tag, body):
+            try:
+                message = json.loads(body)
+                logger.info(f"{self.service_name} received message from {queue_name}")
+                
+                # Process message
+                result = callback(message)
+                
+                # Acknowledge message
+                settle(ch, delivery_tag, auto_ack or result, requeue=True)
+                
+            except Exception as e:
+                logger.error(f"Error processing message from {queue_name}: {e}")
+                settle(ch, delivery_tag, False)
+        
+        def message_handler(ch, method, properties, body):
+            if long_running:
+                threading.Thread(target=process, args=(ch, method.delivery_tag, body), daemon=True).start()
+            else:
+                process(ch, method.delivery_tag, body)
+        
+        def subscribe():
             # Declare queue
-            self.channel.queue_declare(queue=queue_name, durable=True)
+            self.channel.queue_declare(queue=queue_name, durable=True, arguments=queue_arguments)
+            if routing_key:
+                self.channel.queue_bind(queue=queue_name, exchange=exchange, routing_key=routing_key)
+            if prefetch_count:
+                self.channel.basic_qos(prefetch_count=prefetch_count)
             
             # Set up consumer
-            def message_handler(ch, method, properties, body):
-                try:
-                    message = json.loads(body)
-                    logger.info(f"{self.service_name} received message from {queue_name}")
-                    
-                    # Process message
-                    result = callback(message)
-                    
-                    # Acknowledge message
-                    if auto_ack or result:
-                        ch.basic_ack(delivery_tag=method.delivery_tag)
-                    else:
-                        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
-                        
-                except Exception as e:
-                    logger.error(f"Error processing message from {queue_name}: {e}")
-                    ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-            
-            # Start consuming
             self.channel.basic_consume(
                 queue=queue_name,
                 on_message_callback=message_handler,
                 auto_ack=auto_ack
             )
-            
-            self.consumers[queue_name] = True
-            logger.info(f"{self.service_name} started consuming from {queue_name}")
-            
-            # Start consuming in a separate thread
-            def consume_loop():
+        
+        try:
+            subscribe()
+        except Exception as e:
+            logger.error(f"Failed to start consuming from {queue_name}: {e}")
+            return False
+        
+        self.consumers[queue_name] = True
+        logger.info(f"{self.service_name} started consuming from {queue_name}")
+        
+        # Consume in a separate thread, reconnecting until stop_consuming()
+        def consume_loop():
+            delay = self.retry_delay
+            subscribed = True
+            while queue_name in self.consumers:
                 try:
+                    if not subscribed:
+                        self.close()
+                        self.connection = None
+                        if not self.ensure_connection():
+                            raise ConnectionError("RabbitMQ unavailable")
+                        subscribe()
+                        subscribed = True
+                        delay = self.retry_delay
+                        logger.info(f"{self.service_name} resumed consuming from {queue_name}")
                     self.channel.start_consuming()
+                    return
                 except KeyboardInterrupt:
                     self.channel.stop_consuming()
+                    return
                 except Exception as e:
-                    logger.error(f"Consumer loop error: {e}")
-            
-            consumer_thread = threading.Thread(target=consume_loop, daemon=True)
-            consumer_thread.start()
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to start consuming from {queue_name}: {e}")
-            return False
+                    logger.error(f"Consumer loop error on {queue_name}, reconnecting in {delay} seconds: {e}")
+                    subscribed = False
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+        
+        consumer_thread = threading.Thread(target=consume_loop, daemon=True)
+        consumer_thread.start()
+        
+        return True
     
     def stop_consuming(self, queue_name: str):
         """Stop consuming from a specific queue."""
@@ -207,6 +307,153 @@ class MessageQueueClient:
         except Exception as e:
             logger.error(f"Error closing RabbitMQ connection: {e}")
 
+class BackgroundPublisher:
+    """
+    Publishes events from a dedicated thread in size- or time-bounded batches.
+    
+    Callers only do a non-blocking put on a bounded queue; when the queue is
+    full the event is dropped and counted instead of blocking the caller.
+    Every event is published as its own standard envelope, stamped when it
+    was queued. A batch is published inside one channel transaction, so the
+    broker acknowledges the whole batch with a single round trip.
+    """
+    
+    def __init__(self, service_name: str, max_queue_size: int = 10000, batch_size: int = 100,
+                 flush_interval: float = 0.5, max_attempts: int = 5):
+        self.service_name = service_name
+        self.batch_size = max(int(batch_size), 1)
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._queue = queue.Queue(maxsize=max(int(max_queue_size), 1))
+        self._stop = threading.Event()
+        self._thread = None
+        # Dedicated connection: pika channels must not be shared across threads
+        self._client = MessageQueueClient(service_name)
+        
+        # Counters (read by service metrics)
+        self.enqueued = 0
+        self.published = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+    
+    @property
+    def pending(self) -> int:
+        """Events waiting to be published."""
+        return self._queue.qsize()
+    
+    def start(self):
+        """Start the publishing thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name=f"{self.service_name}-publisher", daemon=True
+            )
+            self._thread.start()
+    
+    def enqueue(self, routing_key: str, message: Dict, exchange: str = 'emotibot.events') -> bool:
+        """Queue an event; returns False (and counts it) if the queue is full."""
+        try:
+            self._queue.put_nowait((exchange, routing_key, build_envelope(self.service_name, routing_key, message)))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued event has been handled."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+    
+    def close(self, timeout: float = 5.0):
+        """Publish what is queued (up to timeout), then stop the thread."""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self._client.close()
+    
+    def _next_batch(self) -> List:
+        """Block for the first event, then collect until batch_size or flush_interval."""
+        try:
+            batch = [self._queue.get(timeout=0.2)]
+        except queue.Empty:
+            return []
+        
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _connect(self) -> bool:
+        """Open the publisher's own connection in transaction mode."""
+        if self._client.connection is not None and self._client.connection.is_open:
+            return True
+        if not self._client.connect():
+            return False
+        # The blocking channel waits for each publisher confirm in turn; a
+        # transaction is acknowledged once per batch
+        self._client.channel.tx_select()
+        return True
+    
+    def _publish_batch(self, batch: List):
+        """Publish each event in the batch, then commit them in one transaction."""
+        for exchange, routing_key, envelope in batch:
+            self._client.channel.basic_publish(
+                exchange=exchange,
+                routing_key=routing_key,
+                body=json.dumps(envelope),
+                properties=pika.BasicProperties(
+                    delivery_mode=2,  # Make message persistent
+                    content_type='application/json'
+                )
+            )
+        # Raises an AMQP error if the broker does not take the batch
+        self._client.channel.tx_commit()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            
+            delivered = False
+            for attempt in range(self.max_attempts):
+                try:
+                    if self._connect():
+                        self._publish_batch(batch)
+                        delivered = True
+                        break
+                except Exception as e:
+                    logger.error(f"Background publish of {len(batch)} events failed: {e}")
+                    self._client.close()
+                    self._client.connection = None
+                # Back off without holding up close()
+                if self._stop.wait(min(self._client.retry_delay, 2 ** attempt * 0.1)):
+                    break
+            
+            if delivered:
+                self.published += len(batch)
+                self.batches += 1
+            else:
+                self.failed += len(batch)
+                logger.error(f"Dropped {len(batch)} events after failed publish attempts")
+            
+            for _ in batch:
+                self._queue.task_done()
+
 class AuthServiceQueueClient(MessageQueueClient):
     """Queue client for Auth Service."""
     
@@ -235,6 +482,10 @@ class EmotionServiceQueueClient(MessageQueueClient):
         """Publish emotion analysis result."""
         return self.publish_event('emotion.analyzed', analysis_data)
     
+    def publish_emotion_analyzed_async(self, analysis_data: Dict):
+        """Queue an emotion analysis result for the background publisher."""
+        return self.publish_event_async('emotion.analyzed', analysis_data)
+    
     def publish_emotion_stats_updated(self, stats_data: Dict):
         """Publish emotion statistics update."""
         return self.publish_event('emotion.stats.updated', stats_data)
@@ -0,0 +1,158 @@
+"""
+Shared Prompt Builder Library
+Fits LLM prompts into a token budget. Templates are compiled once into
+literal and field segments, with the token cost of the literal text counted
+at compile time. Conversation history is trimmed oldest turn first, and
+overlong messages are cut in the middle so their opening and their
+conclusion both survive.
+
+Token counts come from a fast local estimate rather than the model's
+tokenizer, so budgets should leave some headroom.
+"""
+
+import re
+from collections import namedtuple
+from string import Formatter
+
+# Words, numbers and single punctuation marks
+_PIECE = re.compile(r"\w+|[^\w\s]")
+
+# Placed where the middle of a message was cut out
+TRUNCATION_MARKER = ' [...] '
+
+BuiltPrompt = namedtuple('BuiltPrompt', ['text', 'tokens', 'turns', 'dropped_turns', 'truncated'])
+
+
+def estimate_tokens(text):
+    """
+    Approximate token count of text.
+
+    Subword tokenizers spend roughly one token per short word or
+    punctuation mark and about four characters per token on long words,
+    so this takes the larger of the two counts.
+    """
+    if not text:
+        return 0
+    return max(len(_PIECE.findall(text)), (len(text) + 3) // 4)
+
+
+def truncate_middle(text, max_tokens, marker=TRUNCATION_MARKER):
+    """Cut the middle out of text so it fits max_tokens; returns (text, truncated)."""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text, False
+
+    keep = int(len(text) * max_tokens / tokens) - len(marker)
+    while keep > 0:
+        head = keep // 2
+        candidate = text[:head].rstrip() + marker + text[len(text) - (keep - head):].lstrip()
+        if estimate_tokens(candidate) <= max_tokens:
+            return candidate, True
+        keep = int(keep * 0.9)
+    return marker.strip(), True
+
+
+class PromptTemplate:
+    """A str.format template parsed once, with the cost of its literal text precomputed."""
+
+    def __init__(self, name, version, source):
+        self.name = name
+        self.version = version
+        self.source = source
+        self._segments = []  # (literal, field name, format spec)
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if conversion:
+                raise ValueError(f"Template {self.key}: conversions are not supported")
+            self._segments.append((literal, field, spec or ''))
+        self.fields = {field for _literal, field, _spec in self._segments if field}
+        self.static_tokens = estimate_tokens(''.join(literal for literal, _field, _spec in self._segments))
+
+    @property
+    def key(self):
+        return f"{self.name}:v{self.version}"
+
+    def render(self, **fields):
+        parts = []
+        for literal, field, spec in self._segments:
+            parts.append(literal)
+            if field:
+                parts.append(format(fields[field], spec))
+        return ''.join(parts)
+
+
+class PromptBuilder:
+    """
+    Renders a template whose message and history fit a token budget.
+
+    The current message is kept whole unless it needs more than
+    max_message_share of the budget left after the template. History turns
+    are rendered newest first with turn_template, each field cut to
+    max_turn_tokens, and older turns are dropped once the budget runs out.
+    Kept turns are wrapped in history_template's {turns} field.
+    """
+
+    def __init__(self, template, token_budget, turn_template=None, history_template=None,
+                 max_turns=None, max_turn_tokens=256, max_message_share=0.6,
+                 message_field='message', history_field='history'):
+        self.template = template
+        self.token_budget = token_budget
+        self.turn_template = turn_template
+        self.history_template = history_template
+        self.max_turns = max_turns
+        self.max_turn_tokens = max_turn_tokens
+        self.max_message_share = max_message_share
+        self.message_field = message_field
+        self.history_field = history_field
+
+    def build(self, message, history=None, **fields):
+        """
+        Build the prompt for message, the history turns (oldest first, as
+        dicts of turn_template fields) and any other template fields.
+        """
+        available = self.token_budget - self.template.static_tokens
+        available -= sum(estimate_tokens(str(value)) for value in fields.values())
+
+        history = list(history or [])
+        if self.max_turns is not None:
+            history = history[-self.max_turns:] if self.max_turns else []
+        if history and self.history_template:
+            available -= self.history_template.static_tokens
+
+        message_tokens = estimate_tokens(message)
+        if history and message_tokens > available * self.max_message_share:
+            message, truncated = truncate_middle(message, max(int(available * self.max_message_share), 1))
+        else:
+            message, truncated = truncate_middle(message, max(available, 1))
+        available -= estimate_tokens(message)
+
+        kept = []
+        for turn in reversed(history):
+            rendered, turn_truncated = self._render_turn(turn, self.max_turn_tokens)
+            cost = estimate_tokens(rendered) + 1  # joining newline
+            if cost > available and not kept:
+                # Always try to keep part of the newest turn
+                share = (available - 1 - self.turn_template.static_tokens) // len(self.turn_template.fields)
+                if share > 0:
+                    rendered, turn_truncated = self._render_turn(turn, share)
+                    cost = estimate_tokens(rendered) + 1
+            if cost > available:
+                break
+            kept.append(rendered)
+            truncated = truncated or turn_truncated
+            available -= cost
+
+        values = {self.message_field: message, **fields}
+        if self.history_field in self.template.fields:
+            values[self.history_field] = ''
+            if kept:
+                values[self.history_field] = self.history_template.render(turns='\n'.join(reversed(kept)))
+        text = self.template.render(**values)
+        return BuiltPrompt(text, estimate_tokens(text), len(kept), len(history) - len(kept), truncated)
+
+    def _render_turn(self, turn, max_field_tokens):
+        truncated = False
+        values = {}
+        for field in self.turn_template.fields:
+            values[field], field_truncated = truncate_middle(str(turn.get(field, '')), max_field_tokens)
+            truncated = truncated or field_truncated
+        return self.turn_template.render(**values), truncated
@@ -0,0 +1,456 @@
+"""
+Compact Sentiment Lexicon
+Compiles the TextBlob/pattern English sentiment lexicon into a fixed-width
+NumPy table that is memory-mapped at runtime, and scores text against it
+without constructing TextBlob objects.
+
+The scorer reproduces PatternAnalyzer's polarity and subjectivity (the same
+tokenizer, negation, modifier, exclamation and emoticon rules) to within
+PARITY_TOLERANCE. TextBlob is only needed to build the artifact:
+
+    python sentiment_lexicon.py build [output.npy]
+"""
+
+import logging
+import os
+import re
+import sys
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Maximum absolute difference from TextBlob polarity/subjectivity
+PARITY_TOLERANCE = 1e-6
+
+ARTIFACT_VERSION = 1
+DEFAULT_LEXICON_PATH = os.environ.get(
+    'SENTIMENT_LEXICON_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sentiment_lexicon.npy')
+)
+
+# Row flags
+FLAG_MODIFIER = 1  # word has an adverb (RB) sense and can intensify the next word
+
+LEXICON_DTYPE = np.dtype([
+    ('word', 'S32'),
+    ('polarity', '<f8'),
+    ('subjectivity', '<f8'),
+    ('intensity', '<f8'),
+    ('flags', 'u1'),
+])
+
+# --- Tokenizer and assessment rules (mirrors textblob._text / textblob.en) ---
+
+PUNCTUATION = ".,;:!?()[]{}`''\"@#$^&*+-|=~_"
+_LEADING_PUNCTUATION = tuple(PUNCTUATION.replace(".", ""))
+_TRAILING_PUNCTUATION = _LEADING_PUNCTUATION + (".",)
+
+ABBREVIATIONS = frozenset((
+    "a.", "adj.", "adv.", "al.", "a.m.", "c.", "cf.", "comp.", "conf.", "def.",
+    "ed.", "e.g.", "esp.", "etc.", "ex.", "f.", "fig.", "gen.", "id.", "i.e.",
+    "int.", "l.", "m.", "Med.", "Mil.", "Mr.", "n.", "n.q.", "orig.", "pl.",
+    "pred.", "pres.", "p.m.", "ref.", "v.", "vs.", "w/",
+))
+_RE_ABBR1 = re.compile(r"^[A-Za-z]\.$")
+_RE_ABBR2 = re.compile(r"^([A-Za-z]\.)+$")
+_RE_ABBR3 = re.compile("^[A-Z][" + "|".join("bcdfghjklmnpqrstvwxz") + "]+.$")
+
+CONTRACTIONS = (
+    ("'d", " 'd"), ("'m", " 'm"), ("'s", " 's"), ("'ll", " 'll"),
+    ("'re", " 're"), ("'ve", " 've"), ("n't", " n't"),
+)
+_CONTRACTION_TOKENS = frozenset(a for a, _ in CONTRACTIONS)
+_QUOTES = (("“", " “ "), ("”", " ” "), ("‘", " ‘ "), ("’", " ’ "), ("'", " ' "), ('"', ' " '))
+
+EOS = "END-OF-SENTENCE"
+_SENTENCE_END = ("...", ".", "!", "?", EOS)
+_SENTENCE_TRAIL = ("'", '"', "”", "’", "...", ".", "!", "?", ")", EOS)
+_RE_LINEBREAK = re.compile(r"\n{2,}")
+_RE_WHITESPACE = re.compile(r"\s+")
+_RE_SARCASM = re.compile(r"\( ?\! ?\)")
+
+# (emoticons, polarity) in the order PatternAnalyzer checks them
+EMOTICONS = (
+    (("<3", "♥"), 1.00),
+    ((">:D", ":-D", ":D", "=-D", "=D", "X-D", "x-D", "XD", "xD", "8-D"), 1.00),
+    ((">:P", ":-P", ":P", ":-p", ":p", ":-b", ":b", ":c)", ":o)", ":^)"), 0.75),
+    ((">:)", ":-)", ":)", "=)", "=]", ":]", ":}", ":>", ":3", "8)", "8-)"), 0.50),
+    ((">;]", ";-)", ";)", ";-]", ";]", ";D", ";^)", "*-)", "*)"), 0.25),
+    ((">:o", ":-O", ":O", ":o", ":-o", "o_O", "o.O", "°O°", "°o°"), 0.05),
+    ((">:/", ":-/", ":/", ":\\", ">:\\", ":-.", ":-s", ":s", ":S", ":-S", ">.>"), -0.25),
+    ((">:[", ":-(", ":(", "=(", ":-[", ":[", ":{", ":-<", ":c", ":-c", "=/"), -0.75),
+    ((":'(", ":'''(", ";'("), -1.00),
+)
+_EMOTICON_POLARITY = {}
+for _emoticons, _polarity in EMOTICONS:
+    for _emoticon in _emoticons:
+        _EMOTICON_POLARITY.setdefault(_emoticon.lower(), _polarity)
+_RE_EMOTICONS = re.compile(r"(%s)($|\s)" % "|".join(
+    r" ?".join(re.escape(c) for c in emoticon) for emoticons, _ in EMOTICONS for emoticon in emoticons
+))
+
+NEGATIONS = frozenset(("no", "not", "n't", "never"))
+
+
+def _is_abbreviation(token):
+    return (
+        token in ABBREVIATIONS
+        or _RE_ABBR1.match(token) is not None
+        or _RE_ABBR2.match(token) is not None
+        or _RE_ABBR3.match(token) is not None
+    )
+
+
+def _split_token(t, tokens):
+    """Split leading/trailing punctuation off one whitespace-delimited token."""
+    if t.isalnum():
+        tokens.append(t)
+        return
+
+    tail = []
+    while t.startswith(_LEADING_PUNCTUATION) and t not in _CONTRACTION_TOKENS:
+        tokens.append(t[0])
+        t = t[1:]
+    while t.endswith(_TRAILING_PUNCTUATION) and t not in _CONTRACTION_TOKENS:
+        if t.endswith(_LEADING_PUNCTUATION):
+            tail.append(t[-1])
+            t = t[:-1]
+        if t.endswith("..."):
+            tail.append("...")
+            t = t[:-3].rstrip(".")
+        if t.endswith("."):
+            if _is_abbreviation(t):
+                break
+            tail.append(t[-1])
+            t = t[:-1]
+    if t != "":
+        tokens.append(t)
+    tokens.extend(reversed(tail))
+
+
+def _split_tokens(text):
+    """First tokenizer pass: contractions, quotes, paragraphs and punctuation."""
+    for a, b in CONTRACTIONS:
+        if a in text:
+            text = text.replace(a, b)
+    for a, b in _QUOTES:
+        if a in text:
+            text = text.replace(a, b)
+    if "\n" in text:
+        text = _RE_LINEBREAK.sub(" %s " % EOS, text.replace("\r\n", "\n"))
+
+    tokens = []
+    for t in _RE_WHITESPACE.sub(" ", text).split():
+        _split_token(t, tokens)
+    return tokens
+
+
+def tokenize(text):
+    """
+    Tokenize text exactly like TextBlob's English sentiment tokenizer.
+
+    Returns a flat list of lowercase tokens (sentence boundaries are not
+    needed for scoring).
+    """
+    tokens = _split_tokens(text)
+
+    # Sentence pass: drop end-of-paragraph markers and re-join sarcasm marks
+    # and emoticons that punctuation splitting broke apart.
+    sentences, i, j = [[]], 0, 0
+    while j < len(tokens):
+        if tokens[j] in _SENTENCE_END:
+            while j < len(tokens) and tokens[j] in _SENTENCE_TRAIL:
+                if tokens[j] in ("'", '"') and sentences[-1].count(tokens[j]) % 2 == 0:
+                    break
+                j += 1
+            sentences[-1].extend(t for t in tokens[i:j] if t != EOS)
+            sentences.append([])
+            i = j
+        j += 1
+    sentences[-1].extend(tokens[i:j])
+
+    words = []
+    for sentence in sentences:
+        if not sentence:
+            continue
+        s = " ".join(sentence)
+        if "(" in s:
+            s = _RE_SARCASM.sub("(!)", s)
+        s = _RE_EMOTICONS.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), s)
+        words.extend(s.lower().split())
+    return words
+
+
+class SentimentLexicon:
+    """Array-backed sentiment lexicon with a PatternAnalyzer-compatible scorer."""
+
+    def __init__(self, table: np.ndarray):
+        self.table = table
+        # Only the word -> row index lives in process memory; scores stay in
+        # the (memory-mapped) table and are gathered per call for the rows hit.
+        self.words = {word.decode('utf-8'): row for row, word in enumerate(table['word'].tolist())}
+        # (a plain ndarray view of the mapping skips np.memmap's per-index overhead)
+        self._scores = table.view(np.ndarray)[['polarity', 'subjectivity', 'intensity', 'flags']]
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    @classmethod
+    def load(cls, path: Optional[str] = None, build_if_missing: bool = True) -> 'SentimentLexicon':
+        """Memory-map the lexicon artifact, building it first if needed."""
+        path = path or DEFAULT_LEXICON_PATH
+        if not os.path.exists(path):
+            if not build_if_missing:
+                raise FileNotFoundError(f"Sentiment lexicon artifact not found: {path}")
+            build_lexicon(path)
+        table = np.load(path, mmap_mode='r')
+        if table.dtype != LEXICON_DTYPE:
+            raise ValueError(f"Unexpected sentiment lexicon layout in {path}")
+        return cls(table)
+
+    def assessments(self, words):
+        """
+        Return [polarity, subjectivity, intensity, negated] assessments.
+
+        Port of textblob._text.Sentiment.assessments for untagged text.
+        """
+        a = []
+        self._assess(words, a, None, None)
+        return a
+
+    def _assess(self, words, a, m, n):
+        """
+        Append assessments for words to a, continuing from modifier m and
+        negation n; returns the (m, n) carried into the next words.
+        """
+        rows = [self.words.get(w) for w in words]
+        hits = [row for row in rows if row is not None]
+        # One gather from the table for every lexicon word in the text
+        scores = iter(self._scores[hits].tolist() if hits else ())
+        for w, row in zip(words, rows):
+            if row is not None:
+                p, s, i, flags = next(scores)
+                if m is None:
+                    a.append([p, s, i, 1])
+                else:
+                    last = a[-1]
+                    last[0] = max(-1.0, min(p * last[2], +1.0))
+                    last[1] = max(-1.0, min(s * last[2], +1.0))
+                    last[2] = i
+                if n is not None:
+                    a[-1][2] = 1.0 / a[-1][2]
+                    a[-1][3] = -1
+                m = None
+                n = None
+                if flags & FLAG_MODIFIER:
+                    m = w
+                if w in NEGATIONS:
+                    n = w
+            else:
+                if w in NEGATIONS:
+                    n = w
+                elif n and len(w.strip("'")) > 1:
+                    n = None
+                if n is not None and m is not None and m.endswith("ly"):
+                    a[-1][3] = -1
+                    n = None
+                elif m and len(w) > 2:
+                    m = None
+                if w == "!" and a:
+                    a[-1][0] = max(-1.0, min(a[-1][0] * 1.25, +1.0))
+                if w == "(!)":
+                    a.append([0.0, 1.0, 1.0, 1])
+                if len(w) <= 5 and not w.isalpha() and w not in PUNCTUATION:
+                    polarity = _EMOTICON_POLARITY.get(w)
+                    if polarity is not None:
+                        a.append([polarity, 1.0, 1.0, 1])
+        return m, n
+
+    def sentiment(self, text: str) -> Tuple[float, float]:
+        """Return (polarity, subjectivity) for text."""
+        a = self.assessments(tokenize(text))
+        if not a:
+            return 0.0, 0.0
+        polarity = sum(p * -0.5 if negated < 0 else p for p, _, _, negated in a)
+        subjectivity = sum(s for _, s, _, _ in a)
+        return polarity / len(a), subjectivity / len(a)
+
+    def polarity(self, text: str) -> float:
+        """Return polarity in [-1.0, 1.0]."""
+        return self.sentiment(text)[0]
+
+    def subjectivity(self, text: str) -> float:
+        """Return subjectivity in [0.0, 1.0]."""
+        return self.sentiment(text)[1]
+
+
+# A sentence ending followed by whitespace and a letter: tokenizing the text
+# on either side separately gives the same tokens as tokenizing it whole
+_RE_BOUNDARY = re.compile(r"(\S*[.!?])\s+(?=[^\W\d_])")
+_BOUNDARY_END = ("...", ".", "!", "?")
+
+
+class _ScoreState:
+    """Running sums over finalized assessments plus the still-mutable last one."""
+
+    __slots__ = ('count', 'polarity_sum', 'subjectivity_sum', 'last', 'm', 'n')
+
+    def __init__(self):
+        self.count = 0
+        self.polarity_sum = 0.0
+        self.subjectivity_sum = 0.0
+        self.last = None  # later words can still modify the last assessment
+        self.m = None
+        self.n = None
+
+    def copy(self):
+        state = _ScoreState()
+        state.count = self.count
+        state.polarity_sum = self.polarity_sum
+        state.subjectivity_sum = self.subjectivity_sum
+        state.last = list(self.last) if self.last else None
+        state.m = self.m
+        state.n = self.n
+        return state
+
+    def advance(self, lexicon, words):
+        """Score words, folding every assessment but the newest into the sums."""
+        a = [self.last] if self.last else []
+        self.m, self.n = lexicon._assess(words, a, self.m, self.n)
+        for p, s, _, negated in a[:-1]:
+            self.count += 1
+            self.polarity_sum += p * -0.5 if negated < 0 else p
+            self.subjectivity_sum += s
+        self.last = a[-1] if a else None
+
+    def sentiment(self):
+        """Return (polarity, subjectivity) as if the text had been scored whole."""
+        count, polarity, subjectivity = self.count, self.polarity_sum, self.subjectivity_sum
+        if self.last:
+            p, s, _, negated = self.last
+            count += 1
+            polarity += p * -0.5 if negated < 0 else p
+            subjectivity += s
+        if not count:
+            return 0.0, 0.0
+        return polarity / count, subjectivity / count
+
+
+class IncrementalSentiment:
+    """
+    Sentiment of an evolving draft, rescoring only the text that changed.
+
+    Score state is checkpointed at sentence boundaries. An update rolls back
+    to the last checkpoint before the first changed character and rescores
+    from there, so typing at the end of a long draft costs O(delta) rather
+    than O(draft). Results equal SentimentLexicon.sentiment on the full text.
+    """
+
+    def __init__(self, lexicon: Optional[SentimentLexicon] = None):
+        self.lexicon = lexicon or get_lexicon()
+        self.text = ''
+        self.chars_rescored = 0
+        self._checkpoints = [(0, _ScoreState())]  # (text offset, state before it)
+        self._sentiment = (0.0, 0.0)
+
+    @property
+    def sentiment(self) -> Tuple[float, float]:
+        """(polarity, subjectivity) of the current draft."""
+        return self._sentiment
+
+    def append(self, delta: str) -> Tuple[float, float]:
+        """Add text to the end of the draft."""
+        return self.update(self.text + delta)
+
+    def update(self, text: str) -> Tuple[float, float]:
+        """Replace the draft, rescoring from the last unaffected checkpoint."""
+        changed_at = _common_prefix_length(self.text, text)
+        # A checkpoint at offset p also depends on text[p] starting a word
+        while len(self._checkpoints) > 1 and self._checkpoints[-1][0] >= changed_at:
+            self._checkpoints.pop()
+        start, state = self._checkpoints[-1]
+        state = state.copy()
+
+        segment_start = start
+        for match in _RE_BOUNDARY.finditer(text, start):
+            ending = _split_tokens(match.group(1))
+            if ending and ending[-1] in _BOUNDARY_END:
+                state.advance(self.lexicon, tokenize(text[segment_start:match.end()]))
+                segment_start = match.end()
+                self._checkpoints.append((segment_start, state.copy()))
+        state.advance(self.lexicon, tokenize(text[segment_start:]))
+
+        self.text = text
+        self.chars_rescored = len(text) - start
+        self._sentiment = state.sentiment()
+        return self._sentiment
+
+
+def _common_prefix_length(a, b):
+    """Length of the common prefix, found by bisection on C-level slice compares."""
+    low, high = 0, min(len(a), len(b))
+    if a[:high] == b[:high]:
+        return high
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def build_lexicon(path: Optional[str] = None) -> str:
+    """Compile TextBlob's English sentiment lexicon into a .npy artifact."""
+    from textblob.en import sentiment as pattern_sentiment
+
+    path = path or DEFAULT_LEXICON_PATH
+    pattern_sentiment.load()
+
+    rows = []
+    for word, senses in sorted(dict.items(pattern_sentiment)):
+        encoded = word.encode('utf-8')
+        if len(encoded) > LEXICON_DTYPE['word'].itemsize:
+            logger.warning(f"Skipping over-long lexicon entry: {word!r}")
+            continue
+        polarity, subjectivity, intensity = senses[None]
+        flags = FLAG_MODIFIER if 'RB' in senses else 0
+        rows.append((encoded, polarity, subjectivity, intensity, flags))
+
+    table = np.array(rows, dtype=LEXICON_DTYPE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, table)
+    os.replace(tmp_path, path)
+
+    logger.info(f"Built sentiment lexicon v{ARTIFACT_VERSION} with {len(table)} entries at {path}")
+    return path
+
+
+_default_lexicon = None
+_default_lock = threading.Lock()
+
+
+def get_lexicon() -> SentimentLexicon:
+    """Return the process-wide lexicon, loading it on first use."""
+    global _default_lexicon
+    if _default_lexicon is None:
+        with _default_lock:
+            if _default_lexicon is None:
+                _default_lexicon = SentimentLexicon.load()
+    return _default_lexicon
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) >= 2 and sys.argv[1] == 'build':
+        print(build_lexicon(sys.argv[2] if len(sys.argv) > 2 else None))
+    else:
+        print("Usage: python sentiment_lexicon.py build [output.npy]")
+        sys.exit(1)
@@ -8,11 +8,20 @@ import json
 import logging
 import os
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Iterator, Optional, Tuple
+from urllib.parse import urlencode
 import jwt
 
 logger = logging.getLogger(__name__)
 
+class ServiceRequestError(Exception):
+    """A request made while iterating pages failed."""
+    
+    def __init__(self, url: str, details: Dict):
+        super().__init__(f"Request to {url} failed: {details.get('error')}")
+        self.url = url
+        self.details = details
+
 class ServiceClient:
     """Base class for inter-service communication."""
     
@@ -53,7 +62,7 @@ class ServiceClient:
             else:
                 return False, {'error': f'Unsupported HTTP method: {method}'}
             
-            if response.status_code in [200, 201]:
+            if response.status_code in [200, 201, 202]:
                 return True, response.json()
             else:
                 return False, {'error': f'HTTP {response.status_code}', 'details': response.text}
@@ -112,6 +121,11 @@ class EmotionServiceClient(ServiceClient):
         data = {'text': text}
         return self._make_request('POST', f"{self.base_url}/api/emotion/detect", data)
     
+    def detect_emotions(self, texts: list) -> Tuple[bool, Dict]:
+        """Detect emotion for a batch of texts in one request."""
+        data = {'texts': texts}
+        return self._make_request('POST', f"{self.base_url}/api/emotion/detect/batch", data)
+    
     def get_emotion_stats(self) -> Tuple[bool, Dict]:
         """Get emotion detection statistics."""
         return self._make_request('GET', f"{self.base_url}/api/emotion/stats")
@@ -128,13 +142,44 @@ class ConversationServiceClient(ServiceClient):
         data = {'title': title or 'New Conversation'}
         return self._make_request('POST', f"{self.base_url}/api/conversations", data)
     
-    def get_conversations(self, user_id: int) -> Tuple[bool, Dict]:
-        """Get user's conversations."""
-        return self._make_request('GET', f"{self.base_url}/api/conversations")
+    def _page_url(self, path: str, limit: int = None, cursor: str = None) -> str:
+        params = {key: value for key, value in (('limit', limit), ('cursor', cursor)) if value}
+        return f"{self.base_url}{path}" + (f"?{urlencode(params)}" if params else '')
+    
+    def _iter_pages(self, path: str, items_key: str, page_size: int = None) -> Iterator[Dict]:
+        """Yield items page by page, fetching the next page only when needed."""
+        cursor = None
+        while True:
+            url = self._page_url(path, page_size, cursor)
+            success, data = self._make_request('GET', url)
+            if not success:
+                raise ServiceRequestError(url, data)
+            yield from data.get(items_key, [])
+            cursor = data.get('next_cursor')
+            if not cursor:
+                return
+    
+    def get_conversations(self, user_id: int, limit: int = None, cursor: str = None) -> Tuple[bool, Dict]:
+        """Get a page of the user's conversations; pass next_cursor as cursor for the next one."""
+        return self._make_request('GET', self._page_url('/api/conversations', limit, cursor))
     
-    def get_messages(self, conversation_id: int) -> Tuple[bool, Dict]:
-        """Get messages for a conversation."""
-        return self._make_request('GET', f"{self.base_url}/api/conversations/{conversation_id}/messages")
+    def iter_conversations(self, user_id: int, page_size: int = None) -> Iterator[Dict]:
+        """Iterate over all the user's conversations, newest first, one page at a time."""
+        return self._iter_pages('/api/conversations', 'conversations', page_size)
+    
+    def get_messages(self, conversation_id: int, limit: int = None, cursor: str = None) -> Tuple[bool, Dict]:
+        """Get a page of a conversation's messages; pass next_cursor as cursor for the next one."""
+        return self._make_request(
+            'GET', self._page_url(f"/api/conversations/{conversation_id}/messages", limit, cursor)
+        )
+    
+    def iter_messages(self, conversation_id: int, page_size: int = None) -> Iterator[Dict]:
+        """
+        Iterate over a conversation's messages, oldest first, one page at a time.
+        
+        Raises ServiceRequestError if a page cannot be fetched.
+        """
+        return self._iter_pages(f"/api/conversations/{conversation_id}/messages", 'messages', page_size)
     
     def send_message(self, conversation_id: int, message: str) -> Tuple[bool, Dict]:
         """Send a message to a conversation."""
@@ -176,6 +221,30 @@ class AIServiceClient(ServiceClient):
     def get_suggestions(self) -> Tuple[bool, Dict]:
         """Get conversation starter suggestions."""
         return self._make_request('GET', f"{self.base_url}/api/ai/suggestions")
+    
+    def submit_job(self, message: str, emotion: str = None, confidence: float = None, context: str = 'general',
+                   user_id: int = None, reply_to: str = None, correlation_id: str = None) -> Tuple[bool, Dict]:
+        """Queue an AI generation job; the response carries its job_id and the correlation_id."""
+        data = {
+            'message': message,
+            'context': context
+        }
+        if emotion:
+            data['emotion'] = emotion
+        if confidence:
+            data['confidence'] = confidence
+        if user_id is not None:
+            data['user_id'] = user_id
+        if reply_to:
+            data['reply_to'] = reply_to
+        if correlation_id:
+            data['correlation_id'] = correlation_id
+        
+        return self._make_request('POST', f"{self.base_url}/api/ai/jobs", data)
+    
+    def get_job(self, job_id: str) -> Tuple[bool, Dict]:
+        """Get an AI generation job's status and, once done, its result."""
+        return self._make_request('GET', f"{self.base_url}/api/ai/jobs/{job_id}")
 
 class WebSocketServiceClient(ServiceClient):
     """Client for WebSocket Service communication."""
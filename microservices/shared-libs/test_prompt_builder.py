@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared prompt builder
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the current directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from prompt_builder import TRUNCATION_MARKER, PromptBuilder, PromptTemplate, estimate_tokens, truncate_middle
+
+TEMPLATE = "Context: {context}\n{history}User message:\n{message}\nPlease respond."
+HISTORY_TEMPLATE = "Previous conversation:\n{turns}\n\n"
+TURN_TEMPLATE = "{sender}: {content}"
+
+
+def make_builder(token_budget=200, **kwargs):
+    return PromptBuilder(
+        PromptTemplate('test', 1, TEMPLATE),
+        token_budget,
+        turn_template=PromptTemplate('turn', 1, TURN_TEMPLATE),
+        history_template=PromptTemplate('history', 1, HISTORY_TEMPLATE),
+        **kwargs
+    )
+
+
+def make_history(count, words=5):
+    return [{'sender': 'user', 'content': f"turn{index} " + 'word ' * words} for index in range(count)]
+
+
+class TestEstimateTokens:
+    """Test the local token estimate."""
+
+    def test_empty_text(self):
+        """Empty text costs nothing."""
+        assert estimate_tokens('') == 0
+        assert estimate_tokens(None) == 0
+
+    def test_counts_words_and_punctuation(self):
+        """Short words and punctuation marks count one token each."""
+        assert estimate_tokens('I am so happy!') == 5
+
+    def test_long_words_count_by_length(self):
+        """Long words are counted at about four characters per token."""
+        assert estimate_tokens('a' * 40) == 10
+
+
+class TestTruncateMiddle:
+    """Test cutting the middle out of overlong text."""
+
+    def test_short_text_unchanged(self):
+        """Text within the limit is returned as is."""
+        assert truncate_middle('I am fine', 10) == ('I am fine', False)
+
+    def test_keeps_head_and_tail(self):
+        """The opening and the conclusion survive, joined by the marker."""
+        text = 'opening ' + 'filler ' * 200 + 'conclusion'
+        truncated, was_truncated = truncate_middle(text, 30)
+        assert was_truncated
+        assert truncated.startswith('opening')
+        assert truncated.endswith('conclusion')
+        assert TRUNCATION_MARKER in truncated
+        assert estimate_tokens(truncated) <= 30
+
+    def test_tiny_limit_leaves_marker(self):
+        """With no room for any text only the marker is left."""
+        assert truncate_middle('word ' * 100, 1) == (TRUNCATION_MARKER.strip(), True)
+
+
+class TestPromptTemplate:
+    """Test template compilation and rendering."""
+
+    def test_fields_and_static_tokens(self):
+        """Fields are found and the literal text is costed once."""
+        template = PromptTemplate('turn', 2, TURN_TEMPLATE)
+        assert template.fields == {'sender', 'content'}
+        assert template.static_tokens == estimate_tokens(': ')
+        assert template.key == 'turn:v2'
+
+    def test_render_applies_format_spec(self):
+        """Format specs are applied to field values."""
+        template = PromptTemplate('emotion', 1, 'confidence: {confidence:.2f}')
+        assert template.render(confidence=0.8) == 'confidence: 0.80'
+
+    def test_conversions_rejected(self):
+        """!r and !s conversions are not supported."""
+        with pytest.raises(ValueError):
+            PromptTemplate('bad', 1, 'Hello {name!r}')
+
+
+class TestPromptBuilder:
+    """Test fitting prompts into the token budget."""
+
+    def test_short_prompt_kept_whole(self):
+        """A prompt within the budget keeps every turn untruncated."""
+        prompt = make_builder().build('I am sad', make_history(2), context='support')
+        assert prompt.turns == 2
+        assert prompt.dropped_turns == 0
+        assert not prompt.truncated
+        assert 'turn0' in prompt.text and 'turn1' in prompt.text
+        assert prompt.tokens == estimate_tokens(prompt.text)
+
+    def test_stays_within_budget(self):
+        """Long messages and history are trimmed to the budget."""
+        builder = make_builder(token_budget=150)
+        prompt = builder.build('help ' * 500, make_history(20, words=50), context='support')
+        assert prompt.tokens <= builder.token_budget
+        assert prompt.truncated
+
+    def test_oldest_turns_dropped_first(self):
+        """Once the budget runs out the oldest turns go and the newest stay."""
+        prompt = make_builder(token_budget=100).build('I am sad', make_history(10), context='support')
+        assert 0 < prompt.turns < 10
+        assert prompt.dropped_turns == 10 - prompt.turns
+        assert 'turn9' in prompt.text
+        assert 'turn0' not in prompt.text
+
+    def test_max_turns(self):
+        """Only the last max_turns turns are considered."""
+        prompt = make_builder(max_turns=3).build('I am sad', make_history(6), context='support')
+        assert prompt.turns == 3
+        assert 'turn2' not in prompt.text and 'turn5' in prompt.text
+
+    def test_max_message_share_leaves_room_for_history(self):
+        """With history, a long message is cut to max_message_share of the budget."""
+        builder = make_builder(token_budget=200, max_message_share=0.5)
+        message = 'help ' * 500
+        available = builder.token_budget - builder.template.static_tokens - estimate_tokens('support')
+        available -= builder.history_template.static_tokens
+        prompt = builder.build(message, make_history(3), context='support')
+        kept_message = prompt.text.split('User message:\n')[1].split('\nPlease respond.')[0]
+        assert estimate_tokens(kept_message) <= available * 0.5
+        assert prompt.turns == 3
+
+    def test_message_uses_whole_budget_without_history(self):
+        """Without history the message may use the whole remaining budget."""
+        builder = make_builder(token_budget=200, max_message_share=0.5)
+        prompt = builder.build('help ' * 500, context='support')
+        kept_message = prompt.text.split('User message:\n')[1].split('\nPlease respond.')[0]
+        assert estimate_tokens(kept_message) > builder.token_budget * 0.5
+        assert prompt.tokens <= builder.token_budget
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared upstream client
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Add the current directory to the path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from upstream_client import (CLOSED, HALF_OPEN, OPEN, AsyncUpstreamClient, CircuitBreaker,
+                             LatencyTracker, UpstreamRejected)
+
+
+def make_breaker(**overrides):
+    settings = {
+        'failure_rate_threshold': 0.5,
+        'slow_call_seconds': 1.0,
+        'slow_rate_threshold': 0.5,
+        'window': 4,
+        'min_calls': 4,
+        'open_seconds': 0.05
+    }
+    settings.update(overrides)
+    return CircuitBreaker(**settings)
+
+
+def trip(breaker):
+    """Record enough failures to open the breaker."""
+    for _ in range(breaker.min_calls):
+        breaker.record(False, 0.01)
+
+
+class TestCircuitBreaker:
+    """Test the breaker's closed, open and half-open transitions."""
+
+    def test_starts_closed(self):
+        """A new breaker lets calls through."""
+        breaker = make_breaker()
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_needs_min_calls_before_opening(self):
+        """Failures below min_calls do not open the breaker."""
+        breaker = make_breaker()
+        for _ in range(breaker.min_calls - 1):
+            breaker.record(False, 0.01)
+        assert breaker.state == CLOSED
+
+    def test_opens_on_failure_rate(self):
+        """The breaker opens once the failure rate reaches its threshold."""
+        breaker = make_breaker()
+        breaker.record(True, 0.01)
+        breaker.record(True, 0.01)
+        breaker.record(False, 0.01)
+        breaker.record(False, 0.01)
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.opened_count == 1
+
+    def test_opens_on_slow_call_rate(self):
+        """Successful but slow calls open the breaker too."""
+        breaker = make_breaker()
+        for _ in range(breaker.min_calls):
+            breaker.record(True, 2.0)
+        assert breaker.state == OPEN
+
+    def test_stays_closed_below_thresholds(self):
+        """Occasional failures under the threshold keep it closed."""
+        breaker = make_breaker(window=10, min_calls=10)
+        for index in range(10):
+            breaker.record(index != 0, 0.01)
+        assert breaker.state == CLOSED
+
+    def test_half_open_after_open_seconds(self):
+        """After open_seconds the breaker lets exactly one probe through."""
+        breaker = make_breaker()
+        trip(breaker)
+        time.sleep(breaker.open_seconds)
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+
+    def test_probe_success_closes(self):
+        """A fast successful probe closes the breaker."""
+        breaker = make_breaker()
+        trip(breaker)
+        time.sleep(breaker.open_seconds)
+        assert breaker.allow()
+        breaker.record(True, 0.01)
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_probe_failure_reopens(self):
+        """A failed probe opens the breaker again."""
+        breaker = make_breaker()
+        trip(breaker)
+        time.sleep(breaker.open_seconds)
+        assert breaker.allow()
+        breaker.record(False, 0.01)
+        assert breaker.state == OPEN
+        assert breaker.opened_count == 2
+
+    def test_slow_probe_reopens(self):
+        """A probe slower than slow_call_seconds counts as a failure."""
+        breaker = make_breaker()
+        trip(breaker)
+        time.sleep(breaker.open_seconds)
+        assert breaker.allow()
+        breaker.record(True, 2.0)
+        assert breaker.state == OPEN
+
+    def test_released_probe_can_be_claimed_again(self):
+        """A probe given back without running lets the next call probe."""
+        breaker = make_breaker()
+        trip(breaker)
+        time.sleep(breaker.open_seconds)
+        assert breaker.allow()
+        breaker.release()
+        assert breaker.allow()
+
+
+class TestUpstreamClientBreaker:
+    """Test that the client records outcomes and rejects calls while open."""
+
+    def test_rejects_while_open(self):
+        """Calls are not attempted while the breaker is open."""
+        client = AsyncUpstreamClient('test', breaker=make_breaker(open_seconds=60))
+        trip(client.breaker)
+        attempted = []
+
+        async def call():
+            attempted.append(1)
+
+        with pytest.raises(UpstreamRejected) as excinfo:
+            client.call(call)
+        assert excinfo.value.reason == 'circuit_open'
+        assert client.rejected['circuit_open'] == 1
+        assert attempted == []
+
+    def test_failures_open_the_breaker(self):
+        """Failed calls through the client open its breaker."""
+        client = AsyncUpstreamClient('test', breaker=make_breaker(open_seconds=60))
+
+        async def failing_call():
+            raise RuntimeError('upstream error')
+
+        for _ in range(client.breaker.min_calls):
+            with pytest.raises(RuntimeError):
+                client.call(failing_call)
+        assert client.breaker.state == OPEN
+
+    def test_timeouts_count_as_failures(self):
+        """Calls past their timeout are recorded as failed."""
+        client = AsyncUpstreamClient('test', breaker=make_breaker(open_seconds=60))
+
+        async def hanging_call():
+            await asyncio.sleep(1)
+
+        for _ in range(client.breaker.min_calls):
+            with pytest.raises(asyncio.TimeoutError):
+                client.call(hanging_call, timeout=0.01)
+        assert client.breaker.state == OPEN
+
+
+def run_hedge(endpoints, attempt, tracker):
+    """Run AsyncUpstreamClient.hedge on a fresh event loop; returns (result, client)."""
+    client = AsyncUpstreamClient('test')
+    result = asyncio.run(client.hedge(endpoints, attempt, tracker))
+    return result, client
+
+
+class TestHedging:
+    """Test hedged calls across equivalent endpoints."""
+
+    def test_fast_first_attempt_not_hedged(self):
+        """An attempt answering within its hedge delay is the only one."""
+        tracker = LatencyTracker(default_delay=0.2)
+        started = []
+
+        async def attempt(endpoint):
+            started.append(endpoint)
+            return endpoint
+
+        result, client = run_hedge(['a', 'b'], attempt, tracker)
+        assert result == 'a'
+        assert started == ['a']
+        assert client.hedges == {'launched': 0, 'won': 0}
+
+    def test_hedge_fires_after_delay(self):
+        """A second endpoint is tried once the first outlives its hedge delay."""
+        tracker = LatencyTracker(default_delay=0.05)
+        started = {}
+
+        async def attempt(endpoint):
+            started[endpoint] = time.monotonic()
+            await asyncio.sleep(1 if endpoint == 'slow' else 0.01)
+            return endpoint
+
+        result, client = run_hedge(['slow', 'fast'], attempt, tracker)
+        assert result == 'fast'
+        assert started['fast'] - started['slow'] >= 0.04
+        assert client.hedges == {'launched': 1, 'won': 1}
+
+    def test_loser_cancelled(self):
+        """The slower attempt is cancelled once the hedge wins."""
+        tracker = LatencyTracker(default_delay=0.02)
+        cancelled = []
+
+        async def attempt(endpoint):
+            try:
+                await asyncio.sleep(1 if endpoint == 'slow' else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(endpoint)
+                raise
+            return endpoint
+
+        started = time.monotonic()
+        result, _client = run_hedge(['slow', 'fast'], attempt, tracker)
+        assert result == 'fast'
+        assert cancelled == ['slow']
+        assert time.monotonic() - started < 0.5
+
+    def test_failure_hedges_immediately(self):
+        """A failed attempt moves on to the next endpoint without waiting."""
+        tracker = LatencyTracker(default_delay=5)
+
+        async def attempt(endpoint):
+            if endpoint == 'broken':
+                raise RuntimeError('HTTP 500')
+            return endpoint
+
+        started = time.monotonic()
+        result, _client = run_hedge(['broken', 'healthy'], attempt, tracker)
+        assert result == 'healthy'
+        assert time.monotonic() - started < 1
+
+    def test_all_failing_raises_last_error(self):
+        """When every endpoint fails, the last error is raised."""
+        tracker = LatencyTracker(default_delay=0.01)
+
+        async def attempt(endpoint):
+            raise RuntimeError(endpoint)
+
+        with pytest.raises(RuntimeError, match='b'):
+            run_hedge(['a', 'b'], attempt, tracker)
+
+    def test_hedge_delay_follows_latency_quantile(self):
+        """With enough samples the delay is the endpoint's latency quantile."""
+        tracker = LatencyTracker(quantile=0.9, min_samples=10, min_delay=0.0)
+        for index in range(1, 11):
+            tracker.record('a', index / 10, True)
+        assert tracker.delay('a') == 1.0
+        assert tracker.delay('unmeasured') == tracker.default_delay
+
+    def test_failed_endpoint_ordered_last(self):
+        """Recently failed endpoints are tried after healthy ones."""
+        tracker = LatencyTracker()
+        tracker.record('a', 0.5, False)
+        assert tracker.order(['a', 'b']) == ['b', 'a']
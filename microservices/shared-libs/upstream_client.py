@@ -0,0 +1,416 @@
+"""
+Shared Upstream Client Library
+Runs calls to slow third-party APIs (e.g. Gemini) on a shared asyncio event
+loop instead of on request threads, behind a bulkhead (bounded concurrency
+with a bounded, time-limited wait queue) and a circuit breaker that opens
+when the recent error rate or slow-call rate crosses a threshold.
+
+Callers get an UpstreamRejected exception instead of waiting whenever the
+call would not be attempted, so they can serve a fallback immediately.
+Calls that can go to several equivalent endpoints can be hedged: a second
+request starts once the first has run longer than its endpoint usually
+takes, and the first success wins.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# aiohttp is optional; without it HTTP calls run in the loop's thread pool
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states (exported as gauge values)
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class UpstreamRejected(Exception):
+    """The call was not attempted; reason is 'circuit_open', 'bulkhead_full' or 'queue_timeout'."""
+
+    def __init__(self, reason: str, message: str = None):
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+class UpstreamHTTPError(Exception):
+    """The upstream answered with a non-2xx status."""
+
+    def __init__(self, status: int, body: str = ''):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+
+
+class CircuitBreaker:
+    """
+    Count-based circuit breaker over the last window calls.
+
+    Opens when at least min_calls were recorded and the failure rate or the
+    share of calls slower than slow_call_seconds reaches its threshold.
+    After open_seconds one probe call is let through (half-open); its
+    outcome closes the breaker or opens it again.
+    """
+
+    def __init__(self, failure_rate_threshold: float = 0.5, slow_call_seconds: float = 5.0,
+                 slow_rate_threshold: float = 0.5, window: int = 20, min_calls: int = 10,
+                 open_seconds: float = 30.0):
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self._calls = deque(maxlen=window)  # (failed, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        self.opened_count = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._check_half_open()
+            return self._state
+
+    def _check_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now (claims the probe when half-open)."""
+        with self._lock:
+            self._check_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self):
+        """Give back a probe claimed by allow() for a call that never ran."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, success: bool, duration: float):
+        """Record the outcome of an attempted call."""
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+                if success and not slow:
+                    self._state = CLOSED
+                    self._calls.clear()
+                else:
+                    self._open()
+                return
+
+            self._calls.append((not success, slow))
+            if self._state == CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(failed for failed, _slow in self._calls) / len(self._calls)
+                slow_calls = sum(slow for _failed, slow in self._calls) / len(self._calls)
+                if failures >= self.failure_rate_threshold or slow_calls >= self.slow_rate_threshold:
+                    self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self.opened_count += 1
+        logger.warning(f"Circuit breaker opened for {self.open_seconds}s")
+
+
+class LatencyTracker:
+    """
+    Recent latencies per endpoint, used to order endpoints and to time hedges.
+
+    An endpoint's hedge delay is the given quantile of its last window
+    latencies (clamped to min_delay..max_delay), or default_delay until
+    min_samples are recorded. Endpoints that failed within the last
+    failure_cooldown seconds go last; the rest are ordered by median
+    latency, with unmeasured endpoints after measured ones.
+    """
+
+    def __init__(self, window: int = 100, quantile: float = 0.95, default_delay: float = 2.0,
+                 min_delay: float = 0.05, max_delay: float = 5.0, min_samples: int = 10,
+                 failure_cooldown: float = 30.0):
+        self.window = window
+        self.quantile = quantile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.failure_cooldown = failure_cooldown
+        self._latencies = {}
+        self._failed_at = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, success: Optional[bool]):
+        """
+        Record a finished call. success=None marks a call cancelled after
+        seconds, which still tells us the endpoint takes at least that long.
+        """
+        with self._lock:
+            if success is False:
+                self._failed_at[endpoint] = time.monotonic()
+                return
+            if success:
+                self._failed_at.pop(endpoint, None)
+            self._latencies.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+
+    def _quantile(self, endpoint, q):
+        samples = sorted(self._latencies.get(endpoint, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(int(len(samples) * q), len(samples) - 1)]
+
+    def delay(self, endpoint: str) -> float:
+        """How long to wait on endpoint before hedging to the next one."""
+        with self._lock:
+            value = self._quantile(endpoint, self.quantile)
+        if value is None:
+            return self.default_delay
+        return min(max(value, self.min_delay), self.max_delay)
+
+    def order(self, endpoints: List[str]) -> List[str]:
+        """Endpoints, preferred first."""
+        now = time.monotonic()
+        with self._lock:
+            def rank(item):
+                index, endpoint = item
+                failed = now - self._failed_at.get(endpoint, -self.failure_cooldown) < self.failure_cooldown
+                median = self._quantile(endpoint, 0.5)
+                return (failed, median is None, median or 0.0, index)
+            return [endpoint for _index, endpoint in sorted(enumerate(endpoints), key=rank)]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Per-endpoint median and hedge delay, for status endpoints and logs."""
+        return {
+            endpoint: {'samples': len(samples), 'p50': self._quantile(endpoint, 0.5), 'hedge_delay': self.delay(endpoint)}
+            for endpoint, samples in list(self._latencies.items())
+        }
+
+
+class AsyncUpstreamClient:
+    """
+    Guards calls to one upstream with a bulkhead and a circuit breaker.
+
+    Coroutines run on a private event loop thread, so at most max_concurrent
+    calls are in flight however many request threads are waiting. Callers
+    beyond that wait up to queue_timeout seconds in a queue of at most
+    max_waiting callers, and are rejected otherwise.
+    """
+
+    def __init__(self, name: str, max_concurrent: int = 8, max_waiting: int = 32,
+                 queue_timeout: float = 1.0, request_timeout: float = 10.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.waiting = 0
+        self.active = 0
+        self.rejected = {'circuit_open': 0, 'bulkhead_full': 0, 'queue_timeout': 0}
+        self.hedges = {'launched': 0, 'won': 0}
+        self._loop = None
+        self._semaphore = None
+        self._session = None
+        self._start_lock = threading.Lock()
+
+        # Keep-alive pool for the requests fallback; hedging can put several
+        # requests in flight per slot
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, max_concurrent * 3))
+        self._http.mount('http://', adapter)
+        self._http.mount('https://', adapter)
+
+    def _ensure_loop(self):
+        if self._loop:
+            return self._loop
+        with self._start_lock:
+            if not self._loop:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    self._semaphore = asyncio.Semaphore(self.max_concurrent)
+                    ready.set()
+                    loop.run_forever()
+
+                threading.Thread(target=run, name=f"{self.name}-upstream", daemon=True).start()
+                ready.wait()
+                self._loop = loop
+        return self._loop
+
+    def call(self, coroutine_factory: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """
+        Run coroutine_factory() on the upstream loop and return its result.
+
+        Blocks the calling thread for at most queue_timeout + timeout
+        (default request_timeout) seconds. Raises UpstreamRejected if the
+        call was not attempted, or the call's own exception.
+        """
+        timeout = timeout or self.request_timeout
+        future = asyncio.run_coroutine_threadsafe(
+            self._guarded(coroutine_factory, timeout), self._ensure_loop()
+        )
+        return future.result()
+
+    async def _guarded(self, coroutine_factory, timeout):
+        if self.waiting >= self.max_waiting:
+            self.rejected['bulkhead_full'] += 1
+            raise UpstreamRejected('bulkhead_full', f"{self.name}: {self.waiting} calls already waiting")
+        if not self.breaker.allow():
+            self.rejected['circuit_open'] += 1
+            raise UpstreamRejected('circuit_open', f"{self.name}: circuit breaker is open")
+
+        if self._semaphore.locked():
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.breaker.release()
+                self.rejected['queue_timeout'] += 1
+                raise UpstreamRejected('queue_timeout', f"{self.name}: no free slot within {self.queue_timeout}s")
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.active += 1
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(coroutine_factory(), timeout)
+        except Exception:
+            self.breaker.record(False, time.monotonic() - started)
+            raise
+        else:
+            self.breaker.record(True, time.monotonic() - started)
+            return result
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    async def hedge(self, endpoints: List[str], attempt: Callable[[str], Awaitable[Any]],
+                    tracker: LatencyTracker) -> Any:
+        """
+        Return the first successful attempt(endpoint) across endpoints.
+
+        The tracker's preferred endpoint goes first. The next endpoint is
+        tried once the latest attempt outlives its hedge delay, or as soon
+        as an attempt fails; the remaining attempts are cancelled when one
+        succeeds. Raises the last error if every endpoint fails.
+        """
+        loop = asyncio.get_running_loop()
+        remaining = tracker.order(endpoints)
+        pending = {}  # task -> (endpoint, started, hedged)
+        last_error = None
+
+        def launch(hedged):
+            endpoint = remaining.pop(0)
+            self.hedges['launched'] += hedged
+            pending[asyncio.ensure_future(attempt(endpoint))] = (endpoint, loop.time(), hedged)
+            return endpoint
+
+        latest = launch(False)
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=tracker.delay(latest) if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    endpoint, started, hedged = pending.pop(task)
+                    if task.exception() is None:
+                        tracker.record(endpoint, loop.time() - started, True)
+                        self.hedges['won'] += hedged
+                        return task.result()
+                    tracker.record(endpoint, loop.time() - started, False)
+                    last_error = task.exception()
+                if remaining:
+                    # The hedge delay passed or an attempt failed
+                    latest = launch(True)
+            raise last_error
+        finally:
+            for task, (endpoint, started, _hedged) in pending.items():
+                task.cancel()
+                tracker.record(endpoint, loop.time() - started, None)
+
+    async def post_json(self, url: str, payload: Dict, headers: Optional[Dict] = None) -> Dict:
+        """POST JSON over a pooled keep-alive session; raises UpstreamHTTPError on non-2xx."""
+        headers = {'Content-Type': 'application/json', **(headers or {})}
+        if AIOHTTP_AVAILABLE:
+            if self._session is None:
+                self._session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=max(10, self.max_concurrent * 3), keepalive_timeout=30)
+                )
+            async with self._session.post(url, json=payload, headers=headers) as response:
+                if response.status >= 300:
+                    raise UpstreamHTTPError(response.status, await response.text())
+                return await response.json()
+
+        # Blocking fallback, still bounded by the bulkhead
+        response = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self._http.post(url, json=payload, headers=headers, timeout=self.request_timeout)
+        )
+        if response.status_code >= 300:
+            raise UpstreamHTTPError(response.status_code, response.text)
+        return response.json()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_upstream_client(name: str, **kwargs) -> AsyncUpstreamClient:
+    """
+    Process-wide client for an upstream, created on first use.
+
+    Settings default to the <NAME>_MAX_CONCURRENT, <NAME>_MAX_WAITING,
+    <NAME>_QUEUE_TIMEOUT, <NAME>_REQUEST_TIMEOUT, <NAME>_BREAKER_FAILURE_RATE,
+    <NAME>_BREAKER_SLOW_SECONDS, <NAME>_BREAKER_SLOW_RATE and
+    <NAME>_BREAKER_OPEN_SECONDS environment variables.
+    """
+    with _clients_lock:
+        if name not in _clients:
+            prefix = name.upper().replace('-', '_')
+
+            def env(key, default):
+                return type(default)(os.environ.get(f"{prefix}_{key}", default))
+
+            breaker = CircuitBreaker(
+                failure_rate_threshold=env('BREAKER_FAILURE_RATE', 0.5),
+                slow_call_seconds=env('BREAKER_SLOW_SECONDS', 5.0),
+                slow_rate_threshold=env('BREAKER_SLOW_RATE', 0.5),
+                open_seconds=env('BREAKER_OPEN_SECONDS', 30.0)
+            )
+            settings = {
+                'max_concurrent': env('MAX_CONCURRENT', 8),
+                'max_waiting': env('MAX_WAITING', 32),
+                'queue_timeout': env('QUEUE_TIMEOUT', 1.0),
+                'request_timeout': env('REQUEST_TIMEOUT', 10.0),
+                'breaker': breaker,
+                **kwargs
+            }
+            _clients[name] = AsyncUpstreamClient(name, **settings)
+        return _clients[name]
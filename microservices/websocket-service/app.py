@@ -9,8 +9,10 @@ import logging
 import os
 import requests
 import json
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from prometheus_flask_exporter import PrometheusMetrics
+from prometheus_client import Histogram
 import redis
 import sys
 from flask_cors import CORS
@@ -51,6 +53,16 @@ EMOTION_SERVICE_URL = os.environ.get('EMOTION_SERVICE_URL', 'http://emotion-serv
 AI_SERVICE_URL = os.environ.get('AI_SERVICE_URL', 'http://ai-service:8005')
 SERVICE_SECRET = os.environ.get('SERVICE_SECRET', 'default-service-secret')
 
+# Relay AI responses token by token (bot_response_chunk) before the final bot_response
+AI_STREAM_RESPONSES = os.environ.get('AI_STREAM_RESPONSES', 'true').lower() == 'true'
+AI_STREAM_READ_TIMEOUT = float(os.environ.get('AI_STREAM_READ_TIMEOUT', 30))
+
+time_to_first_token = Histogram(
+    'websocket_time_to_first_token_seconds',
+    'Time from receiving a message to emitting the first bot response chunk',
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 20.0)
+)
+
 # Redis setup for session management and caching
 try:
     redis_client = redis.Redis(
@@ -79,6 +91,16 @@ else:
 # Active connections tracking
 active_connections = {}
 
+def service_token():
+    """Short-lived service-to-service token vouching for the user_id this service passes along."""
+    import jwt
+    now = datetime.utcnow()
+    return jwt.encode(
+        {'service': 'websocket-service', 'iat': now, 'exp': now + timedelta(minutes=5)},
+        SERVICE_SECRET,
+        algorithm='HS256'
+    )
+
 def verify_user_token(token):
     """Verify user JWT token with Auth Service."""
     try:
@@ -116,24 +138,31 @@ def analyze_emotion(text):
         logger.error(f"Emotion service communication error: {e}")
         return None
 
+def build_ai_payload(message, emotion_data=None, user_id=None):
+    """Request body for the AI Service generate endpoints."""
+    payload = {
+        'message': message,
+        'context': 'realtime'
+    }
+    if user_id is not None:
+        # Lets the AI Service queue each user's requests fairly
+        payload['user_id'] = user_id
+    if emotion_data:
+        payload['emotion'] = emotion_data.get('emotion')
+        payload['confidence'] = emotion_data.get('confidence')
+    return payload
+
 def generate_ai_response(message, emotion_data=None, user_id=None):
     """Generate AI response using AI Service."""
     try:
-        payload = {
-            'message': message,
-            'context': 'realtime'
-        }
-        if emotion_data:
-            payload['emotion'] = emotion_data.get('emotion')
-            payload['confidence'] = emotion_data.get('confidence')
-        
         response = requests.post(
             f"{AI_SERVICE_URL}/api/ai/generate",
             headers={
                 'Content-Type': 'application/json',
+                'Authorization': f'Bearer {service_token()}',
                 'X-Service-Name': 'websocket-service'
             },
-            json=payload,
+            json=build_ai_payload(message, emotion_data, user_id),
             timeout=10
         )
         if response.status_code == 200:
@@ -143,6 +172,53 @@ def generate_ai_response(message, emotion_data=None, user_id=None):
         logger.error(f"AI service communication error: {e}")
         return None
 
+def stream_ai_response(message, emotion_data=None, user_id=None):
+    """
+    Stream an AI response from the AI Service.
+    
+    Yields the service's NDJSON events ({'type': 'chunk', 'text': ...} then
+    {'type': 'done', 'response': ...}); yields nothing if the service
+    cannot be reached.
+    """
+    try:
+        response = requests.post(
+            f"{AI_SERVICE_URL}/api/ai/generate/stream",
+            headers={
+                'Content-Type': 'application/json',
+                'Authorization': f'Bearer {service_token()}',
+                'X-Service-Name': 'websocket-service'
+            },
+            json=build_ai_payload(message, emotion_data, user_id),
+            stream=True,
+            timeout=(5, AI_STREAM_READ_TIMEOUT)
+        )
+        with response:
+            if response.status_code != 200:
+                logger.warning(f"AI service streaming returned {response.status_code}")
+                return
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+    except Exception as e:
+        logger.error(f"AI service streaming error: {e}")
+
+def relay_ai_response(message, emotion_data, started, user_id=None):
+    """
+    Emit bot_response_chunk events as the AI Service streams a response.
+    
+    Returns the complete response text, or None if nothing was streamed.
+    """
+    chunks = []
+    for event in stream_ai_response(message, emotion_data, user_id):
+        if event.get('type') == 'chunk':
+            if not chunks:
+                time_to_first_token.observe(time.monotonic() - started)
+            emit('bot_response_chunk', {'text': event['text'], 'index': len(chunks)})
+            chunks.append(event['text'])
+        elif event.get('type') == 'done':
+            return event.get('response') or ''.join(chunks)
+    return ''.join(chunks) or None
+
 def store_message_in_cache(user_id, message_data):
     """Store message in Redis cache for persistence."""
     if not redis_client:
@@ -248,6 +324,7 @@ def handle_authentication(data):
 @socketio.on('send_message')
 def handle_message(data):
     """Handle incoming message from user."""
+    started = time.monotonic()
     try:
         # Check if user is authenticated
         if request.sid not in active_connections:
@@ -282,16 +359,20 @@ def handle_message(data):
             'status': 'processing'
         })
         
-        # Analyze emotion
+        # Analyze emotion and show it while the response is generated
         emotion_data = analyze_emotion(message)
+        emit('emotion_detected', {'emotion_analysis': emotion_data})
         
-        # Generate AI response
-        ai_response_data = generate_ai_response(message, emotion_data, user_id)
+        # Stream the AI response, falling back to a single blocking request
+        ai_response = relay_ai_response(message, emotion_data, started, user_id) if AI_STREAM_RESPONSES else None
         
-        if ai_response_data:
-            ai_response = ai_response_data.get('response', 'I apologize, but I am unable to respond at the moment.')
-        else:
-            ai_response = 'I apologize, but I am unable to respond at the moment.'
+        if ai_response is None:
+            ai_response_data = generate_ai_response(message, emotion_data, user_id)
+            
+            if ai_response_data:
+                ai_response = ai_response_data.get('response', 'I apologize, but I am unable to respond at the moment.')
+            else:
+                ai_response = 'I apologize, but I am unable to respond at the moment.'
         
         # Store AI response
         ai_message_data = {
@@ -304,7 +385,7 @@ def handle_message(data):
         
         store_message_in_cache(user_id, ai_message_data)
         
-        # Emit AI response to client
+        # Emit the complete AI response to client
         emit('bot_response', {
             'message': ai_message_data,
             'emotion_analysis': emotion_data
@@ -48,6 +48,8 @@ with patch('redis.Redis') as mock_redis, \
     
     # Now import the app
     from app import app, verify_user_token, analyze_emotion, generate_ai_response, store_message_in_cache
+    from app import stream_ai_response, relay_ai_response
+    import app as websocket_app
 
 
 @pytest.fixture
@@ -227,6 +229,7 @@ class TestAIResponseGeneration:
         assert 'emotion' in request_data
         assert 'confidence' in request_data
         assert request_data['emotion'] == 'happy'
+        assert request_data['user_id'] == 1
     
     @patch('requests.post')
     def test_generate_ai_response_failure(self, mock_post):
@@ -240,6 +243,62 @@ class TestAIResponseGeneration:
         assert result is None
 
 
+class TestAIResponseStreaming:
+    """Test relaying streamed AI responses."""
+    
+    @staticmethod
+    def stream_response(events):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.iter_lines.return_value = [json.dumps(event).encode() for event in events]
+        return mock_response
+    
+    @patch('requests.post')
+    def test_stream_ai_response_parses_events(self, mock_post):
+        """Test that NDJSON events are yielded in order from a streamed request."""
+        events = [{'type': 'chunk', 'text': 'Hi'}, {'type': 'done', 'response': 'Hi'}]
+        mock_post.return_value = self.stream_response(events)
+        
+        assert list(stream_ai_response('Hello', {'emotion': 'happy', 'confidence': 0.9})) == events
+        assert mock_post.call_args[1]['stream'] is True
+        assert mock_post.call_args[1]['json']['emotion'] == 'happy'
+        
+    @patch('requests.post')
+    def test_error_status_closes_response(self, mock_post):
+        """Test that a shed or failed stream yields nothing and releases its connection."""
+        mock_response = self.stream_response([{'type': 'done', 'response': 'unused'}])
+        mock_response.status_code = 429
+        mock_post.return_value = mock_response
+        
+        assert list(stream_ai_response('Hello')) == []
+        mock_response.__exit__.assert_called_once()
+        mock_response.iter_lines.assert_not_called()
+        
+    @patch.object(websocket_app, 'emit')
+    @patch('requests.post')
+    def test_relay_emits_chunks_and_returns_full_text(self, mock_post, mock_emit):
+        """Test that each chunk is emitted and the assembled response returned."""
+        mock_post.return_value = self.stream_response([
+            {'type': 'chunk', 'text': 'Hello '},
+            {'type': 'chunk', 'text': 'there'},
+            {'type': 'done', 'response': 'Hello there'}
+        ])
+        
+        assert relay_ai_response('Hi', None, 0) == 'Hello there'
+        assert [c[0][1] for c in mock_emit.call_args_list] == [
+            {'text': 'Hello ', 'index': 0}, {'text': 'there', 'index': 1}
+        ]
+        
+    @patch.object(websocket_app, 'emit')
+    @patch('requests.post')
+    def test_relay_returns_none_when_unreachable(self, mock_post, mock_emit):
+        """Test that a failed stream falls back to the blocking request."""
+        mock_post.side_effect = Exception("Connection refused")
+        
+        assert relay_ai_response('Hi', None, 0) is None
+        mock_emit.assert_not_called()
+
+
 class TestRedisOperations:
     """Test Redis caching operations."""
     
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark the monolith EmotionService batch API against its scalar path.
+Classification (emotion ranges and confidence) is timed on synthetic
+polarity/subjectivity rows, scalar _match_emotion/_calculate_confidence
+calls versus one classify_sentiments call, at 10k-1M rows. End-to-end
+detect_emotion versus detect_emotions is timed on text corpora, where
+sentiment scoring dominates. Every run checks that both paths return
+identical results.
+
+Usage:
+    python bench_emotion_batch.py
+    python bench_emotion_batch.py --rows 10000 --rows 1000000 --text-rows 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from emotion_service import EmotionService
+
+# Text corpus shared with the microservice emotion benchmarks
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'microservices', 'emotion-service'))
+from bench_emotion_pipeline import build_corpus
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+DEFAULT_TEXT_ROWS = [10_000]
+
+
+def build_sentiment_rows(size, emotions, seed=7):
+    """Random (polarity, subjectivity) rows with every range boundary mixed in."""
+    rng = np.random.default_rng(seed)
+    polarity = rng.uniform(-1.0, 1.0, size)
+    subjectivity = rng.uniform(0.0, 1.0, size)
+    # Lexicon scores are rounded averages, so exact boundary values are common
+    edges = sorted({value for ranges in emotions.values()
+                    for bounds in ranges.values() for value in bounds})
+    count = min(size // 4, len(edges) ** 2 * 10)
+    polarity[:count] = rng.choice(edges, count)
+    subjectivity[:count] = np.abs(rng.choice(edges, count))
+    return polarity.tolist(), subjectivity.tolist()
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def bench_classification(EmotionService, size):
+    """Time scalar versus vectorized classification of size rows."""
+    polarities, subjectivities = build_sentiment_rows(size, EmotionService.EMOTIONS)
+
+    def scalar(polarities, subjectivities):
+        emotions, confidences = [], []
+        for polarity, subjectivity in zip(polarities, subjectivities):
+            emotion = EmotionService._match_emotion(polarity, subjectivity)
+            emotions.append(emotion)
+            confidences.append(EmotionService._calculate_confidence(emotion, polarity, subjectivity))
+        return emotions, confidences
+
+    expected, scalar_seconds = timed(scalar, polarities, subjectivities)
+    actual, batch_seconds = timed(EmotionService.classify_sentiments, polarities, subjectivities)
+    return scalar_seconds, batch_seconds, actual == expected
+
+
+def bench_detection(EmotionService, size):
+    """Time detect_emotion per text versus detect_emotions on a corpus of size texts."""
+    corpus = build_corpus(size)
+    expected, scalar_seconds = timed(lambda texts: [EmotionService.detect_emotion(t) for t in texts], corpus)
+    actual, batch_seconds = timed(EmotionService.detect_emotions, corpus)
+    return scalar_seconds, batch_seconds, actual == expected
+
+
+def print_row(name, size, scalar_seconds, batch_seconds, identical):
+    print(f"{name:<16}{size:>10}{size / scalar_seconds:>16,.0f}{size / batch_seconds:>16,.0f}"
+          f"{scalar_seconds / batch_seconds:>10.1f}x{'' if identical else '  MISMATCH'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark monolith EmotionService.detect_emotions')
+    parser.add_argument('--rows', type=int, action='append', help='classification rows (repeatable)')
+    parser.add_argument('--text-rows', type=int, action='append', help='texts for end-to-end runs (repeatable)')
+    args = parser.parse_args(argv)
+
+    mismatches = 0
+
+    print(f"{'benchmark':<16}{'rows':>10}{'scalar rows/s':>16}{'batch rows/s':>16}{'speedup':>11}")
+    for size in args.rows or DEFAULT_ROWS:
+        scalar_seconds, batch_seconds, identical = bench_classification(EmotionService, size)
+        print_row('classify', size, scalar_seconds, batch_seconds, identical)
+        mismatches += not identical
+    for size in args.text_rows or DEFAULT_TEXT_ROWS:
+        scalar_seconds, batch_seconds, identical = bench_detection(EmotionService, size)
+        print_row('detect (texts)', size, scalar_seconds, batch_seconds, identical)
+        mismatches += not identical
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
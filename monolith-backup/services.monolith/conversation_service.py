@@ -103,4 +103,71 @@ class ConversationService:
             
         except Exception as e:
             logger.error(f"Error analyzing and saving conversation: {str(e)}")
-            return False, f"Error: {str(e)}", None 
\ No newline at end of file
+            return False, f"Error: {str(e)}", None 
+    
+    def reanalyze_emotions(self, user_id=None, batch_size=1000, rescore=False):
+        """
+        Re-run emotion detection over stored conversations in batches.
+        
+        By default the stored polarity and subjectivity are reclassified
+        (e.g. after the emotion ranges change); with rescore the user
+        messages are scored again from scratch.
+        
+        Args:
+            user_id (str): Only re-analyze this user's conversations
+            batch_size (int): Rows loaded and updated per batch
+            rescore (bool): Recompute sentiment from the message text
+            
+        Returns:
+            tuple: (success, message, number of conversations updated)
+        """
+        columns = [Conversation.id, Conversation.polarity, Conversation.subjectivity]
+        if rescore:
+            columns.append(Conversation.user_message)
+        
+        updated = 0
+        last_id = None
+        try:
+            while True:
+                query = db.session.query(*columns)
+                if user_id:
+                    query = query.filter(Conversation.user_id == user_id)
+                if last_id is not None:
+                    query = query.filter(Conversation.id > last_id)
+                rows = query.order_by(Conversation.id).limit(batch_size).all()
+                if not rows:
+                    break
+                
+                if rescore:
+                    mappings = [
+                        {
+                            'id': row.id,
+                            'detected_emotion': result['emotion'],
+                            'confidence': result['confidence'],
+                            'polarity': result.get('polarity', row.polarity),
+                            'subjectivity': result.get('subjectivity', row.subjectivity)
+                        }
+                        for row, result in zip(rows, EmotionService.detect_emotions(
+                            [row.user_message for row in rows]))
+                    ]
+                else:
+                    emotions, confidences = EmotionService.classify_sentiments(
+                        [row.polarity for row in rows], [row.subjectivity for row in rows]
+                    )
+                    mappings = [
+                        {'id': row.id, 'detected_emotion': emotion, 'confidence': confidence}
+                        for row, emotion, confidence in zip(rows, emotions, confidences)
+                    ]
+                
+                db.session.bulk_update_mappings(Conversation, mappings)
+                db.session.commit()
+                updated += len(rows)
+                last_id = rows[-1].id
+            
+            logger.info(f"Re-analyzed emotions for {updated} conversations")
+            return True, "Emotions re-analyzed", updated
+            
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error re-analyzing emotions: {str(e)}")
+            return False, f"Error re-analyzing emotions: {str(e)}", updated
@@ -1,8 +1,37 @@
 from textblob import TextBlob
+from collections import OrderedDict
+import numpy as np
 import logging
+import os
+import sys
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Compiled sentiment lexicon shared with the microservices; fall back to
+# TextBlob when it is not available alongside this checkout
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'microservices', 'shared-libs'))
+try:
+    from sentiment_lexicon import get_lexicon, IncrementalSentiment
+    LEXICON_AVAILABLE = os.getenv('SENTIMENT_ENGINE', 'lexicon') == 'lexicon'
+except ImportError:
+    LEXICON_AVAILABLE = False
+    get_lexicon = None
+    IncrementalSentiment = None
+
+# Live-preview drafts kept per session (least recently used evicted first)
+MAX_PREVIEW_SESSIONS = int(os.getenv('MAX_PREVIEW_SESSIONS', 10000))
+
+class _FullTextPreview:
+    """Preview session fallback that rescores the whole draft on every update."""
+    
+    def __init__(self):
+        self.text = ''
+    
+    def update(self, text):
+        self.text = text
+        return EmotionService._analyze_sentiment(text)
+
 class EmotionService:
     """Service for detecting emotions in text."""
     
@@ -16,10 +45,27 @@ class EmotionService:
         'neutral': {'polarity': (-0.2, 0.2), 'subjectivity': (0.0, 0.4)}
     }
     
+    _preview_sessions = OrderedDict()
+    _preview_lock = threading.Lock()
+    
+    @staticmethod
+    def _analyze_sentiment(text):
+        """Return (polarity, subjectivity) using the compiled lexicon when available."""
+        global LEXICON_AVAILABLE
+        if LEXICON_AVAILABLE:
+            try:
+                return get_lexicon().sentiment(text)
+            except Exception as e:
+                logger.warning(f"Sentiment lexicon unavailable, using TextBlob: {str(e)}")
+                LEXICON_AVAILABLE = False
+        
+        sentiment = TextBlob(text).sentiment
+        return sentiment.polarity, sentiment.subjectivity
+    
     @classmethod
     def detect_emotion(cls, text):
         """
-        Detect emotion from text using TextBlob sentiment analysis.
+        Detect emotion from text using TextBlob-compatible sentiment analysis.
         
         Args:
             text (str): The text to analyze
@@ -32,9 +78,7 @@ class EmotionService:
         
         try:
             # Analyze sentiment
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
-            subjectivity = blob.sentiment.subjectivity
+            polarity, subjectivity = cls._analyze_sentiment(text)
             
             logger.debug(f"Text: '{text}' - Polarity: {polarity}, Subjectivity: {subjectivity}")
             
@@ -55,6 +99,143 @@ class EmotionService:
             logger.error(f"Error detecting emotion: {str(e)}")
             return {'emotion': 'neutral', 'confidence': 0.5}
     
+    @classmethod
+    def detect_emotions(cls, texts):
+        """
+        Detect emotions for a batch of texts.
+        
+        Sentiment is scored per text, then emotions and confidences are
+        assigned for the whole batch at once with NumPy interval masks.
+        
+        Args:
+            texts (list): The texts to analyze
+            
+        Returns:
+            list: One result per text, identical to detect_emotion(text)
+        """
+        results = [None] * len(texts)
+        scored, polarities, subjectivities = [], [], []
+        
+        for i, text in enumerate(texts):
+            if not text:
+                results[i] = {'emotion': 'neutral', 'confidence': 1.0}
+                continue
+            try:
+                polarity, subjectivity = cls._analyze_sentiment(text)
+            except Exception as e:
+                logger.error(f"Error detecting emotion: {str(e)}")
+                results[i] = {'emotion': 'neutral', 'confidence': 0.5}
+                continue
+            scored.append(i)
+            polarities.append(polarity)
+            subjectivities.append(subjectivity)
+        
+        emotions, confidences = cls.classify_sentiments(polarities, subjectivities)
+        for i, polarity, subjectivity, emotion, confidence in zip(
+                scored, polarities, subjectivities, emotions, confidences):
+            results[i] = {
+                'emotion': emotion,
+                'confidence': confidence,
+                'polarity': polarity,
+                'subjectivity': subjectivity
+            }
+        
+        return results
+    
+    @classmethod
+    def classify_sentiments(cls, polarities, subjectivities):
+        """
+        Vectorized _match_emotion and _calculate_confidence.
+        
+        Args:
+            polarities (array-like): Sentiment polarity per row
+            subjectivities (array-like): Sentiment subjectivity per row
+            
+        Returns:
+            tuple: (list of emotions, list of confidences), one per row
+        """
+        polarity = np.asarray(polarities, dtype=np.float64)
+        subjectivity = np.asarray(subjectivities, dtype=np.float64)
+        
+        # First matching range wins, in EMOTIONS order; unmatched rows stay neutral
+        names = list(cls.EMOTIONS)
+        neutral = names.index('neutral')
+        matched = np.full(polarity.shape, -1, dtype=np.int8)
+        for index, ranges in enumerate(cls.EMOTIONS.values()):
+            (pol_low, pol_high), (subj_low, subj_high) = ranges['polarity'], ranges['subjectivity']
+            mask = ((matched < 0) & (pol_low <= polarity) & (polarity <= pol_high) &
+                    (subj_low <= subjectivity) & (subjectivity <= subj_high))
+            matched[mask] = index
+        matched[matched < 0] = neutral
+        
+        magnitude = np.abs(polarity)
+        confidence = np.where(
+            matched == neutral,
+            1.0 - magnitude * 2,
+            np.minimum(np.minimum(magnitude * 1.5, subjectivity * 1.3), 1.0)
+        )
+        
+        return np.asarray(names, dtype=object)[matched].tolist(), confidence.tolist()
+    
+    @classmethod
+    def detect_emotion_incremental(cls, session_id, text=None, delta=None):
+        """
+        Detect emotion for a draft that changes a little at a time.
+        
+        The session keeps its scoring state between calls, so only the part
+        of the draft after the last unchanged sentence is rescored.
+        
+        Args:
+            session_id (str): Key of the draft (e.g. the socket session)
+            text (str): The full draft, replacing the previous one
+            delta (str): Text appended to the previous draft (used if text is None)
+            
+        Returns:
+            dict: Same fields as detect_emotion, plus the draft length
+        """
+        with cls._preview_lock:
+            session = cls._preview_sessions.pop(session_id, None)
+            if session is None:
+                session = cls._new_preview_session()
+            cls._preview_sessions[session_id] = session
+            while len(cls._preview_sessions) > MAX_PREVIEW_SESSIONS:
+                cls._preview_sessions.popitem(last=False)
+        
+        draft = text if text is not None else session.text + (delta or '')
+        
+        try:
+            polarity, subjectivity = session.update(draft)
+        except Exception as e:
+            logger.error(f"Error detecting emotion incrementally: {str(e)}")
+            return {'emotion': 'neutral', 'confidence': 0.5, 'text_length': len(draft)}
+        
+        if not draft:
+            return {'emotion': 'neutral', 'confidence': 1.0, 'text_length': 0}
+        
+        detected_emotion = cls._match_emotion(polarity, subjectivity)
+        return {
+            'emotion': detected_emotion,
+            'confidence': cls._calculate_confidence(detected_emotion, polarity, subjectivity),
+            'polarity': polarity,
+            'subjectivity': subjectivity,
+            'text_length': len(draft)
+        }
+    
+    @classmethod
+    def end_preview_session(cls, session_id):
+        """Forget the draft kept for a preview session."""
+        with cls._preview_lock:
+            cls._preview_sessions.pop(session_id, None)
+    
+    @staticmethod
+    def _new_preview_session():
+        if LEXICON_AVAILABLE:
+            try:
+                return IncrementalSentiment(get_lexicon())
+            except Exception as e:
+                logger.warning(f"Incremental sentiment unavailable, rescoring full drafts: {str(e)}")
+        return _FullTextPreview()
+    
     @classmethod
     def _match_emotion(cls, polarity, subjectivity):
         """Match sentiment values to an emotion."""
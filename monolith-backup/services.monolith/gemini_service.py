@@ -1,4 +1,7 @@
+import asyncio
 import os
+import sys
+import time
 import logging
 import requests
 import json
@@ -6,6 +9,108 @@ from typing import Optional, Dict, Any
 
 logger = logging.getLogger(__name__)
 
+# Bulkhead/circuit-breaker client shared with the microservices; call the
+# API directly when it is not available alongside this checkout
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'microservices', 'shared-libs'))
+try:
+    from upstream_client import STATE_VALUES, LatencyTracker, UpstreamRejected, get_upstream_client
+    from prometheus_client import REGISTRY, Gauge
+    from prometheus_client.core import CounterMetricFamily
+    UPSTREAM_CLIENT_AVAILABLE = True
+except ImportError:
+    UPSTREAM_CLIENT_AVAILABLE = False
+    get_upstream_client = None
+
+try:
+    from prompt_builder import PromptBuilder, PromptTemplate
+    from prometheus_client import Histogram
+    PROMPT_BUILDER_AVAILABLE = True
+except ImportError:
+    PROMPT_BUILDER_AVAILABLE = False
+
+# Prompts are fitted into GEMINI_PROMPT_TOKEN_BUDGET estimated tokens: the
+# oldest of the last GEMINI_PROMPT_MAX_TURNS exchanges are dropped first and
+# long messages are cut in the middle
+GEMINI_PROMPT_TOKEN_BUDGET = int(os.getenv('GEMINI_PROMPT_TOKEN_BUDGET', 1024))
+GEMINI_PROMPT_MAX_TURNS = int(os.getenv('GEMINI_PROMPT_MAX_TURNS', 3))
+GEMINI_PROMPT_MAX_TURN_TOKENS = int(os.getenv('GEMINI_PROMPT_MAX_TURN_TOKENS', 200))
+
+# Bump when the prompt wording changes
+EMOTIONAL_PROMPT_VERSION = 1
+EMOTIONAL_PROMPT_TEMPLATE = """You are EmotiBot, an empathetic AI companion specialized in emotional support and understanding. 
+
+{history}Current situation:
+- User's message: "{message}"
+- Detected emotion: {emotion} (confidence: {confidence:.2f})
+
+Guidelines for your response:
+1. Be empathetic and understanding
+2. Acknowledge the user's emotional state
+3. Provide appropriate emotional support
+4. Ask follow-up questions to encourage conversation
+5. Keep responses conversational and supportive (2-3 sentences max)
+6. Use appropriate emojis sparingly
+7. If the emotion is negative, offer gentle support and coping suggestions
+8. If the emotion is positive, celebrate with them and encourage sharing
+
+Respond as EmotiBot with emotional intelligence and care:"""
+HISTORY_TEMPLATE = "Previous conversation:\n{turns}\n\n"
+TURN_TEMPLATE = "User: {user_message}\nBot: {bot_message}"
+
+if PROMPT_BUILDER_AVAILABLE:
+    emotional_prompt_builder = PromptBuilder(
+        PromptTemplate('emotional', EMOTIONAL_PROMPT_VERSION, EMOTIONAL_PROMPT_TEMPLATE),
+        GEMINI_PROMPT_TOKEN_BUDGET,
+        turn_template=PromptTemplate('turn', EMOTIONAL_PROMPT_VERSION, TURN_TEMPLATE),
+        history_template=PromptTemplate('history', EMOTIONAL_PROMPT_VERSION, HISTORY_TEMPLATE),
+        max_turns=GEMINI_PROMPT_MAX_TURNS,
+        max_turn_tokens=GEMINI_PROMPT_MAX_TURN_TOKENS
+    )
+    prompt_tokens = Histogram(
+        'gemini_prompt_tokens',
+        'Estimated tokens per prompt sent to Gemini',
+        ['template'],
+        buckets=(32, 64, 128, 256, 384, 512, 768, 1024, 1536, 2048, 4096)
+    )
+
+if UPSTREAM_CLIENT_AVAILABLE:
+    # Process-wide, configured by GEMINI_MAX_CONCURRENT, GEMINI_QUEUE_TIMEOUT, GEMINI_BREAKER_* ...
+    Gauge('gemini_circuit_state', 'Gemini circuit breaker state (0=closed, 1=half-open, 2=open)').set_function(
+        lambda: STATE_VALUES[get_upstream_client('gemini').breaker.state]
+    )
+    Gauge('gemini_queue_depth', 'Gemini calls waiting for a bulkhead slot').set_function(
+        lambda: get_upstream_client('gemini').waiting
+    )
+    Gauge('gemini_active_calls', 'Gemini calls in flight').set_function(
+        lambda: get_upstream_client('gemini').active
+    )
+
+# Hedging: the fastest recent endpoint goes first and the next endpoint is
+# tried once it runs past its GEMINI_HEDGE_QUANTILE latency (GEMINI_HEDGE_DELAY
+# until enough calls were seen), bounded by GEMINI_HEDGE_MIN/MAX_DELAY
+GEMINI_HEDGING = os.getenv('GEMINI_HEDGING', 'true').lower() == 'true'
+if UPSTREAM_CLIENT_AVAILABLE:
+    endpoint_latency = LatencyTracker(
+        quantile=float(os.getenv('GEMINI_HEDGE_QUANTILE', 0.95)),
+        default_delay=float(os.getenv('GEMINI_HEDGE_DELAY', 2.0)),
+        min_delay=float(os.getenv('GEMINI_HEDGE_MIN_DELAY', 0.1)),
+        max_delay=float(os.getenv('GEMINI_HEDGE_MAX_DELAY', 5.0))
+    )
+
+    class _HedgeCollector:
+        """Exports the shared client's hedge counts."""
+        
+        def collect(self):
+            family = CounterMetricFamily('gemini_hedge_requests', 'Hedged Gemini requests by result', labels=['result'])
+            for result, count in get_upstream_client('gemini').hedges.items():
+                family.add_metric([result], count)
+            yield family
+    
+    REGISTRY.register(_HedgeCollector())
+
+# Keep-alive connection pool for direct calls
+_http_session = requests.Session()
+
 class GeminiService:
     """Service for integrating with Google's Gemini LLM API."""
     
@@ -19,11 +124,13 @@ class GeminiService:
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
         # Check for mock mode (for load testing)
         self.mock_mode = os.getenv('GEMINI_MOCK_MODE', 'false').lower() == 'true'
-        # Try different model endpoints
+        # Try different model endpoints; GEMINI_API_BASE_URL points them at a
+        # compatible server such as gemini-stub (http://localhost:8010)
+        base_url = (os.getenv('GEMINI_API_BASE_URL') or 'https://generativelanguage.googleapis.com').rstrip('/')
         self.model_endpoints = [
-            "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent",
-            "https://generativelanguage.googleapis.com/v1/models/gemini-pro:generateContent",
-            "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+            f"{base_url}/v1beta/models/gemini-pro:generateContent",
+            f"{base_url}/v1/models/gemini-pro:generateContent",
+            f"{base_url}/v1beta/models/gemini-1.5-flash:generateContent"
         ]
         self.base_url = self.model_endpoints[0]  # Default to first endpoint
         self.enabled = bool(self.api_key) and not self.mock_mode
@@ -59,39 +166,32 @@ class GeminiService:
             response = self._call_gemini_api(prompt)
             return response
         except Exception as e:
+            if UPSTREAM_CLIENT_AVAILABLE and isinstance(e, UpstreamRejected):
+                logger.warning(f"Gemini call rejected ({e.reason}), using fallback response")
+                return self._get_fallback_response(detected_emotion)
             logger.error(f"Error generating Gemini response: {str(e)}")
             return self._get_fallback_response(detected_emotion)
     
     def _build_emotional_prompt(self, user_message: str, emotion: str, confidence: float, 
                                conversation_history: list = None) -> str:
-        """Build a prompt for emotional response generation."""
+        """Build a prompt for emotional response generation within the token budget."""
+        turns = [
+            {'user_message': msg.get('user_message', ''), 'bot_message': msg.get('bot_message', '')}
+            for msg in (conversation_history or [])
+        ]
         
-        context = ""
-        if conversation_history:
-            context = "Previous conversation:\n"
-            for msg in conversation_history[-3:]:  # Last 3 messages for context
-                context += f"User: {msg.get('user_message', '')}\nBot: {msg.get('bot_message', '')}\n"
-            context += "\n"
+        if not PROMPT_BUILDER_AVAILABLE:
+            turns = turns[-GEMINI_PROMPT_MAX_TURNS:] if GEMINI_PROMPT_MAX_TURNS else []
+            history = HISTORY_TEMPLATE.format(turns='\n'.join(TURN_TEMPLATE.format(**turn) for turn in turns)) if turns else ''
+            return EMOTIONAL_PROMPT_TEMPLATE.format(
+                history=history, message=user_message, emotion=emotion, confidence=confidence
+            )
         
-        prompt = f"""You are EmotiBot, an empathetic AI companion specialized in emotional support and understanding. 
-
-{context}Current situation:
-- User's message: "{user_message}"
-- Detected emotion: {emotion} (confidence: {confidence:.2f})
-
-Guidelines for your response:
-1. Be empathetic and understanding
-2. Acknowledge the user's emotional state
-3. Provide appropriate emotional support
-4. Ask follow-up questions to encourage conversation
-5. Keep responses conversational and supportive (2-3 sentences max)
-6. Use appropriate emojis sparingly
-7. If the emotion is negative, offer gentle support and coping suggestions
-8. If the emotion is positive, celebrate with them and encourage sharing
-
-Respond as EmotiBot with emotional intelligence and care:"""
-
-        return prompt
+        prompt = emotional_prompt_builder.build(user_message, turns, emotion=emotion, confidence=confidence)
+        prompt_tokens.labels(template=emotional_prompt_builder.template.key).observe(prompt.tokens)
+        if prompt.truncated or prompt.dropped_turns:
+            logger.debug(f"Trimmed prompt to {prompt.tokens} tokens ({prompt.dropped_turns} history turns dropped)")
+        return prompt.text
     
     def _call_gemini_api(self, prompt: str) -> str:
         """Make API call to Gemini."""
@@ -113,6 +213,23 @@ Respond as EmotiBot with emotional intelligence and care:"""
             }
         }
         
+        if UPSTREAM_CLIENT_AVAILABLE:
+            # One guarded call covers the hedged or sequential endpoint attempts
+            client = get_upstream_client('gemini')
+            
+            def attempt(endpoint):
+                return self._call_endpoint_async(client, endpoint, headers, data)
+            
+            if GEMINI_HEDGING:
+                return client.call(
+                    lambda: client.hedge(self.model_endpoints, attempt, endpoint_latency),
+                    timeout=client.request_timeout + endpoint_latency.max_delay * (len(self.model_endpoints) - 1)
+                )
+            return client.call(
+                lambda: self._call_endpoints_async(attempt),
+                timeout=client.request_timeout * len(self.model_endpoints)
+            )
+        
         # Try different endpoints
         last_error = None
         for endpoint in self.model_endpoints:
@@ -120,7 +237,7 @@ Respond as EmotiBot with emotional intelligence and care:"""
                 url = f"{endpoint}?key={self.api_key}"
                 logger.debug(f"Trying Gemini API endpoint: {endpoint}")
                 
-                response = requests.post(url, headers=headers, json=data, timeout=10)
+                response = _http_session.post(url, headers=headers, json=data, timeout=10)
                 
                 # Log the response status and content for debugging
                 logger.debug(f"API Response Status: {response.status_code}")
@@ -154,6 +271,43 @@ Respond as EmotiBot with emotional intelligence and care:"""
         else:
             raise Exception("No response generated by Gemini from any endpoint")
     
+    async def _call_endpoint_async(self, client, endpoint: str, headers: Dict, data: Dict) -> str:
+        """Call one endpoint on the upstream client's event loop."""
+        logger.debug(f"Trying Gemini API endpoint: {endpoint}")
+        try:
+            result = await asyncio.wait_for(
+                client.post_json(f"{endpoint}?key={self.api_key}", data, headers), client.request_timeout
+            )
+        except asyncio.CancelledError:
+            logger.debug(f"Cancelled call to {endpoint}")
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to call {endpoint}: {str(e)}")
+            raise
+        
+        if 'candidates' in result and len(result['candidates']) > 0:
+            content = result['candidates'][0]['content']['parts'][0]['text']
+            logger.info(f"Successfully got response from {endpoint}")
+            return content.strip()
+        logger.warning(f"No candidates in response from {endpoint}: {result}")
+        raise Exception(f"No candidates in response from {endpoint}")
+    
+    async def _call_endpoints_async(self, attempt) -> str:
+        """Try each endpoint in turn, fastest recent endpoint first."""
+        last_error = None
+        for endpoint in endpoint_latency.order(self.model_endpoints):
+            started = time.monotonic()
+            try:
+                result = await attempt(endpoint)
+            except Exception as e:
+                endpoint_latency.record(endpoint, time.monotonic() - started, False)
+                last_error = e
+                continue
+            endpoint_latency.record(endpoint, time.monotonic() - started, True)
+            return result
+        
+        raise last_error or Exception("No response generated by Gemini from any endpoint")
+    
     def _get_fallback_response(self, emotion: str) -> str:
         """Get fallback response when Gemini is not available."""
         fallback_responses = {
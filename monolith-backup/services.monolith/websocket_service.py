@@ -40,6 +40,9 @@ class WebSocketService:
         @self.socketio.on('disconnect')
         def handle_disconnect():
             """Handle client disconnection."""
+            from services.emotion_service import EmotionService
+            EmotionService.end_preview_session(request.sid)
+            
             if request.sid in self.active_users:
                 user_data = self.active_users.pop(request.sid)
                 logger.info(f"Client disconnected. User ID: {user_data['user_id']}")
@@ -66,8 +69,9 @@ class WebSocketService:
                 from flask import current_app
                 from services.emotion_service import EmotionService
                 
-                # Analyze emotion
+                # Analyze emotion; the draft is sent, so its preview state can go
                 result = EmotionService.detect_emotion(text)
+                EmotionService.end_preview_session(request.sid)
 
                 # Generate bot response using Gemini
                 conversation_history = []
@@ -120,15 +124,20 @@ class WebSocketService:
                 logger.warning("Live emotion preview request from unauthorized user")
                 return
 
-            text = data.get('text', '').strip()
-            if not text or len(text) < 3:  # Only analyze if there's meaningful text
+            # Clients send either the whole draft ('text') or what was typed since
+            # the last preview ('delta'); both only rescore the changed tail
+            text = data.get('text')
+            delta = data.get('delta')
+            if text is None and delta is None:
                 return
 
             try:
                 from services.emotion_service import EmotionService
                 
-                # Quick emotion analysis for preview
-                result = EmotionService.detect_emotion(text)
+                # Quick incremental emotion analysis for preview
+                result = EmotionService.detect_emotion_incremental(request.sid, text=text, delta=delta)
+                if result['text_length'] < 3:  # Only preview if there's meaningful text
+                    return
                 
                 # Emit preview data
                 preview_data = {
@@ -138,6 +138,20 @@ class TestGeminiService:
         assert isinstance(response, str)
         assert len(response) > 0
 
+    def test_emotional_prompt_trims_long_history(self):
+        """Test that long history is trimmed into the prompt token budget."""
+        from services.gemini_service import GEMINI_PROMPT_TOKEN_BUDGET
+        from prompt_builder import estimate_tokens
+
+        service = GeminiService()
+        history = [{'user_message': f"turn {i} " + "word " * 2000, 'bot_message': 'ok'} for i in range(5)]
+        prompt = service._build_emotional_prompt("I'm feeling sad", 'sad', 0.8, history)
+
+        assert estimate_tokens(prompt) <= GEMINI_PROMPT_TOKEN_BUDGET
+        assert 'turn 4' in prompt
+        assert 'turn 0' not in prompt
+        assert "I'm feeling sad" in prompt
+
 
 class TestAuthentication:
     """Test authentication endpoints."""
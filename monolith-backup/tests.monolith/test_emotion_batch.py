@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the EmotionService batch API
+"""
+
+import importlib.machinery
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+MONOLITH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Import the service and its benchmark straight from services.monolith
+sys.path.insert(0, os.path.join(MONOLITH_DIR, 'services.monolith'))
+
+from emotion_service import EmotionService
+
+
+def load_monolith_module(name, filename):
+    """Import a module or package of this checkout under the name the app imports it by."""
+    path = os.path.join(MONOLITH_DIR, filename)
+    if os.path.isdir(path):
+        spec = importlib.util.spec_from_file_location(
+            name, os.path.join(path, '__init__.py'), submodule_search_locations=[path])
+    else:
+        spec = importlib.util.spec_from_loader(name, importlib.machinery.SourceFileLoader(name, path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope='module')
+def client():
+    """Test client for the monolith app, whose packages carry a .monolith suffix here."""
+    os.environ['GEMINI_MOCK_MODE'] = 'true'
+    os.environ['DEBUG_METRICS'] = '0'
+    load_monolith_module('config', 'config.monolith.py')
+    load_monolith_module('models', 'models.monolith')
+    load_monolith_module('middleware', 'middleware.monolith')
+    load_monolith_module('services', 'services.monolith')
+    app = load_monolith_module('app', 'app.py.monolith').create_app('testing')
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+class TestBatchDetection:
+    """Test the EmotionService batch API against its scalar path."""
+
+    def test_classification_matches_scalar(self):
+        """Test that vectorized classification equals the scalar loop, range boundaries included."""
+        from bench_emotion_batch import bench_classification
+        _scalar, _batch, identical = bench_classification(EmotionService, 5000)
+        assert identical
+
+    def test_detect_emotions_matches_detect_emotion(self):
+        """Test that detect_emotions returns detect_emotion's result for every text, in order."""
+        texts = ['I am so happy and excited!', '', 'This is awful and I hate it.',
+                 'The meeting is at noon.', 'I am not happy at all']
+        assert EmotionService.detect_emotions(texts) == [EmotionService.detect_emotion(t) for t in texts]
+        assert EmotionService.detect_emotions([]) == []
+
+
+class TestAnalyzeEndpoint:
+    """Test batches sent to /api/analyze."""
+
+    def test_analyze_endpoint_accepts_batches(self, client):
+        """Test that /api/analyze scores a list of texts without bot responses."""
+        texts = ['I am happy', 'I am sad']
+        response = client.post('/api/analyze', json={'texts': texts})
+
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['count'] == 2
+        assert data['results'] == EmotionService.detect_emotions(texts)
+        assert 'bot_message' not in data
+
+    def test_analyze_endpoint_rejects_bad_batches(self, client):
+        """Test that non-string texts and oversized batches are refused."""
+        assert client.post('/api/analyze', json={'texts': ['ok', 3]}).status_code == 400
+        assert client.post('/api/analyze', json={'texts': 'not a list'}).status_code == 400
+        assert client.post('/api/analyze', json={'texts': ['hi'] * 1001}).status_code == 413